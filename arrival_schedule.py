@@ -0,0 +1,90 @@
+"""
+Open-Loop Arrival Schedule
+Dispatches requests at a target rate, independent of earlier responses
+
+In the default closed-loop model every virtual user waits for its response
+before sleeping and sending again, so when the chatbot slows down the offered
+load drops with it (coordinated omission) and the slowdown is under-reported.
+
+In open-loop mode the target is requests per second. The schedule lays out
+send times at exactly 1/rate apart (or with exponential gaps for Poisson
+arrivals) and every free virtual user claims the next one, so the send times
+never depend on how long earlier requests took. Users are only a pool of
+in-flight capacity: when all of them are busy, the next send time passes
+before anyone can claim it. How far behind schedule a claimed slot is
+measures how much the generator lags the target rate.
+"""
+import random
+import time
+
+# Slots claimed later than this after their due time count as late
+LATE_THRESHOLD_S = 1.0
+
+
+class ArrivalSchedule:
+    """Shared send-time schedule for one Locust process"""
+
+    def __init__(self, rate, poisson=False, rng=None):
+        if rate <= 0:
+            raise ValueError("Arrival rate must be positive")
+        self.rate = float(rate)
+        self.poisson = poisson
+        self._rng = rng or random.Random()
+        self._next_due = None
+
+        self.dispatched = 0
+        self.late = 0
+        self.max_lag_s = 0.0
+        self.lag_s = 0.0  # lag of the most recently claimed slot
+        self._total_lag_s = 0.0
+
+    def claim(self, now=None):
+        """
+        Claim the next send time
+
+        Returns:
+            float: Seconds to wait before sending (0 if the slot is already due or overdue)
+        """
+        now = time.monotonic() if now is None else now
+        if self._next_due is None:
+            # The clock starts with the first claim, not at test start, so user spawning is not counted as lag
+            self._next_due = now
+        due = self._next_due
+        self._next_due += self._rng.expovariate(self.rate) if self.poisson else 1.0 / self.rate
+
+        lag = max(0.0, now - due)
+        self.dispatched += 1
+        self.lag_s = lag
+        self._total_lag_s += lag
+        if lag > LATE_THRESHOLD_S:
+            self.late += 1
+        if lag > self.max_lag_s:
+            self.max_lag_s = lag
+        return max(0.0, due - now)
+
+    def stats(self):
+        """Counters for reporting"""
+        return {
+            "rate": self.rate,
+            "dispatched": self.dispatched,
+            "late": self.late,
+            "lag_s": self.lag_s,
+            "mean_lag_s": self._total_lag_s / self.dispatched if self.dispatched else 0.0,
+            "max_lag_s": self.max_lag_s,
+        }
+
+
+def combine_stats(stats_list):
+    """Combine ArrivalSchedule.stats() of several processes (e.g. Locust workers)"""
+    combined = {"rate": 0.0, "dispatched": 0, "late": 0, "lag_s": 0.0, "mean_lag_s": 0.0, "max_lag_s": 0.0}
+    total_lag_s = 0.0
+    for stats in stats_list:
+        combined["rate"] += stats["rate"]
+        combined["dispatched"] += stats["dispatched"]
+        combined["late"] += stats["late"]
+        total_lag_s += stats["mean_lag_s"] * stats["dispatched"]
+        combined["lag_s"] = max(combined["lag_s"], stats["lag_s"])
+        combined["max_lag_s"] = max(combined["max_lag_s"], stats["max_lag_s"])
+    if combined["dispatched"]:
+        combined["mean_lag_s"] = total_lag_s / combined["dispatched"]
+    return combined
@@ -0,0 +1,292 @@
+"""
+Performance Baselines
+Saves the results of a blessed run and gates later runs against them
+
+A baseline is a snapshot of one run (see ttf_analysis.py): per question
+category the request and error counts and HDR histograms of TTFT and total
+response time, plus the run's throughput per time bucket. Histograms keep the
+whole latency distribution in a few KB, so later runs can be tested against
+it, not just compared by a few numbers.
+
+A comparison checks, per category and for the whole run:
+- p50 / p95 / p99 of TTFT and total response time: relative change, tested
+  with a quantile test (the share of each run's requests at or below the pooled
+  quantile, compared with a two-proportion z-test)
+- error rate: change in percentage points, two-proportion z-test
+- throughput (whole run only): relative change of the mean requests/second,
+  Welch's t-test over the time buckets
+
+Only one-sided tests are used (is the current run worse?). A check is a
+regression when the change is beyond its threshold AND the test is significant
+at the configured level, so noise in small runs does not fail a deployment and
+tiny but significant shifts in huge runs do not either.
+"""
+import json
+import math
+from datetime import datetime
+from pathlib import Path
+
+from latency_histogram import HdrHistogram
+from ttf_analysis import ALL_CATEGORIES, SUCCESS_STATUS
+
+COMPARED_METRICS = ("ttft_ms", "total_ms")
+COMPARED_PERCENTILES = (50, 95, 99)
+
+
+def snapshot_run(run, name="default"):
+    """
+    Baseline snapshot of a run
+
+    Args:
+        run: ttf_analysis.RunSummary of the run (one run or breakpoint step)
+        name: Baseline name
+
+    Returns:
+        dict: JSON-serializable snapshot
+    """
+    summary = run.to_dict()
+    categories = {}
+    for category in sorted(run.status_counts) + [ALL_CATEGORIES]:
+        if category == ALL_CATEGORIES:
+            counts = {}
+            for statuses in run.status_counts.values():
+                for status, count in statuses.items():
+                    counts[status] = counts.get(status, 0) + count
+        else:
+            counts = run.status_counts[category]
+        requests = sum(counts.values())
+        entry = {"requests": requests, "errors": requests - counts.get(SUCCESS_STATUS, 0)}
+        for metric in COMPARED_METRICS:
+            histogram = run.histogram(category, metric)
+            if histogram is not None:
+                entry[metric] = histogram.to_dict()
+        categories[category] = entry
+    return {
+        "name": name,
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+        "run_id": summary["run_id"],
+        "step": summary["step"],
+        "test_type": summary["test_type"],
+        "users": summary["users"],
+        "start": summary["start"],
+        "duration_s": summary["duration_s"],
+        "rps": summary["rps"],
+        "bucket_seconds": summary["bucket_seconds"],
+        "rps_series": [bucket["rps"] for bucket in summary["series"]],
+        "categories": categories,
+    }
+
+
+def baseline_path(directory, name):
+    return Path(directory) / f"{name}.json"
+
+
+def save_baseline(directory, snapshot):
+    path = baseline_path(directory, snapshot["name"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(snapshot, f)
+    return path
+
+
+def load_baseline(directory, name):
+    """Load a saved baseline (None if there is none with that name)"""
+    path = baseline_path(directory, name)
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def compare(baseline, current, max_latency_increase_percent=20.0, max_throughput_decrease_percent=20.0,
+            max_error_rate_increase=2.0, significance_level=0.05, min_samples=30):
+    """
+    Compare a run snapshot with a baseline snapshot
+
+    Returns:
+        dict: checks (one per category / metric), regressions (their descriptions), notes and passed
+    """
+    checks = []
+    notes = []
+    if baseline.get("users") != current.get("users"):
+        notes.append(f"user count differs (baseline {baseline.get('users')}, current {current.get('users')}) - "
+                     f"throughput and latency may not be comparable")
+
+    for category, base in baseline["categories"].items():
+        cur = current["categories"].get(category)
+        if cur is None:
+            notes.append(f"category '{category}' is missing from the current run")
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in base or metric not in cur:
+                continue
+            base_hist = HdrHistogram.from_dict(base[metric])
+            cur_hist = HdrHistogram.from_dict(cur[metric])
+            enough = base_hist.total_count >= min_samples and cur_hist.total_count >= min_samples
+            for percentile in COMPARED_PERCENTILES:
+                base_value = base_hist.value_at_percentile(percentile) / 1000
+                cur_value = cur_hist.value_at_percentile(percentile) / 1000
+                change = (cur_value - base_value) / base_value * 100 if base_value > 0 else None
+                p_value = _quantile_test(base_hist, cur_hist, percentile) if enough else None
+                checks.append(_check(
+                    category, f"p{percentile}_{metric}", base_value, cur_value, change, "%", p_value,
+                    change is not None and change > max_latency_increase_percent, significance_level,
+                ))
+
+        if base["requests"] >= min_samples and cur["requests"] >= min_samples:
+            base_rate = base["errors"] / base["requests"] * 100
+            cur_rate = cur["errors"] / cur["requests"] * 100
+            p_value = _two_proportion_test(base["errors"], base["requests"], cur["errors"], cur["requests"])
+        else:
+            base_rate = base["errors"] / base["requests"] * 100 if base["requests"] else 0.0
+            cur_rate = cur["errors"] / cur["requests"] * 100 if cur["requests"] else 0.0
+            p_value = None
+        checks.append(_check(
+            category, "error_rate", base_rate, cur_rate, cur_rate - base_rate, "pt", p_value,
+            cur_rate - base_rate > max_error_rate_increase, significance_level,
+        ))
+
+    base_rps, cur_rps = baseline.get("rps"), current.get("rps")
+    if base_rps and cur_rps is not None:
+        change = (cur_rps - base_rps) / base_rps * 100
+        p_value = _welch_test(_steady_buckets(baseline["rps_series"]), _steady_buckets(current["rps_series"]))
+        checks.append(_check(
+            ALL_CATEGORIES, "rps", base_rps, cur_rps, change, "%", p_value,
+            -change > max_throughput_decrease_percent, significance_level,
+        ))
+
+    regressions = [
+        f"{check['category']}: {check['metric']} {check['baseline']:.1f} -> {check['current']:.1f} "
+        f"({check['change']:+.1f}{check['unit']}, p={check['p_value']:.3g})"
+        for check in checks if check["regression"]
+    ]
+    return {
+        "baseline": {key: baseline.get(key) for key in ("name", "run_id", "step", "test_type", "users", "start")},
+        "current": {key: current.get(key) for key in ("run_id", "step", "test_type", "users", "start")},
+        "thresholds": {
+            "max_latency_increase_percent": max_latency_increase_percent,
+            "max_throughput_decrease_percent": max_throughput_decrease_percent,
+            "max_error_rate_increase": max_error_rate_increase,
+            "significance_level": significance_level,
+            "min_samples": min_samples,
+        },
+        "checks": checks,
+        "notes": notes,
+        "regressions": regressions,
+        "passed": not regressions,
+    }
+
+
+def format_comparison(result):
+    """Text table of the checks: baseline, current, change, p-value and verdict"""
+    lines = [f"{'Category':<20} {'Metric':<14} {'Baseline':>10} {'Current':>10} {'Change':>9} {'p-value':>8}  Verdict"]
+    for check in result["checks"]:
+        change = f"{check['change']:+.1f}{check['unit']}" if check["change"] is not None else "-"
+        p_value = f"{check['p_value']:.3f}" if check["p_value"] is not None else "-"
+        if check["regression"]:
+            verdict = "❌ regression"
+        elif check["exceeds_threshold"]:
+            verdict = "⚠️  not significant" if check["p_value"] is not None else "⚠️  too few samples"
+        else:
+            verdict = "ok"
+        lines.append(f"{check['category'][:20]:<20} {check['metric']:<14} {check['baseline']:>10.1f} "
+                     f"{check['current']:>10.1f} {change:>9} {p_value:>8}  {verdict}")
+    return "\n".join(lines)
+
+
+def _check(category, metric, baseline_value, current_value, change, unit, p_value, exceeds_threshold,
+           significance_level):
+    significant = p_value is not None and p_value < significance_level
+    return {
+        "category": category,
+        "metric": metric,
+        "baseline": baseline_value,
+        "current": current_value,
+        "change": change,
+        "unit": unit,
+        "p_value": p_value,
+        "significant": significant,
+        "exceeds_threshold": exceeds_threshold,
+        "regression": exceeds_threshold and significant,
+    }
+
+
+def _steady_buckets(series):
+    """Bucket values without the ramp-up and the (partial) last bucket, when there are enough"""
+    return series[1:-1] if len(series) >= 5 else series
+
+
+def _quantile_test(baseline, current, percentile):
+    """
+    One-sided p-value that the current run's percentile is higher than the baseline's
+
+    Under H0 both runs share the pooled quantile q, so the same share of each
+    run's values lies at or below q; a slower run has a smaller share.
+    """
+    pooled = HdrHistogram(baseline.highest_us, baseline.significant_digits)
+    pooled.merge(baseline)
+    pooled.merge(current)
+    quantile = pooled.value_at_percentile(percentile)
+    return _two_proportion_test(
+        baseline.total_count - baseline.count_at_or_below(quantile), baseline.total_count,
+        current.total_count - current.count_at_or_below(quantile), current.total_count,
+    )
+
+
+def _two_proportion_test(base_hits, base_total, current_hits, current_total):
+    """One-sided p-value that the current proportion is higher than the baseline's"""
+    pooled = (base_hits + current_hits) / (base_total + current_total)
+    variance = pooled * (1 - pooled) * (1 / base_total + 1 / current_total)
+    if variance <= 0:
+        return 1.0
+    z = (current_hits / current_total - base_hits / base_total) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _welch_test(baseline, current):
+    """One-sided p-value that the current mean is lower than the baseline's (Welch's t-test)"""
+    if len(baseline) < 2 or len(current) < 2:
+        return None
+    mean_b, mean_c = sum(baseline) / len(baseline), sum(current) / len(current)
+    var_b = sum((x - mean_b) ** 2 for x in baseline) / (len(baseline) - 1) / len(baseline)
+    var_c = sum((x - mean_c) ** 2 for x in current) / (len(current) - 1) / len(current)
+    if var_b + var_c == 0:
+        return 0.0 if mean_c < mean_b else 1.0
+    t = (mean_c - mean_b) / math.sqrt(var_b + var_c)
+    df = (var_b + var_c) ** 2 / (var_b ** 2 / (len(baseline) - 1) + var_c ** 2 / (len(current) - 1))
+    return _student_t_cdf(t, df)
+
+
+def _student_t_cdf(t, df):
+    """P(T <= t) for Student's t distribution with df degrees of freedom"""
+    tail = 0.5 * _regularized_incomplete_beta(df / 2, 0.5, df / (df + t * t))
+    return tail if t < 0 else 1 - tail
+
+
+def _regularized_incomplete_beta(a, b, x):
+    """I_x(a, b) via its continued fraction (Lentz's method)"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1 - _regularized_incomplete_beta(b, a, 1 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x)) / a
+    tiny = 1e-300
+    f, c, d = 1.0, 1.0, 0.0
+    for i in range(400):
+        m = i // 2
+        if i == 0:
+            numerator = 1.0
+        elif i % 2 == 0:
+            numerator = m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m))
+        else:
+            numerator = -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))
+        d = 1 + numerator * d
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = 1 + numerator / c
+        c = c if abs(c) > tiny else tiny
+        f *= c * d
+        if abs(1 - c * d) < 1e-12:
+            break
+    return front * (f - 1)
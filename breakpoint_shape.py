@@ -0,0 +1,253 @@
+"""
+Breakpoint Test Load Shape
+Steps the user count up inside a single running Locust test
+
+Used by `python run_tests.py breakpoint` (the default "shape" mode):
+    locust -f locustfile.py,breakpoint_shape.py --headless --host ...
+
+Instead of restarting Locust for every load level, the shape raises the target
+user count by `user_increment` every `step_duration`. Users that are already
+running (and logged in) stay alive, so only the newly added users ramp up.
+Each step's measurement window starts once the target user count has been
+reached, so login storms and ramp-up do not pollute the step's numbers.
+
+While a step runs, a rolling window of the aggregated stats is fed to the
+KneeDetector; with early stop enabled the ramp ends as soon as the system is
+clearly past its saturation knee instead of always climbing to max_users.
+
+TTF rows are tagged with the step they were recorded in (Step column, see
+run_registry.py); the master passes the step on to its workers.
+
+Steps during which a load generator process was saturated (see
+generator_health.py) are flagged, since their latency partly reflects our own box.
+
+Per-step results are kept in memory and written to BREAKPOINT_STEPS_PATH after
+every step, which run_tests.py turns into the consolidated summary report.
+"""
+import json
+import time
+from collections import deque
+from pathlib import Path
+
+from locust import LoadTestShape, events
+from locust.runners import MasterRunner, WorkerRunner
+from locust.stats import calculate_response_time_percentile, diff_response_time_dicts
+from locust.util.timespan import parse_timespan
+
+from config_breakpoint_test import BREAKPOINT_TEST_CONFIG
+from generator_health import get_monitor
+from knee_detector import KneeDetector
+from run_registry import RunIndex, get_run_context
+from test_config import BREAKPOINT_STEPS_PATH, RUN_INDEX_PATH
+
+
+class BreakpointShape(LoadTestShape):
+    """Stepped load shape driven by BREAKPOINT_TEST_CONFIG"""
+
+    def __init__(self):
+        super().__init__()
+        self.start_users = BREAKPOINT_TEST_CONFIG["start_users"]
+        self.max_users = BREAKPOINT_TEST_CONFIG["max_users"]
+        self.spawn_rate = BREAKPOINT_TEST_CONFIG["spawn_rate"]
+        self.step_duration = parse_timespan(str(BREAKPOINT_TEST_CONFIG["step_duration"]))
+        self.user_increment = BREAKPOINT_TEST_CONFIG["user_increment"]
+        self.failure_rate_threshold = BREAKPOINT_TEST_CONFIG["failure_rate_threshold"]
+        self.early_stop = BREAKPOINT_TEST_CONFIG["early_stop"]
+        self.rolling_window = BREAKPOINT_TEST_CONFIG["rolling_window"]
+
+        self.steps = []
+        self.breaking_point_users = None
+        self.detector = KneeDetector.from_config(BREAKPOINT_TEST_CONFIG)
+
+        self._step_index = None
+        self._step_users = None
+        self._step_started_at = None
+        self._window_start = None
+        self._settled = False
+        self._finished = False
+        self._recent = deque()
+        self._step_starts = []
+
+    def tick(self):
+        if self._finished:
+            return None
+
+        step_index = int(self.get_run_time() // self.step_duration)
+        users = self.start_users + step_index * self.user_increment
+
+        if step_index != self._step_index:
+            self._finish_step()
+            if users > self.max_users or (self.early_stop and self.detector.should_stop):
+                self.finish()
+                return None
+            self._start_step(step_index, users)
+
+        # Measure from the moment every user of this step is running
+        if not self._settled and self.get_current_user_count() >= users:
+            self._window_start = self._snapshot()
+            self._settled = True
+
+        if self.early_stop and self._settled and self._check_rolling_window():
+            print(f"\n🛑 Stopping ramp early: {self.detector.stop_reason}")
+            self.finish()
+            return None
+
+        return users, self.spawn_rate
+
+    def finish(self):
+        """Close the running step (if any) and write the final results"""
+        if self._finished:
+            return
+        self._finish_step()
+        self._finished = True
+        self._write_results()
+
+    def _start_step(self, step_index, users):
+        self._step_index = step_index
+        self._step_users = users
+        self._step_started_at = time.time()
+        # Until the ramp completes, the window covers the whole step
+        self._window_start = self._snapshot()
+        self._settled = False
+        self._recent.clear()
+        self._tag_step(step_index + 1, users)
+        print(f"\n{'='*60}")
+        print(f"STEP {step_index + 1}: Testing with {users} users")
+        print(f"{'='*60}\n")
+
+    def _tag_step(self, step, users):
+        """Tag TTF rows from now on with the new step and list the step in the run index"""
+        context = get_run_context()
+        context.step = step
+        context.step_users = users
+        if isinstance(self.runner, MasterRunner):
+            self.runner.send_message("run_context", context.to_dict())
+        self._step_starts.append({"step": step, "users": users, "started": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        if context.run_id is None:
+            return
+        try:
+            # Merges into the run's record (step 0), which holds the byte offsets
+            RunIndex(RUN_INDEX_PATH).record({"run_id": context.run_id, "step": 0, "steps": self._step_starts})
+        except OSError as e:
+            print(f"WARNING: Could not update run index {RUN_INDEX_PATH}: {e}")
+
+    def _finish_step(self):
+        """Turn the stats accumulated since the window started into a step result"""
+        if self._window_start is None:
+            return
+        start, end = self._window_start, self._snapshot()
+        self._window_start = None
+
+        requests = end["num_requests"] - start["num_requests"]
+        failures = end["num_failures"] - start["num_failures"]
+        timed_requests = requests - (end["num_none_requests"] - start["num_none_requests"])
+        response_times = diff_response_time_dicts(end["response_times"], start["response_times"])
+        window_seconds = max(end["time"] - start["time"], 1e-9)
+
+        step = {
+            'step': self._step_index + 1,
+            'users': self._step_users,
+            'requests': requests,
+            'failures': failures,
+            'avg_response': (end["total_response_time"] - start["total_response_time"]) / timed_requests if timed_requests > 0 else 0,
+            'median_response': calculate_response_time_percentile(response_times, timed_requests, 0.5) if timed_requests > 0 else 0,
+            'p95_response': calculate_response_time_percentile(response_times, timed_requests, 0.95) if timed_requests > 0 else 0,
+            'rps': requests / window_seconds,
+            'user_increment': self.user_increment,
+            'window_start': start["time"],
+            'window_end': end["time"],
+            'ramp_seconds': round(start["time"] - self._step_started_at, 2),
+            'settled': self._settled,
+            'generator_saturated': self._generator_saturated(start["time"], end["time"]),
+        }
+        failure_rate = (failures / requests * 100) if requests > 0 else 0
+        step.update(self.detector.add_step(self._step_users, step['rps'], step['p95_response'], failure_rate))
+        self.steps.append(step)
+
+        if failure_rate > self.failure_rate_threshold:
+            print(f"\n⚠️  High failure rate ({failure_rate:.2f}%) detected at {self._step_users} users")
+            print("This indicates the system is at or past its breaking point.")
+            if self.breaking_point_users is None:
+                self.breaking_point_users = self._step_users
+        elif failures > 0:
+            print(f"\n⚠️  Some failures ({failures}/{requests}) detected at {self._step_users} users")
+        if step['generator_saturated']:
+            print(f"\n⚠️  Load generator saturated during this step ({', '.join(step['generator_saturated'])}) "
+                  f"- its latency numbers are not trustworthy")
+        if step['saturated']:
+            print(f"\n⚠️  Throughput stopped scaling at {self._step_users} users "
+                  f"(efficiency {step['efficiency']:.2f}, p95 x{step['latency_ratio']:.2f})")
+        print(f"✓ Step {step['step']} completed with {self._step_users} users")
+        if self.early_stop and self.detector.should_stop:
+            print(f"\n🛑 Stopping ramp early: {self.detector.stop_reason}")
+
+        self._write_results()
+
+    def _check_rolling_window(self):
+        """Feed the last rolling_window seconds of stats to the detector; True if it says stop"""
+        now = self._snapshot()
+        self._recent.append(now)
+        # Keep one snapshot older than the window as the window's start
+        while len(self._recent) > 2 and now["time"] - self._recent[1]["time"] >= self.rolling_window:
+            self._recent.popleft()
+        start = self._recent[0]
+        if now["time"] - start["time"] < self.rolling_window * 0.8:
+            return False
+
+        requests = now["num_requests"] - start["num_requests"]
+        failures = now["num_failures"] - start["num_failures"]
+        timed_requests = requests - (now["num_none_requests"] - start["num_none_requests"])
+        response_times = diff_response_time_dicts(now["response_times"], start["response_times"])
+        p95 = calculate_response_time_percentile(response_times, timed_requests, 0.95) if timed_requests > 0 else 0
+        error_rate = (failures / requests * 100) if requests > 0 else 0
+        return self.detector.check_window(self._step_users, requests, p95, error_rate)
+
+    @staticmethod
+    def _generator_saturated(start, end):
+        """Labels of the load generator processes that were saturated between start and end"""
+        monitor = get_monitor()
+        return monitor.saturated_between(start, end) if monitor is not None else []
+
+    def _snapshot(self):
+        """Copy of the cumulative aggregated stats at this moment"""
+        total = self.runner.stats.total
+        return {
+            "time": time.time(),
+            "num_requests": total.num_requests,
+            "num_failures": total.num_failures,
+            "num_none_requests": total.num_none_requests,
+            "total_response_time": total.total_response_time,
+            "response_times": dict(total.response_times),
+        }
+
+    def _write_results(self):
+        """Write all completed steps so run_tests.py can build the summary (also after Ctrl-C)"""
+        results = {
+            "config": {
+                "start_users": self.start_users,
+                "max_users": self.max_users,
+                "spawn_rate": self.spawn_rate,
+                "step_duration": self.step_duration,
+                "user_increment": self.user_increment,
+                "failure_rate_threshold": self.failure_rate_threshold,
+            },
+            "steps": self.steps,
+            "breaking_point_users": self.breaking_point_users,
+            "knee_users": self.detector.knee_users,
+            "stop_reason": self.detector.stop_reason if self.early_stop else None,
+        }
+        path = Path(BREAKPOINT_STEPS_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        tmp_path.replace(path)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    """Record the step that was running when the test was stopped early"""
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    if isinstance(environment.shape_class, BreakpointShape):
+        environment.shape_class.finish()
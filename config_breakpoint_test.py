@@ -18,6 +18,15 @@ from test_config import (
     BREAKPOINT_TEST_SPAWN_RATE,
     BREAKPOINT_TEST_STEP_DURATION,
     BREAKPOINT_TEST_USER_INCREMENT,
+    BREAKPOINT_TEST_FAILURE_RATE,
+    BREAKPOINT_TEST_MODE,
+    BREAKPOINT_EARLY_STOP,
+    BREAKPOINT_KNEE_THROUGHPUT_EFFICIENCY,
+    BREAKPOINT_KNEE_LATENCY_GROWTH,
+    BREAKPOINT_KNEE_CONFIRM_STEPS,
+    BREAKPOINT_MAX_LATENCY_FACTOR,
+    BREAKPOINT_MAX_ERROR_RATE,
+    BREAKPOINT_ROLLING_WINDOW,
     HTML_REPORT_PATH,
 )
 
@@ -30,6 +39,15 @@ BREAKPOINT_TEST_CONFIG = {
     "spawn_rate": BREAKPOINT_TEST_SPAWN_RATE,  # Users spawned per second
     "step_duration": BREAKPOINT_TEST_STEP_DURATION,  # Duration at each load level
     "user_increment": BREAKPOINT_TEST_USER_INCREMENT,  # Users added per step
+    "failure_rate_threshold": BREAKPOINT_TEST_FAILURE_RATE,  # Failure % that marks the breaking point
+    "mode": BREAKPOINT_TEST_MODE,  # "shape" (single run) or "subprocess" (one run per step)
+    "early_stop": BREAKPOINT_EARLY_STOP,  # Stop the ramp once past the saturation knee
+    "knee_throughput_efficiency": BREAKPOINT_KNEE_THROUGHPUT_EFFICIENCY,  # Below this, throughput has stopped scaling
+    "knee_latency_growth": BREAKPOINT_KNEE_LATENCY_GROWTH,  # p95 growth per step that indicates queueing
+    "knee_confirm_steps": BREAKPOINT_KNEE_CONFIRM_STEPS,  # Saturated steps before stopping
+    "max_latency_factor": BREAKPOINT_MAX_LATENCY_FACTOR,  # Abort when rolling p95 > factor x baseline
+    "max_error_rate": BREAKPOINT_MAX_ERROR_RATE,  # Abort when error rate (%) exceeds this
+    "rolling_window": BREAKPOINT_ROLLING_WINDOW,  # Seconds of live stats watched during a step
     "host": CHATBOT_URL,
     "web_ui": True,  # Enable web UI
     "html_report": "reports/breakpoint_test_report.html"
@@ -0,0 +1,38 @@
+"""
+Conversation Test Configuration
+Multi-turn conversations whose context grows with every turn
+
+This test exercises the path the single-question tests never reach: the
+backend loading and re-processing a conversation's history:
+- Each user holds a conversation for CONVERSATION_TURNS turns, sending the
+  conversation ID from the first answer back with every follow-up
+- Follow-ups come from scripted dialogue trees (sample_questions.py)
+- Latency is reported per turn number and per accumulated context length
+
+This file uses the centralized test_config.py for configuration.
+You can override defaults here or via environment variables.
+"""
+from test_config import (
+    CHATBOT_URL,
+    CONVERSATION_TEST_USERS,
+    CONVERSATION_TEST_SPAWN_RATE,
+    CONVERSATION_TEST_RUN_TIME,
+    CONVERSATION_TURNS,
+    CONVERSATION_ID_FIELD,
+    CONVERSATION_ID_HEADER,
+    CONVERSATION_SCRIPTS_PATH,
+)
+
+# Conversation test parameters
+# These can be overridden via environment variables in test_config.py
+CONVERSATION_TEST_CONFIG = {
+    "users": CONVERSATION_TEST_USERS,
+    "spawn_rate": CONVERSATION_TEST_SPAWN_RATE,
+    "run_time": CONVERSATION_TEST_RUN_TIME,
+    "turns": CONVERSATION_TURNS,  # Turns per conversation
+    "id_field": CONVERSATION_ID_FIELD,  # Request / response field of the conversation ID
+    "id_header": CONVERSATION_ID_HEADER,  # Response header fallback for the conversation ID
+    "scripts_path": CONVERSATION_SCRIPTS_PATH,  # Dialogue trees (empty = sample_questions.py)
+    "host": CHATBOT_URL,
+    "html_report": "reports/conversation_test_report.html"
+}
@@ -16,6 +16,11 @@ from test_config import (
     ENDURANCE_TEST_USERS,
     ENDURANCE_TEST_SPAWN_RATE,
     ENDURANCE_TEST_RUN_TIME,
+    ENDURANCE_WINDOW_SECONDS,
+    ENDURANCE_WARMUP_SECONDS,
+    ENDURANCE_MAX_LATENCY_DRIFT_PERCENT,
+    ENDURANCE_MAX_ERROR_RATE_INCREASE,
+    ENDURANCE_ANALYSIS_PATH,
     HTML_REPORT_PATH,
 )
 
@@ -28,6 +33,12 @@ ENDURANCE_TEST_CONFIG = {
     "run_time": ENDURANCE_TEST_RUN_TIME,  # Long duration (10 minutes default)
     "host": CHATBOT_URL,
     "web_ui": True,  # Enable web UI
-    "html_report": "reports/endurance_test_report.html"
+    "html_report": "reports/endurance_test_report.html",
+    # Degradation analysis (see degradation.py)
+    "window_seconds": ENDURANCE_WINDOW_SECONDS,  # Length of each analysis window
+    "warmup_seconds": ENDURANCE_WARMUP_SECONDS,  # Ramp-up excluded from the trend
+    "max_latency_drift_percent": ENDURANCE_MAX_LATENCY_DRIFT_PERCENT,  # p95 TTFT / total latency drift limit
+    "max_error_rate_increase": ENDURANCE_MAX_ERROR_RATE_INCREASE,  # Error rate drift limit (percentage points)
+    "analysis_path": ENDURANCE_ANALYSIS_PATH,
 }
 
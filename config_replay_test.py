@@ -0,0 +1,35 @@
+"""
+Replay Test Configuration
+Replays recorded production traffic on its original inter-arrival schedule
+
+This test reproduces real, bursty arrival patterns (e.g. a peak-hour incident)
+instead of the smooth closed-loop load of the other tests:
+- Requests are sent at their recorded time offsets (optionally sped up)
+- Requests of one recorded session are sent in order by one virtual user
+- Late requests are counted, so an under-provisioned replay is visible
+
+This file uses the centralized test_config.py for configuration.
+You can override defaults here or via environment variables.
+"""
+from test_config import (
+    CHATBOT_URL,
+    REPLAY_LOG_PATH,
+    REPLAY_SPEEDUP,
+    REPLAY_TEST_USERS,
+    REPLAY_TEST_SPAWN_RATE,
+    REPLAY_TEST_RUN_TIME,
+    REPLAY_TEST_TAIL,
+)
+
+# Replay test parameters - users and run time are derived from the log when left at 0 / empty
+# These can be overridden via environment variables in test_config.py
+REPLAY_TEST_CONFIG = {
+    "log_path": REPLAY_LOG_PATH,  # Recorded traffic log (CSV / JSONL)
+    "speedup": REPLAY_SPEEDUP,  # Replay speed-up factor
+    "users": REPLAY_TEST_USERS,  # 0 = twice the peak number of overlapping sessions
+    "spawn_rate": REPLAY_TEST_SPAWN_RATE,  # 0 = all users at once
+    "run_time": REPLAY_TEST_RUN_TIME,  # Empty = replay length + tail
+    "tail_seconds": REPLAY_TEST_TAIL,  # Time left for the last sessions to finish
+    "host": CHATBOT_URL,
+    "html_report": "reports/replay_test_report.html"
+}
@@ -0,0 +1,230 @@
+"""
+Connection Statistics
+New vs reused HTTP connections, TLS handshake time and TLS session resumption
+
+Behind a CDN most production clients keep their connection open and, when
+they do open a new one, resume their TLS session instead of doing a full
+handshake. A load test that opens a fresh connection per request measures a
+very different server (and load generator) than one that never reconnects,
+so the connection behaviour is configurable (see "Connection Configuration"
+in test_config.py) and measured:
+- new_connections: TCP (+ TLS) connections opened by the users' connection
+  pools; every other request reused an open connection
+- tls_handshakes / tls_resumed: TLS handshakes done and how many of them
+  resumed an earlier session of the same user
+- handshake time: TLS handshake duration (HDR histogram, microseconds)
+
+Each user gets its own connection pool (TrackingClientPool) and, for HTTPS,
+its own SSL context (TrackingSSLContext) holding the user's last TLS session,
+like a browser would. Workers ship the counts of their last report interval to
+the master, which adds them up.
+"""
+import json
+import time
+from pathlib import Path
+
+import gevent.ssl
+from geventhttpclient.client import HTTPClientPool
+
+from latency_histogram import HdrHistogram
+
+HANDSHAKE_PERCENTILES = (50, 95)
+
+
+class ConnectionStats:
+    """Connection and TLS handshake counts of one process"""
+
+    def __init__(self):
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.tls_resumed = 0
+        self.handshake_us = HdrHistogram(significant_digits=2)
+
+    def record_connection(self, sock=None):
+        self.new_connections += 1
+
+    def record_handshake(self, seconds, resumed):
+        self.tls_handshakes += 1
+        self.tls_resumed += bool(resumed)
+        self.handshake_us.record(seconds * 1_000_000)
+
+    def take(self):
+        """Counts recorded so far (returned as a new ConnectionStats); this one starts over"""
+        taken = ConnectionStats()
+        taken.merge(self)
+        self.new_connections = self.tls_handshakes = self.tls_resumed = 0
+        self.handshake_us = HdrHistogram(significant_digits=2)
+        return taken
+
+    def merge(self, other):
+        self.new_connections += other.new_connections
+        self.tls_handshakes += other.tls_handshakes
+        self.tls_resumed += other.tls_resumed
+        self.handshake_us.merge(other.handshake_us)
+
+    def to_dict(self):
+        return {
+            "new_connections": self.new_connections,
+            "tls_handshakes": self.tls_handshakes,
+            "tls_resumed": self.tls_resumed,
+            "handshake_us": self.handshake_us.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.new_connections = data["new_connections"]
+        stats.tls_handshakes = data["tls_handshakes"]
+        stats.tls_resumed = data["tls_resumed"]
+        stats.handshake_us = HdrHistogram.from_dict(data["handshake_us"])
+        return stats
+
+    def __bool__(self):
+        return bool(self.new_connections or self.tls_handshakes)
+
+    def summary(self, requests):
+        """
+        Connection reuse and TLS handshake figures of a run
+
+        Args:
+            requests: Requests sent in the run (all Locust requests, e.g. environment.stats.total.num_requests)
+
+        Returns:
+            dict: requests, new / reused connections, reuse %, requests per connection, TLS handshake
+            counts, resumed %, and handshake_ms_mean / _p50 / _p95 / _max (None without TLS)
+        """
+        reused = max(requests - self.new_connections, 0)
+        summary = {
+            "requests": requests,
+            "new_connections": self.new_connections,
+            "reused_connections": reused,
+            "reuse_percent": reused / requests * 100 if requests else None,
+            "requests_per_connection": requests / self.new_connections if self.new_connections else None,
+            "tls_handshakes": self.tls_handshakes,
+            "tls_resumed": self.tls_resumed,
+            "tls_resumed_percent": self.tls_resumed / self.tls_handshakes * 100 if self.tls_handshakes else None,
+        }
+        histogram = self.handshake_us
+        has_handshakes = histogram.total_count > 0
+        summary["handshake_ms_mean"] = histogram.mean_us / 1000 if has_handshakes else None
+        for percentile in HANDSHAKE_PERCENTILES:
+            summary[f"handshake_ms_p{percentile}"] = (
+                histogram.value_at_percentile(percentile) / 1000 if has_handshakes else None
+            )
+        summary["handshake_ms_max"] = histogram.max_us / 1000 if has_handshakes else None
+        return summary
+
+
+class TrackingSSLSocket(gevent.ssl.SSLSocket):
+    """SSL socket that leaves its TLS session with its context when it is closed"""
+
+    def close(self):
+        # TLS 1.3 session tickets arrive after the handshake, so the session is taken at the end
+        self.context.remember_session(self)
+        super().close()
+
+
+class TrackingSSLContext(gevent.ssl.SSLContext):
+    """SSL context that times TLS handshakes and (optionally) resumes the last TLS session"""
+    sslsocket_class = TrackingSSLSocket
+    stats = None
+    resume_sessions = True
+    _session = None
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True, suppress_ragged_eofs=True,
+                    server_hostname=None, session=None):
+        if session is None and self.resume_sessions:
+            session = self._session
+        start = time.perf_counter()
+        ssl_sock = super().wrap_socket(
+            sock, server_side=server_side, do_handshake_on_connect=do_handshake_on_connect,
+            suppress_ragged_eofs=suppress_ragged_eofs, server_hostname=server_hostname, session=session,
+        )
+        if self.stats is not None:
+            self.stats.record_handshake(time.perf_counter() - start, ssl_sock.session_reused)
+        self.remember_session(ssl_sock)
+        return ssl_sock
+
+    def remember_session(self, ssl_sock):
+        """Keep the socket's TLS session for the next connection (resume_sessions only)"""
+        if not self.resume_sessions:
+            return
+        try:
+            session = ssl_sock.session
+        except (OSError, ValueError):
+            return
+        # A TLS 1.3 session right after the handshake has no ticket yet: keep the ticket of an earlier one
+        if session is not None and (self._session is None or session.has_ticket or not self._session.has_ticket):
+            self._session = session
+
+
+def ssl_context_factory(stats, insecure=True, resume_sessions=True):
+    """
+    SSL context factory for geventhttpclient (FastHttpUser.ssl_context_factory)
+
+    Args:
+        stats: ConnectionStats the handshakes are counted in
+        insecure: Skip certificate verification (FastHttpUser.insecure)
+        resume_sessions: Resume the last TLS session when opening a new connection
+
+    Returns:
+        callable: Factory returning a new TrackingSSLContext per call (one per user and host)
+    """
+    def create_context(cafile=None):
+        context = TrackingSSLContext(gevent.ssl.PROTOCOL_TLS_CLIENT)
+        if insecure:
+            context.check_hostname = False
+            context.verify_mode = gevent.ssl.CERT_NONE
+        elif cafile:
+            context.load_verify_locations(cafile=cafile)
+        else:
+            context.load_default_certs()
+        context.stats = stats
+        context.resume_sessions = resume_sessions
+        return context
+
+    return create_context
+
+
+class TrackingClientPool(HTTPClientPool):
+    """geventhttpclient client pool (one client per host) that counts the connections its clients open"""
+
+    def __init__(self, stats, **kw):
+        super().__init__(**kw)
+        self.stats = stats
+
+    def get_client(self, url):
+        count = len(self.clients)
+        client = super().get_client(url)
+        if len(self.clients) != count:
+            # First request to this host: after_connect is called for every connection its pool opens
+            client._connection_pool.after_connect = self.stats.record_connection
+        return client
+
+
+def save_summary(path, summary):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def format_summary(summary):
+    """Text lines: connection reuse, and TLS handshakes when there were any"""
+    lines = [
+        f"  Requests: {summary['requests']}, new connections: {summary['new_connections']}, "
+        f"reused: {summary['reused_connections']} ({_format(summary['reuse_percent'], 1)}%), "
+        f"requests per connection: {_format(summary['requests_per_connection'], 1)}"
+    ]
+    if summary["tls_handshakes"]:
+        lines.append(
+            f"  TLS handshakes: {summary['tls_handshakes']}, resumed: {summary['tls_resumed']} "
+            f"({_format(summary['tls_resumed_percent'], 1)}%), handshake ms mean / p50 / p95 / max: "
+            f"{_format(summary['handshake_ms_mean'], 1)} / {_format(summary['handshake_ms_p50'], 1)} / "
+            f"{_format(summary['handshake_ms_p95'], 1)} / {_format(summary['handshake_ms_max'], 1)}"
+        )
+    return "\n".join(lines)
+
+
+def _format(value, digits):
+    return f"{value:.{digits}f}" if value is not None else "-"
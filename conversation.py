@@ -0,0 +1,425 @@
+"""
+Multi-Turn Conversations
+Scripted dialogues, conversation state and latency by turn / context length
+
+A conversation starts with the opening question of a dialogue tree (see
+DIALOGUE_TREES in sample_questions.py) and continues with one of the current
+question's follow-ups every turn. Once the script runs out, generic follow-ups
+keep it going until it has the configured number of turns. The conversation ID
+returned with the first answer is sent back with every follow-up, so the
+backend has to load and re-process the growing history.
+
+Context length is the number of characters the backend has to take into
+account for a turn: every earlier question and answer plus the new question.
+Answers are taken from the response body (SSE / NDJSON token frames or a JSON
+document), so it is measured the same way for every stream format.
+
+ConversationStats counts requests and HDR histograms of TTFT / total time per
+turn number and per context length bucket (<1k, 1k-2k, 2k-4k, ... characters),
+plus a least-squares line of latency over context length. The counts merge by
+adding, so workers send what they counted since their last report.
+"""
+import json
+import math
+import random
+import re
+from pathlib import Path
+
+from latency_histogram import HdrHistogram
+
+# Fields of a JSON response / stream frame that carry answer text, in order of preference
+TEXT_FIELDS = ("token", "content", "text", "delta", "response", "answer", "message")
+
+# Context length buckets double from this size (characters)
+CONTEXT_BUCKET_CHARS = 1000
+
+SUMMARY_PERCENTILES = (50, 95)
+
+# Payload of an SSE "data:" line
+SSE_DATA_PATTERN = re.compile(r"^data:[ \t]*(.*?)[ \t\r]*$", re.MULTILINE)
+
+
+def load_dialogue_trees(path=None):
+    """
+    Dialogue trees from a JSON file (a list of {"question", "category", "follow_ups"} nodes)
+
+    Args:
+        path: JSON file (None / empty = DIALOGUE_TREES from sample_questions.py)
+
+    Raises:
+        ValueError: The file has no dialogues or a node has no question
+    """
+    if not path:
+        from sample_questions import DIALOGUE_TREES
+        trees = DIALOGUE_TREES
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            trees = json.load(f)
+    if not trees:
+        raise ValueError(f"No dialogues in {path or 'sample_questions.DIALOGUE_TREES'}")
+    for tree in trees:
+        _check_node(tree)
+    return trees
+
+
+def _check_node(node):
+    if not isinstance(node, dict) or not node.get("question"):
+        raise ValueError(f"Dialogue node without a question: {node!r}")
+    for follow_up in node.get("follow_ups", []):
+        _check_node(follow_up)
+
+
+class Conversation:
+    """State of one conversation: current node, turn number, conversation ID and context length"""
+
+    def __init__(self, tree, turns, follow_ups=(), category_of=None, rng=random):
+        self.turns = max(1, int(turns))
+        self.follow_ups = list(follow_ups)
+        self.category_of = category_of
+        self.rng = rng
+
+        self.turn = 0
+        self.conversation_id = None
+        self.history_chars = 0
+        self.finished = False
+        self.question = None
+        self._next_node = tree
+
+    @property
+    def context_chars(self):
+        """Characters of the history plus the question of the current turn"""
+        return self.history_chars + len(self.question or "")
+
+    def next_question(self):
+        """
+        Start the next turn
+
+        Returns:
+            tuple: (question, category)
+        """
+        node = self._next_node
+        self.turn += 1
+        if node is not None:
+            self.question = node["question"]
+            default = (self.category_of(self.question) if self.category_of and self.turn == 1 else None)
+            category = node.get("category") or default or ("Common" if self.turn == 1 else "Follow-up")
+            children = node.get("follow_ups") or []
+            self._next_node = self.rng.choice(children) if children else None
+        else:
+            self.question = self.rng.choice(self.follow_ups) if self.follow_ups else "Can you tell me more?"
+            category = "Follow-up"
+        return self.question, category
+
+    def complete_turn(self, answer, conversation_id=None):
+        """Add the answered turn to the history; the conversation ends after the last turn"""
+        self.history_chars += len(self.question or "") + len(answer or "")
+        if conversation_id:
+            self.conversation_id = conversation_id
+        if self.turn >= self.turns:
+            self.finished = True
+
+    def abandon(self):
+        """End the conversation after a failed turn (the next task starts a new one)"""
+        self.finished = True
+
+
+def parse_response(body, stream_format, id_field="conversation_id"):
+    """
+    Answer text and conversation ID of a chat response
+
+    Args:
+        body: Response body (StreamTimings.body)
+        stream_format: "sse", "ndjson", "raw" or "buffered"
+        id_field: Field carrying the conversation ID (None = do not look for one)
+
+    Returns:
+        tuple: (answer text, conversation ID or None)
+    """
+    frames = split_frames(body, stream_format)
+    id_fields = _id_fields(id_field) if id_field else None
+    texts = []
+    conversation_id = None
+    for frame, value in zip(frames, decode_frames(frames)):
+        if value is None or isinstance(value, str):
+            texts.append(frame if value is None else value)
+        elif isinstance(value, dict):
+            if id_fields and conversation_id is None:
+                conversation_id = _conversation_id(value, id_fields)
+            texts.append(_text_of(value))
+    return "".join(texts), conversation_id
+
+
+def split_frames(body, stream_format):
+    """
+    Payloads of a response: the data of every SSE event / every NDJSON line, or the whole body
+
+    Returns:
+        list: Frame strings ("[DONE]" and empty frames left out)
+    """
+    body = body or ""
+    if stream_format == "sse":
+        return [frame for frame in SSE_DATA_PATTERN.findall(body) if frame and frame != "[DONE]"]
+    if stream_format == "ndjson":
+        return [line for line in (line.strip() for line in body.split("\n")) if line]
+    return [body] if body else []
+
+
+def decode_frames(frames):
+    """
+    JSON value of every frame (None = not JSON)
+
+    A stream of JSON frames is decoded with one json.loads call over all of
+    them, which is many times faster than one call per frame; only streams
+    with non-JSON frames are decoded frame by frame.
+    """
+    if not frames:
+        return []
+    if len(frames) > 1 and all(frame[:1] in ("{", "[", '"') for frame in frames):
+        try:
+            values = json.loads("[" + ",".join(frames) + "]")
+            if len(values) == len(frames):
+                return values
+        except ValueError:
+            pass
+    return [_json_or_none(frame) for frame in frames]
+
+
+def _json_or_none(text):
+    try:
+        return json.loads(text) if text else None
+    except ValueError:
+        return None
+
+
+def _id_fields(id_field):
+    """id_field and its camelCase form ("conversation_id" -> "conversationId")"""
+    camel_case = "".join(part.capitalize() if i else part for i, part in enumerate(id_field.split("_")))
+    return (id_field, camel_case)
+
+
+def _conversation_id(value, id_fields):
+    """Conversation ID from one of id_fields or a nested {"conversation": {"id"}}"""
+    for field in id_fields:
+        if value.get(field) not in (None, ""):
+            return str(value[field])
+    conversation = value.get("conversation")
+    if isinstance(conversation, dict) and conversation.get("id") not in (None, ""):
+        return str(conversation["id"])
+    return None
+
+
+def _text_of(value):
+    """Answer text of one JSON object (also OpenAI-style {"choices": [{"delta": {"content"}}]})"""
+    for field in TEXT_FIELDS:
+        text = value.get(field)
+        if isinstance(text, str):
+            return text
+        if isinstance(text, dict):
+            text = _text_of(text)
+            if text:
+                return text
+    choices = value.get("choices")
+    if isinstance(choices, list) and choices and isinstance(choices[0], dict):
+        return _text_of(choices[0])
+    return ""
+
+
+def context_bucket(chars):
+    """Index of the context length bucket: 0 = under CONTEXT_BUCKET_CHARS, then doubling"""
+    if chars < CONTEXT_BUCKET_CHARS:
+        return 0
+    return int(math.log2(chars / CONTEXT_BUCKET_CHARS)) + 1
+
+
+def context_bucket_label(bucket):
+    if bucket == 0:
+        return f"<{CONTEXT_BUCKET_CHARS // 1000}k"
+    low = CONTEXT_BUCKET_CHARS * 2 ** (bucket - 1) // 1000
+    return f"{low}k-{low * 2}k"
+
+
+class _Series:
+    __slots__ = ("requests", "errors", "context_chars", "ttft_ms", "total_ms")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.context_chars = 0
+        self.ttft_ms = HdrHistogram(significant_digits=2)
+        self.total_ms = HdrHistogram(significant_digits=2)
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.context_chars += other.context_chars
+        self.ttft_ms.merge(other.ttft_ms)
+        self.total_ms.merge(other.total_ms)
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "context_chars": self.context_chars,
+            "ttft_ms": self.ttft_ms.to_dict(),
+            "total_ms": self.total_ms.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        series = cls()
+        series.requests = data["requests"]
+        series.errors = data["errors"]
+        series.context_chars = data["context_chars"]
+        series.ttft_ms = HdrHistogram.from_dict(data["ttft_ms"])
+        series.total_ms = HdrHistogram.from_dict(data["total_ms"])
+        return series
+
+
+class ConversationStats:
+    """Latency per turn number and per context length bucket, plus latency-over-context trend sums"""
+
+    def __init__(self):
+        self.conversations_started = 0
+        self.conversations_completed = 0
+        self.by_turn = {}
+        self.by_context = {}
+        # metric -> [n, sum x, sum y, sum x*x, sum x*y] with x = context chars, y = latency ms
+        self._fit = {"ttft_ms": [0, 0.0, 0.0, 0.0, 0.0], "total_ms": [0, 0.0, 0.0, 0.0, 0.0]}
+
+    def record(self, turn, context_chars, success, ttft_ms=None, total_ms=None):
+        """Count one turn (latencies of a successful response, None = not measured)"""
+        for table, key in ((self.by_turn, turn), (self.by_context, context_bucket(context_chars))):
+            series = table.get(key)
+            if series is None:
+                series = table[key] = _Series()
+            series.requests += 1
+            series.context_chars += context_chars
+            if not success:
+                series.errors += 1
+                continue
+            if ttft_ms is not None:
+                series.ttft_ms.record(ttft_ms * 1000)
+            if total_ms is not None:
+                series.total_ms.record(total_ms * 1000)
+        if not success:
+            return
+        for metric, value in (("ttft_ms", ttft_ms), ("total_ms", total_ms)):
+            if value is None:
+                continue
+            sums = self._fit[metric]
+            sums[0] += 1
+            sums[1] += context_chars
+            sums[2] += value
+            sums[3] += context_chars * context_chars
+            sums[4] += context_chars * value
+
+    def merge(self, other):
+        self.conversations_started += other.conversations_started
+        self.conversations_completed += other.conversations_completed
+        for table, other_table in ((self.by_turn, other.by_turn), (self.by_context, other.by_context)):
+            for key, series in other_table.items():
+                table.setdefault(key, _Series()).merge(series)
+        for metric, sums in other._fit.items():
+            self._fit[metric] = [a + b for a, b in zip(self._fit[metric], sums)]
+
+    def to_dict(self):
+        return {
+            "conversations_started": self.conversations_started,
+            "conversations_completed": self.conversations_completed,
+            "by_turn": [[turn, series.to_dict()] for turn, series in self.by_turn.items()],
+            "by_context": [[bucket, series.to_dict()] for bucket, series in self.by_context.items()],
+            "fit": self._fit,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.conversations_started = data["conversations_started"]
+        stats.conversations_completed = data["conversations_completed"]
+        stats.by_turn = {int(turn): _Series.from_dict(series) for turn, series in data["by_turn"]}
+        stats.by_context = {int(bucket): _Series.from_dict(series) for bucket, series in data["by_context"]}
+        stats._fit = {metric: list(sums) for metric, sums in data["fit"].items()}
+        return stats
+
+    def __bool__(self):
+        return bool(self.by_turn) or self.conversations_started > 0
+
+    def summary(self):
+        """
+        Latency by turn and by context length, and its trend over context length
+
+        Returns:
+            dict: conversations, by_turn / by_context rows, trend (metric -> ms per 1k characters)
+        """
+        return {
+            "conversations_started": self.conversations_started,
+            "conversations_completed": self.conversations_completed,
+            "by_turn": [dict(turn=turn, **_series_row(series)) for turn, series in sorted(self.by_turn.items())],
+            "by_context": [
+                dict(context=context_bucket_label(bucket), **_series_row(series))
+                for bucket, series in sorted(self.by_context.items())
+            ],
+            "trend": {metric: _fit_line(sums) for metric, sums in self._fit.items()},
+        }
+
+
+def _series_row(series):
+    row = {
+        "requests": series.requests,
+        "errors": series.errors,
+        "error_rate": series.errors / series.requests * 100 if series.requests else 0.0,
+        "mean_context_chars": series.context_chars / series.requests if series.requests else 0.0,
+    }
+    for metric in ("ttft_ms", "total_ms"):
+        histogram = getattr(series, metric)
+        for percentile in SUMMARY_PERCENTILES:
+            value = histogram.value_at_percentile(percentile)
+            row[f"p{percentile}_{metric}"] = value / 1000 if value is not None else None
+    return row
+
+
+def _fit_line(sums):
+    """Least-squares latency = intercept + slope * context chars (None with too little spread)"""
+    n, sum_x, sum_y, sum_xx, sum_xy = sums
+    if n < 2:
+        return None
+    var_x = sum_xx - sum_x * sum_x / n
+    if var_x <= 0:
+        return None
+    slope = (sum_xy - sum_x * sum_y / n) / var_x
+    return {
+        "samples": n,
+        "ms_per_1k_chars": slope * 1000,
+        "intercept_ms": (sum_y - slope * sum_x) / n,
+    }
+
+
+def save_stats(path, summary):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def format_summary(summary):
+    """Text tables of latency by turn and by context length"""
+    def ms(value):
+        return f"{value:.0f}" if value is not None else "-"
+
+    lines = [
+        f"Conversations: {summary['conversations_started']} started, {summary['conversations_completed']} completed",
+        f"{'Turn':<10} {'Requests':>8} {'Errors':>7} {'Context':>8} {'p50 TTFT':>9} {'p95 TTFT':>9} {'p50 total':>10} {'p95 total':>10}",
+    ]
+    for key, rows in (("turn", summary["by_turn"]), ("context", summary["by_context"])):
+        if key == "context":
+            lines.append(f"{'Context':<10}")
+        for row in rows:
+            lines.append(
+                f"{str(row[key]):<10} {row['requests']:>8} {row['errors']:>7} {row['mean_context_chars']:>8.0f} "
+                f"{ms(row['p50_ttft_ms']):>9} {ms(row['p95_ttft_ms']):>9} {ms(row['p50_total_ms']):>10} {ms(row['p95_total_ms']):>10}"
+            )
+    for metric, trend in summary["trend"].items():
+        if trend is not None:
+            lines.append(f"{metric}: {trend['ms_per_1k_chars']:+.1f} ms per 1k characters of context "
+                         f"({trend['intercept_ms']:.0f} ms at zero context, {trend['samples']} samples)")
+    return "\n".join(lines)
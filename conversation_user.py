@@ -0,0 +1,141 @@
+"""
+Conversation Test User
+Holds multi-turn conversations instead of sending independent questions
+
+Used by `python run_tests.py conversation`:
+    locust -f conversation_user.py --headless --host ...
+
+Importing locustfile registers its event listeners (TTF writer, shared login
+sessions, generator health, SLOs), so a conversation run produces the same
+reports as the other tests; its TTF rows also carry the turn number and the
+context length. Every task sends one turn of the user's current conversation
+and the user thinks for WAIT_TIME_MIN..WAIT_TIME_MAX seconds between turns. A
+failed turn ends the conversation; the next task starts a new one.
+
+Latency per turn and per context length is counted in every process, sent to
+the master with each report and printed / saved to CONVERSATION_STATS_PATH at
+the end (see conversation.py).
+"""
+import random
+
+from locust import between, events, task
+from locust.runners import WorkerRunner
+
+from config_conversation_test import CONVERSATION_TEST_CONFIG
+from conversation import Conversation, ConversationStats, format_summary, load_dialogue_trees, save_stats
+from locustfile import QUESTION_BANK, ChatbotUser
+from sample_questions import FOLLOW_UP_MESSAGES
+from test_config import CONVERSATION_STATS_PATH, WAIT_TIME_MAX, WAIT_TIME_MIN
+
+# Dialogue trees (loaded on test start)
+DIALOGUE_TREES = None
+
+# Conversation counts of this process; workers send them with every report and start over
+CONVERSATION_STATS = ConversationStats()
+
+# Warn once per process when the chatbot returns no conversation ID
+MISSING_ID_WARNED = False
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Load the dialogue trees and reset the counts"""
+    global DIALOGUE_TREES, CONVERSATION_STATS
+    CONVERSATION_STATS = ConversationStats()
+    DIALOGUE_TREES = load_dialogue_trees(CONVERSATION_TEST_CONFIG["scripts_path"])
+    if not isinstance(environment.runner, WorkerRunner):
+        print(f"Conversations: {len(DIALOGUE_TREES)} dialogues, {CONVERSATION_TEST_CONFIG['turns']} turns each")
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    """Print and save latency by turn and context length (master / local process)"""
+    if isinstance(environment.runner, WorkerRunner) or not CONVERSATION_STATS:
+        return
+    summary = CONVERSATION_STATS.summary()
+    try:
+        save_stats(CONVERSATION_STATS_PATH, summary)
+    except OSError as e:
+        print(f"WARNING: Could not write conversation stats: {e}")
+    print(f"\nLatency by conversation turn and context length (ms) - saved to {CONVERSATION_STATS_PATH}")
+    print(format_summary(summary))
+
+
+@events.report_to_master.add_listener
+def on_report_to_master(client_id, data, **kwargs):
+    global CONVERSATION_STATS
+    if CONVERSATION_STATS:
+        data["conversations"] = CONVERSATION_STATS.to_dict()
+        CONVERSATION_STATS = ConversationStats()
+
+
+@events.worker_report.add_listener
+def on_worker_report(client_id, data, **kwargs):
+    if "conversations" in data:
+        CONVERSATION_STATS.merge(ConversationStats.from_dict(data["conversations"]))
+
+
+class ConversationUser(ChatbotUser):
+    """
+    User that holds scripted multi-turn conversations
+
+    The conversation ID from the chatbot's answer is sent back in
+    CONVERSATION_ID_FIELD with every follow-up. It is read from the response
+    body, or from the CONVERSATION_ID_HEADER response header.
+    """
+    wait_time = between(WAIT_TIME_MIN, WAIT_TIME_MAX)
+    conversation = None
+    # Every answer is needed for the next turn's context and conversation ID
+    decode_answers = True
+    conversation_id_field = CONVERSATION_TEST_CONFIG["id_field"]
+
+    @task
+    def send_turn(self):
+        """Send the next turn of the current conversation (starting a new one when it has ended)"""
+        if not self._ensure_authenticated():
+            return
+
+        if self.conversation is None or self.conversation.finished:
+            self.conversation = Conversation(
+                random.choice(DIALOGUE_TREES),
+                CONVERSATION_TEST_CONFIG["turns"],
+                FOLLOW_UP_MESSAGES,
+                category_of=lambda question: QUESTION_BANK.category_of(question, default=None),
+            )
+            CONVERSATION_STATS.conversations_started += 1
+
+        question, category = self.conversation.next_question()
+        payload_fields = None
+        if self.conversation.conversation_id is not None:
+            payload_fields = {CONVERSATION_TEST_CONFIG["id_field"]: self.conversation.conversation_id}
+        context = {"conversation_turn": self.conversation.turn, "context_chars": self.conversation.context_chars}
+        self.post_chat_message(question, category, context, payload_fields)
+
+    def on_chat_response(self, status, timings, headers):
+        """Count the turn and keep the conversation ID and the answer for the next turn"""
+        global MISSING_ID_WARNED
+        conversation = self.conversation
+        if conversation is None:
+            return
+        success = status == "Success"
+        CONVERSATION_STATS.record(
+            conversation.turn,
+            conversation.context_chars,
+            success,
+            timings.ttft_ms if success else None,
+            timings.total_ms if success else None,
+        )
+        if not success:
+            conversation.abandon()
+            return
+
+        # Decoded once by post_chat_message (decode_answers)
+        answer = self.last_answer or ""
+        conversation_id = self.last_conversation_id or headers.get(CONVERSATION_TEST_CONFIG["id_header"])
+        if conversation_id is None and conversation.conversation_id is None and not MISSING_ID_WARNED:
+            MISSING_ID_WARNED = True
+            print(f"NOTE: The chatbot returned no conversation ID (field '{CONVERSATION_TEST_CONFIG['id_field']}', "
+                  f"header '{CONVERSATION_TEST_CONFIG['id_header']}') - follow-ups are sent without one")
+        conversation.complete_turn(answer, conversation_id)
+        if conversation.finished:
+            CONVERSATION_STATS.conversations_completed += 1
@@ -0,0 +1,249 @@
+"""
+Endurance Degradation Analysis
+Time-windowed latency / error trends of a long run with a pass/fail verdict
+
+The TTF rows of a run (ttf_data.csv) are grouped into fixed windows (one
+minute by default) per question category and overall ("All"). Every window
+gets p50/p95 TTFT, p50/p95 total latency, error rate and RPS; latencies are
+counted in small HDR histograms, so memory depends on the number of windows,
+not on the number of requests, even for 10-hour runs.
+
+A least-squares line is fitted through each metric over the windows after the
+warm-up. Drift is the change of the fitted line from the first to the last
+window: in percent for latencies, in percentage points for the error rate.
+The run fails when p95 TTFT or p95 total latency drifts up by more than
+max_latency_drift_percent, or the error rate by more than
+max_error_rate_increase points, in any category with enough data.
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+
+from latency_histogram import HdrHistogram
+from run_registry import read_ttf_rows
+
+ALL_CATEGORIES = "All"
+
+# Metrics checked against the latency drift limit
+GATED_LATENCY_METRICS = ("p95_ttft_ms", "p95_total_ms")
+TREND_METRICS = ("p50_ttft_ms", "p95_ttft_ms", "p50_total_ms", "p95_total_ms", "error_rate", "rps")
+
+
+class _Window:
+    __slots__ = ("requests", "errors", "ttft", "total")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.ttft = HdrHistogram(significant_digits=2)
+        self.total = HdrHistogram(significant_digits=2)
+
+
+class DegradationAnalyzer:
+    """Collects request results into time windows and judges their trend"""
+
+    def __init__(self, window_seconds=60, warmup_seconds=60, max_latency_drift_percent=25.0,
+                 max_error_rate_increase=5.0, min_window_requests=10, min_windows=3):
+        self.window_seconds = float(window_seconds)
+        self.warmup_seconds = float(warmup_seconds)
+        self.max_latency_drift_percent = max_latency_drift_percent
+        self.max_error_rate_increase = max_error_rate_increase
+        self.min_window_requests = min_window_requests
+        self.min_windows = min_windows
+
+        self.start = None
+        self.end = None
+        self._windows = {}  # (window index, category) -> _Window
+
+    @classmethod
+    def from_config(cls, config):
+        """Build an analyzer from an ENDURANCE_TEST_CONFIG dict"""
+        return cls(
+            window_seconds=config["window_seconds"],
+            warmup_seconds=config["warmup_seconds"],
+            max_latency_drift_percent=config["max_latency_drift_percent"],
+            max_error_rate_increase=config["max_error_rate_increase"],
+        )
+
+    def add(self, timestamp, category, success, ttft_ms=None, total_ms=None):
+        """
+        Record one request
+
+        Args:
+            timestamp: Epoch seconds when the request completed
+            category: Question category
+            success: False for failed requests (counted in the error rate only)
+            ttft_ms, total_ms: Latencies of a successful request (None = not measured)
+        """
+        if self.start is None:
+            # Rows of several workers are only roughly ordered; windows before the first row are fine
+            self.start = timestamp
+        self.end = timestamp if self.end is None else max(self.end, timestamp)
+        index = int((timestamp - self.start) // self.window_seconds)
+        for key in ((index, category), (index, ALL_CATEGORIES)):
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = _Window()
+            window.requests += 1
+            if not success:
+                window.errors += 1
+                continue
+            if ttft_ms is not None:
+                window.ttft.record(ttft_ms * 1000)
+            if total_ms is not None:
+                window.total.record(total_ms * 1000)
+
+    def add_ttf_csv(self, path, run_entries=None):
+        """
+        Feed the rows of a ttf_data.csv file (streamed, not loaded into memory)
+
+        Args:
+            path: ttf_data.csv
+            run_entries: RunIndex records of the run to analyze (None = every row of the file)
+        """
+        header, rows = read_ttf_rows(path, run_entries)
+        for values in rows:
+            row = dict(zip(header, values))
+            try:
+                timestamp = datetime.fromisoformat(row["Timestamp"]).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.add(
+                timestamp,
+                row.get("Question_Category") or "Unknown",
+                row.get("Status") == "Success",
+                ttft_ms=_to_float(row.get("TTF_ms")),
+                total_ms=_to_float(row.get("Total_Response_Time_ms")),
+            )
+
+    def windows(self):
+        """Per-window metrics, ordered by category and time"""
+        rows = []
+        for (index, category), window in sorted(self._windows.items(), key=lambda item: (item[0][1], item[0][0])):
+            window_start = self.start + index * self.window_seconds
+            # The last window usually ends with the run, not after a full window
+            duration = min(self.window_seconds, max(1.0, self.end - window_start))
+            rows.append({
+                "category": category,
+                "window": index,
+                "offset_s": index * self.window_seconds,
+                "requests": window.requests,
+                "errors": window.errors,
+                "error_rate": window.errors / window.requests * 100 if window.requests else 0.0,
+                "rps": window.requests / duration,
+                "p50_ttft_ms": _percentile_ms(window.ttft, 50),
+                "p95_ttft_ms": _percentile_ms(window.ttft, 95),
+                "p50_total_ms": _percentile_ms(window.total, 50),
+                "p95_total_ms": _percentile_ms(window.total, 95),
+                "warmup": index * self.window_seconds < self.warmup_seconds,
+                "partial": duration < self.window_seconds,
+            })
+        return rows
+
+    def result(self):
+        """
+        Trends and verdict
+
+        Returns:
+            dict: windows, trends (category -> metric -> slope / drift), failures, passed
+                  (None when there were too few windows to judge)
+        """
+        windows = self.windows()
+        trends = {}
+        failures = []
+        judged = False
+        for category in sorted({window["category"] for window in windows}):
+            series = [
+                window for window in windows
+                if window["category"] == category and not window["warmup"] and not window["partial"]
+                and window["requests"] >= self.min_window_requests
+            ]
+            if len(series) < self.min_windows:
+                continue
+            judged = True
+            trends[category] = {}
+            for metric in TREND_METRICS:
+                points = [(window["offset_s"] / 60, window[metric]) for window in series if window[metric] is not None]
+                trend = _fit_trend(points)
+                if trend is None:
+                    continue
+                trends[category][metric] = trend
+                if metric in GATED_LATENCY_METRICS and trend["drift_percent"] is not None \
+                        and trend["drift_percent"] > self.max_latency_drift_percent:
+                    failures.append(f"{category}: {metric} drifted {trend['drift_percent']:+.1f}% "
+                                    f"(limit {self.max_latency_drift_percent:g}%)")
+                if metric == "error_rate" and trend["drift"] > self.max_error_rate_increase:
+                    failures.append(f"{category}: error rate rose {trend['drift']:+.1f} points "
+                                    f"(limit {self.max_error_rate_increase:g})")
+        return {
+            "window_seconds": self.window_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "max_latency_drift_percent": self.max_latency_drift_percent,
+            "max_error_rate_increase": self.max_error_rate_increase,
+            "windows": windows,
+            "trends": trends,
+            "failures": failures,
+            "passed": (not failures) if judged else None,
+        }
+
+
+def save_result(path, result):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+def format_trends(result, metrics=("p95_ttft_ms", "p95_total_ms", "error_rate", "rps")):
+    """Text table of start / end of the fitted trends per category"""
+    lines = [f"{'Category':<20} {'Metric':<14} {'Start':>10} {'End':>10} {'Drift':>10} {'Slope/min':>10}"]
+    for category, trends in result["trends"].items():
+        for metric in metrics:
+            trend = trends.get(metric)
+            if trend is None:
+                continue
+            if metric == "error_rate":
+                drift = f"{trend['drift']:+.1f}pt"
+            elif trend["drift_percent"] is None:
+                drift = "-"
+            else:
+                drift = f"{trend['drift_percent']:+.1f}%"
+            lines.append(f"{category[:20]:<20} {metric:<14} {trend['start']:>10.1f} {trend['end']:>10.1f} "
+                         f"{drift:>10} {trend['slope_per_minute']:>+10.2f}")
+    return "\n".join(lines)
+
+
+def _fit_trend(points):
+    """Least-squares line through (minute, value) points"""
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return None
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+    first_x, last_x = points[0][0], points[-1][0]
+    start = mean_y + slope * (first_x - mean_x)
+    end = mean_y + slope * (last_x - mean_x)
+    return {
+        "slope_per_minute": slope,
+        "start": start,
+        "end": end,
+        "drift": end - start,
+        "drift_percent": (end - start) / start * 100 if start > 0 else None,
+        "windows": n,
+    }
+
+
+def _percentile_ms(histogram, percentile):
+    value = histogram.value_at_percentile(percentile)
+    return value / 1000 if value is not None else None
+
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
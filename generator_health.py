@@ -0,0 +1,232 @@
+"""
+Load Generator Health Monitor
+Samples the load generator's own resource usage while a test runs
+
+Latency that grows during a stress run can come from the chatbot or from our
+own box: a Locust process pinned at 100% CPU (or an event loop that cannot
+wake its greenlets on time) delays sending requests and reading responses,
+which shows up as slower response times that the server never caused.
+
+Every Locust process (local, master and each worker) runs one monitor:
+- a sampler greenlet records CPU%, RSS, open sockets, running users and the
+  mean and worst event-loop lag every `interval` seconds to a shared CSV time series
+- a probe greenlet sleeps for `lag_probe_interval` in a loop and measures how
+  late it wakes up; that delay is the scheduling lag every greenlet suffers
+
+A sample is "saturated" when CPU% or the mean loop lag of its interval is
+above its threshold, so a single stall (a GC pause, a burst of user setup) does
+not count. The first interval after start is a warm-up and is not recorded: it
+covers spawning the first users. Consecutive saturated samples are merged into
+periods, so a run or a breakpoint step can be checked against them afterwards.
+"""
+import time
+
+import gevent
+import psutil
+
+from ttf_writer import BufferedCsvWriter
+
+# Column layout of the generator health CSV file
+GENERATOR_HEALTH_CSV_HEADER = [
+    'Timestamp', 'Process', 'CPU_Percent', 'RSS_MB', 'Open_Sockets',
+    'Users', 'Loop_Lag_Mean_ms', 'Loop_Lag_Max_ms', 'Saturated'
+]
+
+# Monitor of this process, set by GeneratorHealthMonitor.start()
+_ACTIVE_MONITOR = None
+
+
+def get_monitor():
+    """Return the monitor running in this process (None if monitoring is disabled)"""
+    return _ACTIVE_MONITOR
+
+
+class GeneratorHealthMonitor:
+    """Samples this process's CPU, memory, sockets and event-loop lag"""
+
+    def __init__(self, runner, path, process_label="local", interval=2.0, lag_probe_interval=0.1,
+                 cpu_threshold=90.0, lag_threshold_ms=100.0):
+        self.runner = runner
+        self.process_label = process_label
+        self.interval = max(0.1, float(interval))
+        self.lag_probe_interval = max(0.01, float(lag_probe_interval))
+        self.cpu_threshold = cpu_threshold
+        self.lag_threshold_ms = lag_threshold_ms
+        self.writer = BufferedCsvWriter(path, GENERATOR_HEALTH_CSV_HEADER, batch_size=50,
+                                        flush_interval=max(self.interval, 5.0))
+
+        self.samples = 0
+        self.saturated_samples = 0
+        self.max_cpu_percent = 0.0
+        self.max_rss_mb = 0.0
+        self.max_open_sockets = 0
+        self.max_loop_lag_ms = 0.0
+        self.max_loop_lag_mean_ms = 0.0
+        # [start, end] epoch seconds of consecutive saturated samples
+        self.saturated_periods = []
+        # Latest summaries reported by workers (only used on the master)
+        self.remote_summaries = {}
+
+        self._process = psutil.Process()
+        # Lag of every probe since the last sample
+        self._window_lags_ms = []
+        self._warming_up = True
+        self._last_sample_at = None
+        self._greenlets = []
+        self._running = False
+
+    def start(self, prepare=True):
+        """Start sampling (prepare=False when another process owns the CSV header)"""
+        global _ACTIVE_MONITOR
+        if self._running:
+            return
+        _ACTIVE_MONITOR = self
+        self.writer.open(prepare=prepare)
+        # The first cpu_percent() call only sets the reference point
+        self._process.cpu_percent(None)
+        self._last_sample_at = time.time()
+        self._running = True
+        self._greenlets = [gevent.spawn(self._probe_loop), gevent.spawn(self._sample_loop)]
+
+    def stop(self):
+        """Take a final sample, stop the greenlets and flush the time series"""
+        if not self._running:
+            return
+        self._running = False
+        gevent.killall(self._greenlets, block=True, timeout=1)
+        self._greenlets = []
+        self.sample()
+        self.writer.close()
+
+    def sample(self):
+        """Record one sample of the process's resource usage (the warm-up interval is dropped)"""
+        now = time.time()
+        cpu_percent = self._process.cpu_percent(None)
+        lags_ms, self._window_lags_ms = self._window_lags_ms, []
+        if self._warming_up:
+            self._warming_up = False
+            self._last_sample_at = now
+            return
+        rss_mb = self._process.memory_info().rss / (1024 * 1024)
+        open_sockets = self._open_sockets()
+        users = self.runner.user_count if self.runner is not None else 0
+        loop_lag_mean_ms = sum(lags_ms) / len(lags_ms) if lags_ms else 0.0
+        loop_lag_max_ms = max(lags_ms, default=0.0)
+
+        saturated = cpu_percent >= self.cpu_threshold or loop_lag_mean_ms >= self.lag_threshold_ms
+        self.samples += 1
+        self.max_cpu_percent = max(self.max_cpu_percent, cpu_percent)
+        self.max_rss_mb = max(self.max_rss_mb, rss_mb)
+        self.max_open_sockets = max(self.max_open_sockets, open_sockets)
+        self.max_loop_lag_ms = max(self.max_loop_lag_ms, loop_lag_max_ms)
+        self.max_loop_lag_mean_ms = max(self.max_loop_lag_mean_ms, loop_lag_mean_ms)
+        if saturated:
+            self.saturated_samples += 1
+            # The sample covers the time since the previous one
+            if self.saturated_periods and self.saturated_periods[-1][1] >= self._last_sample_at:
+                self.saturated_periods[-1][1] = now
+            else:
+                self.saturated_periods.append([self._last_sample_at, now])
+        self._last_sample_at = now
+
+        self.writer.write_row([
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now)),
+            self.process_label,
+            round(cpu_percent, 1),
+            round(rss_mb, 1),
+            open_sockets,
+            users,
+            round(loop_lag_mean_ms, 1),
+            round(loop_lag_max_ms, 1),
+            saturated,
+        ])
+
+    def summary(self):
+        """Counters and saturated periods of this process"""
+        return {
+            "process": self.process_label,
+            "samples": self.samples,
+            "saturated_samples": self.saturated_samples,
+            "max_cpu_percent": round(self.max_cpu_percent, 1),
+            "max_rss_mb": round(self.max_rss_mb, 1),
+            "max_open_sockets": self.max_open_sockets,
+            "max_loop_lag_ms": round(self.max_loop_lag_ms, 1),
+            "max_loop_lag_mean_ms": round(self.max_loop_lag_mean_ms, 1),
+            "saturated_periods": self.saturated_periods,
+        }
+
+    def all_summaries(self):
+        """Summary of this process followed by the latest summary of every worker"""
+        return [self.summary()] + list(self.remote_summaries.values())
+
+    def saturated_between(self, start, end):
+        """
+        Check whether any load generator process was saturated in a time window
+
+        Args:
+            start: Window start (epoch seconds)
+            end: Window end (epoch seconds)
+
+        Returns:
+            list: Labels of the processes that were saturated during the window
+        """
+        saturated = []
+        for summary in self.all_summaries():
+            for period_start, period_end in summary["saturated_periods"]:
+                if period_start < end and period_end > start:
+                    saturated.append(summary["process"])
+                    break
+        return saturated
+
+    def _open_sockets(self):
+        """Number of open TCP/UDP sockets of this process"""
+        try:
+            net_connections = getattr(self._process, "net_connections", None) or self._process.connections
+            return len(net_connections(kind="inet"))
+        except (psutil.Error, OSError):
+            return 0
+
+    def _probe_loop(self):
+        """Background greenlet: measure how late the event loop wakes a sleeping greenlet"""
+        while self._running:
+            started = time.perf_counter()
+            gevent.sleep(self.lag_probe_interval)
+            lag_ms = (time.perf_counter() - started - self.lag_probe_interval) * 1000
+            self._window_lags_ms.append(lag_ms)
+
+    def _sample_loop(self):
+        """Background greenlet: take a sample every interval"""
+        while self._running:
+            gevent.sleep(self.interval)
+            try:
+                self.sample()
+            except psutil.Error as e:
+                print(f"WARNING: Generator health sample failed: {e}")
+
+
+def combine_summaries(summaries, max_saturated_percent=5.0):
+    """
+    Combine per-process summaries into a verdict for the whole run
+
+    Args:
+        summaries: List of GeneratorHealthMonitor.summary() dicts
+        max_saturated_percent: Share of saturated samples above which the run is invalid
+
+    Returns:
+        dict: Totals, the saturated processes and "valid" (False if results are not trustworthy)
+    """
+    samples = sum(s["samples"] for s in summaries)
+    saturated_samples = sum(s["saturated_samples"] for s in summaries)
+    saturated_percent = (saturated_samples / samples * 100) if samples else 0.0
+    return {
+        "valid": saturated_percent <= max_saturated_percent,
+        "samples": samples,
+        "saturated_samples": saturated_samples,
+        "saturated_percent": round(saturated_percent, 1),
+        "max_saturated_percent": max_saturated_percent,
+        "saturated_processes": [s["process"] for s in summaries if s["saturated_samples"]],
+        "max_cpu_percent": max((s["max_cpu_percent"] for s in summaries), default=0.0),
+        "max_loop_lag_ms": max((s["max_loop_lag_ms"] for s in summaries), default=0.0),
+        "max_loop_lag_mean_ms": max((s["max_loop_lag_mean_ms"] for s in summaries), default=0.0),
+        "processes": summaries,
+    }
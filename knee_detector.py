@@ -0,0 +1,117 @@
+"""
+Breakpoint Knee Detector
+Online detection of the saturation knee while the breakpoint ramp is running
+
+Two kinds of input are fed to the detector:
+- Completed steps (users, RPS, p95, error rate): used to find the knee, i.e. the
+  load level after which adding users no longer increases throughput while
+  latency keeps climbing.
+- Rolling windows inside the running step: used to abort immediately when the
+  system is clearly past its limits (error rate or p95 far above the baseline),
+  without waiting for the step to finish.
+
+Throughput scaling between two steps is measured as an efficiency:
+    efficiency = (rps_k / rps_{k-1} - 1) / (users_k / users_{k-1} - 1)
+1.0 means throughput grew linearly with users, 0 means it stopped growing.
+"""
+
+
+class KneeDetector:
+    """Tracks breakpoint steps and decides when the ramp should stop"""
+
+    def __init__(self, throughput_efficiency=0.25, latency_growth=1.2, confirm_steps=2,
+                 max_latency_factor=10.0, max_error_rate=25.0, min_window_requests=20):
+        self.throughput_efficiency = throughput_efficiency
+        self.latency_growth = latency_growth
+        self.confirm_steps = max(1, int(confirm_steps))
+        self.max_latency_factor = max_latency_factor
+        self.max_error_rate = max_error_rate
+        self.min_window_requests = min_window_requests
+
+        self.steps = []
+        self.baseline_p95 = None
+        self.knee_users = None
+        self.saturated_steps = 0
+        self.stop_reason = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a detector from a BREAKPOINT_TEST_CONFIG dict"""
+        return cls(
+            throughput_efficiency=config["knee_throughput_efficiency"],
+            latency_growth=config["knee_latency_growth"],
+            confirm_steps=config["knee_confirm_steps"],
+            max_latency_factor=config["max_latency_factor"],
+            max_error_rate=config["max_error_rate"],
+        )
+
+    @property
+    def should_stop(self):
+        return self.stop_reason is not None
+
+    def add_step(self, users, rps, p95, error_rate):
+        """
+        Record a completed step and update the knee estimate
+
+        Args:
+            users: Number of users during the step
+            rps: Requests per second measured in the step
+            p95: 95th percentile response time (ms) in the step
+            error_rate: Failure rate in percent
+
+        Returns:
+            dict: Scaling analysis for the step (efficiency, latency_ratio, saturated)
+        """
+        analysis = {"efficiency": None, "latency_ratio": None, "saturated": False}
+
+        if self.baseline_p95 is None and p95 > 0:
+            self.baseline_p95 = p95
+
+        previous = self.steps[-1] if self.steps else None
+        if previous and users > previous["users"] and previous["rps"] > 0:
+            user_growth = users / previous["users"] - 1
+            efficiency = (rps / previous["rps"] - 1) / user_growth
+            latency_ratio = p95 / previous["p95"] if previous["p95"] > 0 else 1.0
+            saturated = efficiency < self.throughput_efficiency and latency_ratio >= self.latency_growth
+            analysis = {"efficiency": efficiency, "latency_ratio": latency_ratio, "saturated": saturated}
+
+            if saturated:
+                if self.knee_users is None:
+                    # The last step where throughput still scaled is the knee
+                    self.knee_users = previous["users"]
+                self.saturated_steps += 1
+                if self.saturated_steps >= self.confirm_steps and self.stop_reason is None:
+                    self.stop_reason = (
+                        f"Saturation: throughput stopped scaling after {self.knee_users} users "
+                        f"for {self.saturated_steps} step(s) while p95 kept rising"
+                    )
+            else:
+                # Throughput recovered - the earlier flat step was noise
+                self.saturated_steps = 0
+                self.knee_users = None
+
+        if error_rate > self.max_error_rate and self.stop_reason is None:
+            self.stop_reason = f"Error rate {error_rate:.1f}% at {users} users exceeded {self.max_error_rate:g}%"
+
+        self.steps.append({"users": users, "rps": rps, "p95": p95, "error_rate": error_rate, **analysis})
+        return analysis
+
+    def check_window(self, users, requests, p95, error_rate):
+        """
+        Check a rolling window of the running step for conditions that justify stopping now
+
+        Returns:
+            bool: True if the ramp should stop immediately
+        """
+        if self.stop_reason is not None:
+            return True
+        if requests < self.min_window_requests:
+            return False
+        if error_rate > self.max_error_rate:
+            self.stop_reason = f"Rolling error rate {error_rate:.1f}% at {users} users exceeded {self.max_error_rate:g}%"
+        elif self.baseline_p95 and p95 > self.baseline_p95 * self.max_latency_factor:
+            self.stop_reason = (
+                f"Rolling p95 {p95:.0f}ms at {users} users exceeded "
+                f"{self.max_latency_factor:g}x the baseline p95 ({self.baseline_p95:.0f}ms)"
+            )
+        return self.stop_reason is not None
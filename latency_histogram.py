@@ -0,0 +1,279 @@
+"""
+Latency Histograms
+HDR-style histograms per question category and metric, corrected for coordinated omission
+
+Each histogram covers 1 microsecond to 1 hour with a fixed relative precision
+(3 significant digits = 0.1% by default), so p99 / p99.9 stay accurate while
+memory stays constant however long the run is: values are counted in
+log-linear buckets (the HdrHistogram layout) instead of being stored.
+
+Coordinated omission: a closed-loop user that is stuck waiting for a slow
+response does not send the requests it would otherwise have sent, so the
+stall is recorded once instead of for every request it delayed. Recording
+with an expected interval adds those missing samples (value - interval,
+value - 2 * interval, ... down to the interval), like HdrHistogram's
+recordValueWithExpectedInterval. Open-loop runs measure latency from the
+scheduled send time instead (see arrival_schedule.py), which needs no
+synthetic samples.
+
+Histograms are plain dicts of bucket counts, so they merge by adding counts:
+workers ship only what changed since their last report, and saved files of
+several runs can be merged later:
+    python latency_histogram.py merge run1.json run2.json -o merged.json
+    python latency_histogram.py summary merged.json
+"""
+import argparse
+import json
+from pathlib import Path
+
+# Metrics recorded per category
+TTFT = "ttft_ms"
+TOTAL = "total_ms"
+TOTAL_UNCORRECTED = "total_ms_uncorrected"
+INTER_TOKEN = "inter_token_ms"
+
+SUMMARY_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class HdrHistogram:
+    """Log-linear histogram of integer microsecond values"""
+
+    def __init__(self, highest_us=3_600_000_000, significant_digits=3):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError("significant_digits must be between 1 and 5")
+        self.highest_us = int(highest_us)
+        self.significant_digits = int(significant_digits)
+
+        # Sub-buckets must resolve 1 part in 10^digits of a value (x2 for the lower half of each bucket)
+        largest_single_unit = 2 * 10 ** self.significant_digits
+        self._sub_bucket_count_magnitude = (largest_single_unit - 1).bit_length()
+        self._sub_bucket_half_count_magnitude = self._sub_bucket_count_magnitude - 1
+        self._sub_bucket_count = 1 << self._sub_bucket_count_magnitude
+        self._sub_bucket_half_count = self._sub_bucket_count >> 1
+        self._sub_bucket_mask = self._sub_bucket_count - 1
+
+        self.counts = {}  # bucket index -> count (sparse)
+        self.total_count = 0
+        self.min_us = None
+        self.max_us = 0
+        self._total_us = 0
+
+    def record(self, value_us, count=1):
+        """Record a value (clamped to 0..highest_us) count times"""
+        value_us = min(max(0, int(value_us)), self.highest_us)
+        index = self._index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += count
+        self._total_us += value_us * count
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def record_corrected(self, value_us, expected_interval_us):
+        """Record a value plus the samples a stalled closed-loop sender would have produced"""
+        self.record(value_us)
+        if expected_interval_us <= 0 or value_us <= expected_interval_us:
+            return
+        missing = value_us - expected_interval_us
+        while missing >= expected_interval_us:
+            self.record(missing)
+            missing -= expected_interval_us
+
+    def value_at_percentile(self, percentile):
+        """Value (microseconds) at or below which `percentile` % of the recorded values fall"""
+        if self.total_count == 0:
+            return None
+        target = max(1, int(self.total_count * min(percentile, 100.0) / 100.0 + 0.5))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_us)
+        return self.max_us
+
+    def count_at_or_below(self, value_us):
+        """Number of recorded values in buckets at or below the bucket of value_us"""
+        index = self._index(min(max(0, int(value_us)), self.highest_us))
+        return sum(count for bucket, count in self.counts.items() if bucket <= index)
+
+    @property
+    def mean_us(self):
+        return self._total_us / self.total_count if self.total_count else None
+
+    def merge(self, other):
+        """Add another histogram with the same precision into this one"""
+        if other.significant_digits != self.significant_digits:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self._total_us += other._total_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def to_dict(self):
+        """JSON-serializable form (only the non-empty buckets)"""
+        return {
+            "significant_digits": self.significant_digits,
+            "highest_us": self.highest_us,
+            "total_count": self.total_count,
+            "total_us": self._total_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+            "counts": sorted(self.counts.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["highest_us"], data["significant_digits"])
+        histogram.counts = {int(index): int(count) for index, count in data["counts"]}
+        histogram.total_count = data["total_count"]
+        histogram._total_us = data["total_us"]
+        histogram.min_us = data["min_us"]
+        histogram.max_us = data["max_us"]
+        return histogram
+
+    def _index(self, value_us):
+        bucket_index = (value_us | self._sub_bucket_mask).bit_length() - self._sub_bucket_count_magnitude
+        sub_bucket_index = value_us >> bucket_index
+        return ((bucket_index + 1) << self._sub_bucket_half_count_magnitude) + sub_bucket_index - self._sub_bucket_half_count
+
+    def _highest_equivalent(self, index):
+        bucket_index = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self._sub_bucket_half_count
+            bucket_index = 0
+        return (sub_bucket_index << bucket_index) + (1 << bucket_index) - 1
+
+
+class LatencyHistograms:
+    """Histograms keyed by (question category, metric)"""
+
+    def __init__(self, significant_digits=3):
+        self.significant_digits = significant_digits
+        self.histograms = {}
+
+    def get(self, category, metric):
+        key = (category, metric)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = HdrHistogram(significant_digits=self.significant_digits)
+        return histogram
+
+    def record_response(self, category, timings, expected_interval_ms=0.0, lag_ms=0.0):
+        """
+        Record one successful chat response
+
+        Args:
+            category: Question category
+            timings: StreamTimings of the response (see stream_metrics.py)
+            expected_interval_ms: Closed-loop interval between a user's requests (0 = no correction)
+            lag_ms: Open loop: how late the request started after its scheduled send time
+        """
+        interval_us = expected_interval_ms * 1000
+        lag_us = lag_ms * 1000
+        if timings.total_ms is not None:
+            self.get(category, TOTAL_UNCORRECTED).record(timings.total_ms * 1000)
+            self.get(category, TOTAL).record_corrected(timings.total_ms * 1000 + lag_us, interval_us)
+        if timings.ttft_ms is not None:
+            self.get(category, TTFT).record_corrected(timings.ttft_ms * 1000 + lag_us, interval_us)
+        inter_token = self.get(category, INTER_TOKEN) if timings.inter_token_gaps_ms else None
+        for gap_ms in timings.inter_token_gaps_ms:
+            inter_token.record(gap_ms * 1000)
+
+    def merge(self, other):
+        for (category, metric), histogram in other.histograms.items():
+            self.get(category, metric).merge(histogram)
+
+    def to_dict(self):
+        return {
+            "significant_digits": self.significant_digits,
+            "histograms": [
+                {"category": category, "metric": metric, "histogram": histogram.to_dict()}
+                for (category, metric), histogram in sorted(self.histograms.items())
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histograms = cls(data.get("significant_digits", 3))
+        for entry in data["histograms"]:
+            histograms.histograms[(entry["category"], entry["metric"])] = HdrHistogram.from_dict(entry["histogram"])
+        return histograms
+
+    def summary(self, percentiles=SUMMARY_PERCENTILES):
+        """
+        Percentiles per category and metric
+
+        Returns:
+            list of dict: category, metric, count, mean_ms, max_ms and p<percentile>_ms entries
+        """
+        rows = []
+        for (category, metric), histogram in sorted(self.histograms.items()):
+            if histogram.total_count == 0:
+                continue
+            row = {
+                "category": category,
+                "metric": metric,
+                "count": histogram.total_count,
+                "mean_ms": histogram.mean_us / 1000,
+                "max_ms": histogram.max_us / 1000,
+            }
+            for percentile in percentiles:
+                row[f"p{percentile:g}_ms"] = histogram.value_at_percentile(percentile) / 1000
+            rows.append(row)
+        return rows
+
+    def __bool__(self):
+        return any(histogram.total_count for histogram in self.histograms.values())
+
+
+def save_histograms(path, histograms):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(histograms.to_dict(), f)
+
+
+def load_histograms(path):
+    with open(path, "r") as f:
+        return LatencyHistograms.from_dict(json.load(f))
+
+
+def format_summary(histograms, metrics=(TTFT, TOTAL, TOTAL_UNCORRECTED, INTER_TOKEN)):
+    """Text table of the summary percentiles"""
+    lines = [f"{'Category':<20} {'Metric':<22} {'Count':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'p99.9':>9} {'Max':>9}"]
+    for row in histograms.summary():
+        if row["metric"] not in metrics:
+            continue
+        lines.append(
+            f"{row['category'][:20]:<20} {row['metric']:<22} {row['count']:>8} "
+            f"{row['p50_ms']:>9.1f} {row['p90_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['p99.9_ms']:>9.1f} {row['max_ms']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge and summarize saved latency histograms")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    merge_parser = subparsers.add_parser("merge", help="Merge histogram files (e.g. several runs)")
+    merge_parser.add_argument("paths", nargs="+")
+    merge_parser.add_argument("-o", "--output", required=True)
+    summary_parser = subparsers.add_parser("summary", help="Print percentiles (ms) of a histogram file")
+    summary_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        merged = load_histograms(args.paths[0])
+        for path in args.paths[1:]:
+            merged.merge(load_histograms(path))
+        save_histograms(args.output, merged)
+        print(f"Merged {len(args.paths)} files into {args.output}")
+    print(format_summary(merged if args.command == "merge" else load_histograms(args.path)))
+
+
+if __name__ == "__main__":
+    main()
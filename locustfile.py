@@ -2,11 +2,15 @@
 Locust performance testing file for chatbot with authentication
 Handles login flow before accessing chat functionality
 """
-import random
+import json
 import time
+from datetime import datetime
 from pathlib import Path
-from locust.contrib.fasthttp import FastHttpUser
+from locust.contrib.fasthttp import FastHttpUser, FastHttpSession
 from locust import task, between, events
+from locust.runners import MasterRunner, WorkerRunner
+import gevent
+from gevent.lock import Semaphore
 
 # Import configuration from centralized config file
 from test_config import (
@@ -21,69 +25,855 @@ from test_config import (
     TASK_WEIGHT_SEND_MESSAGE,
     TTF_DATA_PATH,
     LOGIN_ENDPOINT_FALLBACKS,
+    STREAM_RESPONSES,
+    STREAM_FORMAT,
+    STREAM_CHUNK_SIZE,
+    TTF_WRITER_BATCH_SIZE,
+    TTF_WRITER_FLUSH_INTERVAL,
+    TTF_WRITER_MAX_BUFFER_ROWS,
+    SAMPLE_STORE_ENABLED,
+    SAMPLE_STORE_PATH,
+    SAMPLE_STORE_ROW_GROUP_SIZE,
+    GENERATOR_HEALTH_ENABLED,
+    GENERATOR_HEALTH_INTERVAL,
+    GENERATOR_CPU_THRESHOLD,
+    GENERATOR_LAG_THRESHOLD_MS,
+    GENERATOR_MAX_SATURATED_PERCENT,
+    GENERATOR_HEALTH_PATH,
+    GENERATOR_HEALTH_SUMMARY_PATH,
+    SESSION_SHARING,
+    SESSION_POOL_SIZE,
+    SESSION_TTL,
+    SESSION_PREWARM,
+    LOGIN_ENDPOINT_DISCOVERY,
+    LOGIN_ENDPOINT_CACHE_PATH,
+    QUESTION_CORPUS_PATH,
+    QUESTION_CORPUS_FORMAT,
+    LOCUST_WORKER_COUNT,
+    ARRIVAL_RATE,
+    ARRIVAL_DISTRIBUTION,
+    LATENCY_HISTOGRAM_ENABLED,
+    LATENCY_HISTOGRAM_PATH,
+    LATENCY_HISTOGRAM_DIGITS,
+    LATENCY_HISTOGRAM_EXPECTED_INTERVAL_MS,
+    RUN_INDEX_PATH,
+    SLO_RULES,
+    SLO_WINDOW_SECONDS,
+    SLO_CHECK_INTERVAL,
+    SLO_ABORT_AFTER_SECONDS,
+    SLO_ABORT,
+    SLO_WARMUP_SECONDS,
+    SLO_MIN_SAMPLES,
+    SLO_RESULTS_PATH,
+    PERSONA_MIX,
+    PERSONAS_PATH,
+    RESPONSE_CHARS_PER_TOKEN,
+    RESPONSE_METRICS_PATH,
+    RESPONSE_VALIDATION,
+    RESPONSE_EXPECTED_KEYS,
+    RESPONSE_SNIFF_BYTES,
+    RESPONSE_VALIDATION_SAMPLE_RATE,
+    CUSTOM_HEADERS,
+    CONNECTION_POOL_SIZE,
+    CONNECTION_TIMEOUT,
+    NETWORK_TIMEOUT,
+    KEEP_ALIVE,
+    TLS_SESSION_RESUMPTION,
+    CONNECTION_STATS_PATH,
 )
 
 # Import sample questions and helper functions
-from sample_questions import (
-    get_sample_messages,
-    get_question_category,
+from sample_questions import get_question_bank
+
+# Import streaming response helpers for TTFB / TTFT / inter-token timing
+from stream_metrics import read_stream, buffered_timings
+
+# Import batched writer so CSV logging stays off the request hot path
+from ttf_writer import BufferedCsvWriter
+
+# Import optional compact binary sample store
+from sample_store import SampleStore
+
+# Import load generator self-monitoring (CPU, memory, sockets, event-loop lag)
+from generator_health import GeneratorHealthMonitor, combine_summaries
+
+# Import login endpoint discovery (probing runs outside the Locust stats)
+from login_discovery import (
+    discover_login_endpoint,
+    is_login_success,
+    load_cached_endpoint,
+    login_request_kwargs,
+    save_cached_endpoint,
 )
 
-# Get combined sample messages with weights applied
-SAMPLE_MESSAGES = get_sample_messages()
+# Import shared login session pool (single-flight re-login across users)
+from session_cache import SessionCache
+
+# External question corpus (streamed from disk, sharded across workers)
+from question_corpus import QuestionCorpus
+
+# Open-loop (target requests/second) scheduling
+from arrival_schedule import LATE_THRESHOLD_S, ArrivalSchedule, combine_stats as combine_arrival_stats
+
+# Coordinated-omission-corrected HDR latency histograms
+from latency_histogram import LatencyHistograms, format_summary, save_histograms
+
+# Run IDs for TTF rows and the run index
+from run_registry import RunIndex, config_snapshot, file_size, get_run_context, new_run_id
+
+# Service level objectives checked while the test runs
+from slo import SloCounts, SloMonitor, format_result as format_slo_result, parse_slo_rules, save_result as save_slo_result
+
+# User personas (task mixes, question categories, think-time models)
+from personas import load_personas, parse_persona_mix
+
+# Answer text (and conversation ID) of a streamed / JSON response
+from conversation import parse_response
+
+# Response size, answer length and generation throughput per category
+from response_metrics import (
+    ResponseStats,
+    format_summary as format_response_summary,
+    measure_response,
+    save_stats as save_response_stats,
+)
+
+# Configurable (cheap by default) validation of 200 responses
+from response_validation import ResponseValidator, combine_stats as combine_validation_stats
+
+# Per-user connection pools counting new vs reused connections and TLS handshakes
+from connection_stats import (
+    ConnectionStats,
+    TrackingClientPool,
+    format_summary as format_connection_summary,
+    save_summary as save_connection_summary,
+    ssl_context_factory,
+)
+
+# Weighted question bank (constant-time sampling and category lookup)
+QUESTION_BANK = get_question_bank()
+
+# This process's shard of QUESTION_CORPUS_PATH (opened on test start; None = use QUESTION_BANK)
+QUESTION_CORPUS = None
+
+# Process-wide buffered writer for TTF data (created on test start)
+TTF_WRITER = None
+
+# Optional compact binary sample store (created on test start when SAMPLE_STORE_ENABLED)
+SAMPLE_STORE = None
+
+# Latest TTF writer counters reported by each worker (only used on the master)
+WORKER_TTF_WRITER_STATS = {}
+
+# Login sessions shared by all users of this process (created on test start when SESSION_SHARING)
+SESSION_CACHE = None
+
+# Login endpoint/format in use ({"endpoint", "format"}), discovered once per process
+LOGIN_ENDPOINT = None
+LOGIN_DISCOVERY_FAILED_AT = None
+LOGIN_DISCOVERY_LOCK = Semaphore()
+
+# Headers sent with every request; KEEP_ALIVE=false makes the server close the connection after each one
+REQUEST_HEADERS = dict(CUSTOM_HEADERS) if KEEP_ALIVE else {**CUSTOM_HEADERS, "Connection": "close"}
+
+# Connections and TLS handshakes of this process (reset on test start; workers ship them with every report)
+CONNECTION_STATS = ConnectionStats()
+
+# Headers sent with every login request
+LOGIN_HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+    "Origin": CHATBOT_URL,
+    "Referer": f"{CHATBOT_URL}/",
+}
+
+# Open-loop send schedule of this process (created on test start when ARRIVAL_RATE > 0)
+ARRIVAL_SCHEDULE = None
+ARRIVAL_LAG_WARNED = False
+
+# Latest open-loop counters reported by each worker (only used on the master)
+WORKER_ARRIVAL_STATS = {}
+
+# Run ID / test type / step of this process; run_tests.py sets RUN_ID, otherwise one is generated per test
+RUN_CONTEXT = get_run_context()
+RUN_ID_FROM_ENVIRONMENT = RUN_CONTEXT.run_id is not None
+RUN_INDEX = RunIndex(RUN_INDEX_PATH)
+# Step of the run's index record: set for subprocess breakpoint steps, 0 otherwise
+# (breakpoint_shape.py changes RUN_CONTEXT.step while its single run goes on)
+RUN_INDEX_STEP = RUN_CONTEXT.step
+
+# Latency histograms of this process (created on test start when LATENCY_HISTOGRAM_ENABLED)
+# Workers send them to the master with every report and start over; the master merges them
+LATENCY_HISTOGRAMS = None
+
+# Closed-loop coordinated-omission correction interval (ms)
+if LATENCY_HISTOGRAM_EXPECTED_INTERVAL_MS == "auto":
+    EXPECTED_INTERVAL_MS = (WAIT_TIME_MIN + WAIT_TIME_MAX) / 2 * 1000
+else:
+    EXPECTED_INTERVAL_MS = float(LATENCY_HISTOGRAM_EXPECTED_INTERVAL_MS)
+
+# Personas and their share of users (PERSONA_MIX); empty = MyUser only
+PERSONA_WEIGHTS = parse_persona_mix(PERSONA_MIX, load_personas(PERSONAS_PATH)) if PERSONA_MIX.strip() else []
+
+# Response size / throughput histograms of this process (workers ship them to the master with every report)
+RESPONSE_STATS = ResponseStats()
+
+# Validation of 200 responses in this process (recreated on test start, so the counts are per run)
+def _new_response_validator():
+    return ResponseValidator(RESPONSE_VALIDATION, RESPONSE_EXPECTED_KEYS, RESPONSE_SNIFF_BYTES,
+                             RESPONSE_VALIDATION_SAMPLE_RATE)
+
+RESPONSE_VALIDATOR = _new_response_validator()
+
+# Latest validation counts from each worker (master only)
+WORKER_VALIDATION_STATS = {}
+
+# Load generator health monitor of this process (created on test start when GENERATOR_HEALTH_ENABLED)
+GENERATOR_HEALTH = None
+
+# SLO rules and the monitor counting chat messages for them (created on test start when there are rules)
+# Workers send their counts to the master, which checks the rules; a local run checks them itself
+SLO_RULE_LIST = parse_slo_rules(SLO_RULES)
+SLO_MONITOR = None
+
+# Column layout of the TTF CSV file
+# TTF_ms is the time to first token; it is only measured when STREAM_RESPONSES is enabled
+# Run_ID / Step tell the runs (and breakpoint steps) appended to the same file apart (see run_registry.py)
+# Turn / Context_Chars are only filled in by multi-turn conversations (see conversation_user.py)
+TTF_CSV_HEADER = [
+    'Timestamp', 'Question_Category', 'Question_Text',
+    'TTF_ms', 'Total_Response_Time_ms', 'Status',
+    'TTFB_ms', 'TTLT_ms', 'Mean_Inter_Token_ms', 'Max_Inter_Token_ms', 'Token_Count',
+    'Run_ID', 'Step', 'Turn', 'Context_Chars'
+]
+
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    """Workers take the run ID and step from the master; the web UI gets a response size tab"""
+    if isinstance(environment.runner, WorkerRunner):
+        environment.runner.register_message("run_context", lambda msg, **kw: RUN_CONTEXT.update(msg.data))
+    if environment.web_ui is not None:
+        _extend_web_ui(environment.web_ui)
+
+
+def _extend_web_ui(web_ui):
+    """Show response size, answer length and tokens/second per category in a "Response Size" tab"""
+    from flask import request
+
+    columns = [("category", "Category"), ("count", "Responses"), ("decoded", "Decoded"), ("response_bytes_mean", "Avg bytes"),
+               ("answer_chars_mean", "Avg answer chars"), ("estimated_tokens_mean", "Avg tokens (est.)"),
+               ("estimated_tokens_p95", "p95 tokens"), ("tokens_per_second_p50", "p50 tokens/s"),
+               ("tokens_per_second_p95", "p95 tokens/s")]
+    web_ui.template_args["extendedTabs"] = [{"title": "Response Size", "key": "response-size"}]
+    web_ui.template_args["extendedTables"] = [
+        {"key": "response-size", "structure": [{"key": key, "title": title} for key, title in columns]}
+    ]
+
+    @web_ui.app.after_request
+    def add_response_stats(response):
+        if request.path != "/stats/requests" or response.json is None:
+            return response
+        rows = [
+            {key: round(row[key], 1) if isinstance(row[key], float) else row[key] for key, _ in columns}
+            for row in RESPONSE_STATS.summary()
+        ]
+        response.set_data(json.dumps({**response.json, "extendedStats": [{"key": "response-size", "data": rows}]}))
+        return response
 
-# Global variable to store TTF file path
-TTF_FILE_PATH = None
 
 # Custom CSV writer for TTF data
 @events.test_start.add_listener
 def on_test_start(environment, **kwargs):
-    """Create CSV file for TTF tracking"""
-    import csv
+    """Open the buffered TTF writer (one per process, shared by all users)"""
+    global TTF_WRITER, SAMPLE_STORE, LATENCY_HISTOGRAMS, RESPONSE_STATS, RESPONSE_VALIDATOR
+    
+    RESPONSE_STATS = ResponseStats()
+    RESPONSE_VALIDATOR = _new_response_validator()
+    # Reset in place: the users' connection pools hold on to it
+    CONNECTION_STATS.take()
+    _start_slo_monitor(environment)
+    if PERSONA_WEIGHTS and not isinstance(environment.runner, WorkerRunner):
+        _print_persona_mix()
+    LATENCY_HISTOGRAMS = LatencyHistograms(LATENCY_HISTOGRAM_DIGITS) if LATENCY_HISTOGRAM_ENABLED else None
+    
+    # The master only prepares the shared CSV file; workers write the samples
+    if isinstance(environment.runner, MasterRunner):
+        WORKER_TTF_WRITER_STATS.clear()
+        WORKER_ARRIVAL_STATS.clear()
+        WORKER_VALIDATION_STATS.clear()
+        BufferedCsvWriter.prepare_file(TTF_DATA_PATH, TTF_CSV_HEADER)
+        _start_run(environment)
+        # Sent before the spawn messages, so workers tag their first rows correctly
+        environment.runner.send_message("run_context", RUN_CONTEXT.to_dict())
+        _start_generator_health(environment)
+        return
+    is_worker = isinstance(environment.runner, WorkerRunner)
+    
+    _start_session_cache(environment)
+    _open_question_corpus(environment)
+    _start_arrival_schedule(environment)
     
-    global TTF_FILE_PATH
+    if TTF_WRITER is not None:
+        TTF_WRITER.close()
     
-    # Create reports directory if it doesn't exist
-    ttf_path = Path(TTF_DATA_PATH)
-    ttf_path.parent.mkdir(parents=True, exist_ok=True)
-    TTF_FILE_PATH = ttf_path
+    TTF_WRITER = BufferedCsvWriter(
+        TTF_DATA_PATH,
+        TTF_CSV_HEADER,
+        batch_size=TTF_WRITER_BATCH_SIZE,
+        flush_interval=TTF_WRITER_FLUSH_INTERVAL,
+        max_buffer_rows=TTF_WRITER_MAX_BUFFER_ROWS,
+    )
+    TTF_WRITER.open(prepare=not is_worker)
+    if not is_worker:
+        _start_run(environment)
+    
+    if SAMPLE_STORE_ENABLED:
+        if SAMPLE_STORE is not None:
+            SAMPLE_STORE.close()
+        # Dictionary IDs are per process, so every worker gets its own store
+        store_path = Path(SAMPLE_STORE_PATH)
+        if is_worker:
+            store_path = store_path / f"worker_{environment.runner.worker_index}"
+        SAMPLE_STORE = SampleStore(store_path, row_group_size=SAMPLE_STORE_ROW_GROUP_SIZE)
+        SAMPLE_STORE.open()
+    
+    # Last, so the setup above is not measured as event-loop lag
+    _start_generator_health(environment)
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    """Flush remaining TTF rows and report writer counters"""
+    if GENERATOR_HEALTH is not None:
+        GENERATOR_HEALTH.stop()
+    if SLO_MONITOR is not None and not isinstance(environment.runner, WorkerRunner):
+        SLO_MONITOR.stop()
+    if isinstance(environment.runner, MasterRunner):
+        return
+    if SAMPLE_STORE is not None:
+        SAMPLE_STORE.close()
+        print(f"Sample store: {SAMPLE_STORE.rows_written} samples in {SAMPLE_STORE.row_groups_written} row groups at {SAMPLE_STORE.directory}")
+    if ARRIVAL_SCHEDULE is not None:
+        _print_arrival_stats(ARRIVAL_SCHEDULE.stats())
+    if SESSION_CACHE is not None:
+        stats = SESSION_CACHE.stats()
+        print(f"Login sessions: {stats['logins']} logins ({stats['failed_logins']} failed) "
+              f"shared by users {stats['reused']} times")
+    if TTF_WRITER is None:
+        return
+    TTF_WRITER.close()
+    _print_ttf_writer_stats(TTF_WRITER.stats())
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    """On the master, report TTF writer counters summed over all workers"""
+    if GENERATOR_HEALTH is not None and not isinstance(environment.runner, WorkerRunner):
+        _report_generator_health(environment)
+    if SLO_MONITOR is not None and not isinstance(environment.runner, WorkerRunner):
+        _report_slos(environment)
+    if LATENCY_HISTOGRAMS and not isinstance(environment.runner, WorkerRunner):
+        save_histograms(LATENCY_HISTOGRAM_PATH, LATENCY_HISTOGRAMS)
+        print(f"\nLatency percentiles (ms, HDR histograms, coordinated-omission corrected) - saved to {LATENCY_HISTOGRAM_PATH}")
+        print(format_summary(LATENCY_HISTOGRAMS))
+    if not isinstance(environment.runner, WorkerRunner):
+        _report_connection_stats(environment)
+    if RESPONSE_STATS and not isinstance(environment.runner, WorkerRunner):
+        save_response_stats(RESPONSE_METRICS_PATH, RESPONSE_STATS)
+        print(f"\nResponse size and generation throughput (tokens estimated) - saved to {RESPONSE_METRICS_PATH}")
+        print(format_response_summary(RESPONSE_STATS.summary()))
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    if not isinstance(environment.runner, MasterRunner):
+        _print_validation_stats(RESPONSE_VALIDATOR.stats())
+        _finish_run(TTF_WRITER.stats() if TTF_WRITER is not None else {})
+        return
+    if WORKER_VALIDATION_STATS:
+        _print_validation_stats(combine_validation_stats(WORKER_VALIDATION_STATS.values()))
+    totals = {}
+    for worker_stats in WORKER_TTF_WRITER_STATS.values():
+        for key, value in worker_stats.items():
+            totals[key] = totals.get(key, 0) + value
+    _finish_run(totals)
+    if totals:
+        _print_ttf_writer_stats(totals)
+    if WORKER_ARRIVAL_STATS:
+        _print_arrival_stats(combine_arrival_stats(WORKER_ARRIVAL_STATS.values()))
+
+
+@events.report_to_master.add_listener
+def on_report_to_master(client_id, data, **kwargs):
+    """Send this worker's TTF writer counters, generator health, new histogram and SLO counts to the master"""
+    global LATENCY_HISTOGRAMS, RESPONSE_STATS
+    if LATENCY_HISTOGRAMS:
+        # Only the counts recorded since the last report are sent, never the raw samples
+        data["latency_histograms"] = LATENCY_HISTOGRAMS.to_dict()
+        LATENCY_HISTOGRAMS = LatencyHistograms(LATENCY_HISTOGRAM_DIGITS)
+    if RESPONSE_STATS:
+        data["response_stats"] = RESPONSE_STATS.to_dict()
+        RESPONSE_STATS = ResponseStats()
+    if TTF_WRITER is not None:
+        data["ttf_writer"] = TTF_WRITER.stats()
+    if GENERATOR_HEALTH is not None:
+        data["generator_health"] = GENERATOR_HEALTH.summary()
+    if ARRIVAL_SCHEDULE is not None:
+        data["arrival"] = ARRIVAL_SCHEDULE.stats()
+    if SLO_MONITOR is not None and SLO_MONITOR.pending:
+        data["slo"] = SLO_MONITOR.take_pending().to_dict()
+    data["validation"] = RESPONSE_VALIDATOR.stats()
+    if CONNECTION_STATS:
+        data["connections"] = CONNECTION_STATS.take().to_dict()
+
+
+@events.worker_report.add_listener
+def on_worker_report(client_id, data, **kwargs):
+    """Keep the latest TTF writer counters and generator health from each worker, merge its histograms and SLO counts"""
+    if "ttf_writer" in data:
+        WORKER_TTF_WRITER_STATS[client_id] = data["ttf_writer"]
+    if "generator_health" in data and GENERATOR_HEALTH is not None:
+        GENERATOR_HEALTH.remote_summaries[client_id] = data["generator_health"]
+    if "arrival" in data:
+        WORKER_ARRIVAL_STATS[client_id] = data["arrival"]
+    if "validation" in data:
+        WORKER_VALIDATION_STATS[client_id] = data["validation"]
+    if "latency_histograms" in data and LATENCY_HISTOGRAMS is not None:
+        LATENCY_HISTOGRAMS.merge(LatencyHistograms.from_dict(data["latency_histograms"]))
+    if "slo" in data and SLO_MONITOR is not None:
+        SLO_MONITOR.add(SloCounts.from_dict(data["slo"]))
+    if "response_stats" in data:
+        RESPONSE_STATS.merge(ResponseStats.from_dict(data["response_stats"]))
+    if "connections" in data:
+        CONNECTION_STATS.merge(ConnectionStats.from_dict(data["connections"]))
+
+
+def _start_run(environment):
+    """Pick the run ID and add the run (settings and where its TTF rows start) to the run index"""
+    if not RUN_ID_FROM_ENVIRONMENT:
+        RUN_CONTEXT.run_id = new_run_id(RUN_CONTEXT.test_type or "locust")
+    options = environment.parsed_options
+    entry = {
+        "run_id": RUN_CONTEXT.run_id,
+        "step": RUN_INDEX_STEP,
+        "test_type": RUN_CONTEXT.test_type or "locust",
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "host": environment.host or CHATBOT_URL,
+        "users": getattr(options, "num_users", None),
+        "spawn_rate": getattr(options, "spawn_rate", None),
+        "run_time_s": getattr(options, "run_time", None),
+        "shape": type(environment.shape_class).__name__ if environment.shape_class else None,
+        "workers": environment.runner.worker_count if isinstance(environment.runner, MasterRunner) else 0,
+        "ttf_data_path": str(TTF_DATA_PATH),
+        "start_offset": file_size(TTF_DATA_PATH),
+        "config": config_snapshot(),
+    }
+    try:
+        RUN_INDEX.record(entry)
+    except OSError as e:
+        print(f"WARNING: Could not update run index {RUN_INDEX_PATH}: {e}")
+    print(f"Run ID: {RUN_CONTEXT.run_id}" + (f" (step {RUN_INDEX_STEP})" if RUN_INDEX_STEP else ""))
+
+
+def _finish_run(ttf_writer_stats):
+    """Close the run's index record (end time, end offset and rows written)"""
+    if RUN_CONTEXT.run_id is None:
+        return
+    try:
+        RUN_INDEX.record({
+            "run_id": RUN_CONTEXT.run_id,
+            "step": RUN_INDEX_STEP,
+            "ended": datetime.now().isoformat(timespec="seconds"),
+            "end_offset": file_size(TTF_DATA_PATH),
+            "rows_written": ttf_writer_stats.get("rows_written", 0),
+            "rows_dropped": ttf_writer_stats.get("rows_dropped", 0),
+        })
+    except OSError as e:
+        print(f"WARNING: Could not update run index {RUN_INDEX_PATH}: {e}")
+
+
+def _start_session_cache(environment):
+    """Create the shared session pool and optionally log every slot in before users start"""
+    global SESSION_CACHE
+    if not SESSION_SHARING:
+        SESSION_CACHE = None
+        return
+    SESSION_CACHE = SessionCache(pool_size=SESSION_POOL_SIZE, ttl=SESSION_TTL)
+    if not SESSION_PREWARM:
+        return
     
-    # Write header if file doesn't exist or is empty
-    if not TTF_FILE_PATH.exists() or TTF_FILE_PATH.stat().st_size == 0:
-        with open(TTF_FILE_PATH, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                'Timestamp', 'Question_Category', 'Question_Text', 
-                'TTF_ms', 'Total_Response_Time_ms', 'Status'
-            ])
+    # Runs inside test_start, so users only spawn once the sessions are ready
+    host = environment.host or CHATBOT_URL
+    for slot in range(SESSION_CACHE.pool_size):
+        client = FastHttpSession(host, environment.events.request, user=None, headers=REQUEST_HEADERS,
+                                 connection_timeout=CONNECTION_TIMEOUT, network_timeout=NETWORK_TIMEOUT)
+        SESSION_CACHE.acquire(slot, lambda: login_with_client(client))
+    ready = sum(SESSION_CACHE.current(slot) is not None for slot in range(SESSION_CACHE.pool_size))
+    print(f"Pre-warmed {ready}/{SESSION_CACHE.pool_size} login sessions")
 
 
-class MyUser(FastHttpUser):
+def _open_question_corpus(environment):
+    """Index this process's shard of the external question corpus (workers shard by their index)"""
+    global QUESTION_CORPUS
+    if QUESTION_CORPUS is not None:
+        QUESTION_CORPUS.close()
+        QUESTION_CORPUS = None
+    if not QUESTION_CORPUS_PATH:
+        return
+    shard_index, shard_count = 0, 1
+    if isinstance(environment.runner, WorkerRunner):
+        shard_index, shard_count = environment.runner.worker_index, LOCUST_WORKER_COUNT
+    started = time.perf_counter()
+    QUESTION_CORPUS = QuestionCorpus(
+        QUESTION_CORPUS_PATH, shard_index, shard_count, file_format=QUESTION_CORPUS_FORMAT
+    ).open()
+    print(f"Question corpus: {len(QUESTION_CORPUS)} of {QUESTION_CORPUS.total_rows} questions "
+          f"(shard {shard_index + 1}/{shard_count}) indexed in {time.perf_counter() - started:.1f}s")
+    _set_persona_corpus_views()
+
+
+def _set_persona_corpus_views():
+    """Give each persona a view of the corpus with its category shares"""
+    for user_class in PERSONA_USER_CLASSES:
+        categories = user_class.persona.categories
+        user_class.question_corpus = None
+        if not categories or QUESTION_CORPUS is None:
+            continue
+        try:
+            user_class.question_corpus = QUESTION_CORPUS.with_category_shares(categories)
+        except ValueError as e:
+            print(f"NOTE: Persona '{user_class.persona.name}' samples the corpus by its row weights: {e}")
+
+
+def _start_arrival_schedule(environment):
+    """Create the open-loop send schedule; workers share the target rate equally"""
+    global ARRIVAL_SCHEDULE, ARRIVAL_LAG_WARNED
+    ARRIVAL_LAG_WARNED = False
+    if ARRIVAL_RATE <= 0:
+        ARRIVAL_SCHEDULE = None
+        return
+    rate = ARRIVAL_RATE
+    if isinstance(environment.runner, WorkerRunner):
+        rate /= max(1, LOCUST_WORKER_COUNT)
+    ARRIVAL_SCHEDULE = ArrivalSchedule(rate, poisson=ARRIVAL_DISTRIBUTION == "poisson")
+    print(f"Open-loop arrivals: {rate:g} requests/s ({ARRIVAL_DISTRIBUTION})")
+
+
+def claim_arrival_slot():
     """
-    User class that simulates authenticated chatbot interactions
+    Claim the next open-loop send time
     
-    Each virtual user will:
-    1. Login when they start
-    2. Navigate to chat page
-    3. Send random messages from SAMPLE_MESSAGES
-    4. Wait 2-5 seconds between messages (simulating reading response)
+    Returns:
+        tuple: (seconds to wait before sending, seconds the slot was already overdue)
+    """
+    global ARRIVAL_LAG_WARNED
+    wait = ARRIVAL_SCHEDULE.claim()
+    lag = ARRIVAL_SCHEDULE.lag_s
+    if lag > LATE_THRESHOLD_S and not ARRIVAL_LAG_WARNED:
+        ARRIVAL_LAG_WARNED = True
+        print(f"⚠️  Open-loop generator is {lag:.1f}s behind schedule: all users are busy - "
+              f"add users to sustain {ARRIVAL_SCHEDULE.rate:g} requests/s")
+    return wait, lag
+
+
+def _print_arrival_stats(stats):
+    print(f"Open-loop arrivals: {stats['dispatched']} dispatched at {stats['rate']:g} requests/s, "
+          f"{stats['late']} more than {LATE_THRESHOLD_S:g}s behind schedule "
+          f"(mean {stats['mean_lag_s']:.2f}s, max {stats['max_lag_s']:.2f}s)")
+
+
+def _start_generator_health(environment):
+    """Start sampling this process's own resource usage (the master/local process owns the CSV header)"""
+    global GENERATOR_HEALTH
+    if not GENERATOR_HEALTH_ENABLED:
+        return
+    if GENERATOR_HEALTH is not None:
+        GENERATOR_HEALTH.stop()
+    
+    runner = environment.runner
+    if isinstance(runner, MasterRunner):
+        process_label = "master"
+    elif isinstance(runner, WorkerRunner):
+        process_label = f"worker_{runner.worker_index}"
+    else:
+        process_label = "local"
+    
+    GENERATOR_HEALTH = GeneratorHealthMonitor(
+        runner,
+        GENERATOR_HEALTH_PATH,
+        process_label=process_label,
+        interval=GENERATOR_HEALTH_INTERVAL,
+        cpu_threshold=GENERATOR_CPU_THRESHOLD,
+        lag_threshold_ms=GENERATOR_LAG_THRESHOLD_MS,
+    )
+    GENERATOR_HEALTH.start(prepare=not isinstance(runner, WorkerRunner))
+
+
+def _report_generator_health(environment):
+    """Write the run's generator health verdict and warn if the load generator was saturated"""
+    verdict = combine_summaries(GENERATOR_HEALTH.all_summaries(), GENERATOR_MAX_SATURATED_PERCENT)
+    try:
+        path = Path(GENERATOR_HEALTH_SUMMARY_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(verdict, f, indent=2)
+    except OSError as e:
+        print(f"WARNING: Could not write generator health summary: {e}")
+    
+    print(f"Load generator: max CPU {verdict['max_cpu_percent']:.0f}%, "
+          f"max mean event-loop lag {verdict['max_loop_lag_mean_ms']:.0f}ms (worst {verdict['max_loop_lag_ms']:.0f}ms) "
+          f"over {verdict['samples']} samples")
+    if not verdict["valid"]:
+        print(f"WARNING: Load generator was saturated in {verdict['saturated_percent']:.1f}% of samples "
+              f"({', '.join(verdict['saturated_processes'])}) - latency results are NOT trustworthy. "
+              f"Use more --workers or fewer users per process.")
+    elif verdict["saturated_samples"]:
+        print(f"NOTE: Load generator was briefly saturated ({verdict['saturated_samples']} samples) - "
+              f"see {GENERATOR_HEALTH_PATH}")
+
+
+def _start_slo_monitor(environment):
+    """Count chat messages for the SLO rules; the master (or a local process) also checks them"""
+    global SLO_MONITOR
+    if SLO_MONITOR is not None:
+        SLO_MONITOR.stop()
+    if not SLO_RULE_LIST:
+        SLO_MONITOR = None
+        return
+    SLO_MONITOR = SloMonitor(
+        SLO_RULE_LIST,
+        window_seconds=SLO_WINDOW_SECONDS,
+        abort_after_seconds=SLO_ABORT_AFTER_SECONDS,
+        check_interval=SLO_CHECK_INTERVAL,
+        warmup_seconds=SLO_WARMUP_SECONDS,
+        min_samples=SLO_MIN_SAMPLES,
+    )
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    SLO_MONITOR.start(on_abort=(lambda reason: _abort_on_slo(environment, reason)) if _slo_abort_enabled() else None)
+    print(f"SLOs: {', '.join(map(str, SLO_RULE_LIST))} (window {SLO_WINDOW_SECONDS:g}s, "
+          f"{'abort' if _slo_abort_enabled() else 'fail'} after {SLO_ABORT_AFTER_SECONDS:g}s in breach)")
+
+
+def _slo_abort_enabled():
+    # Breakpoint tests push past the limits on purpose; the knee detector decides when they stop
+    return SLO_ABORT and RUN_CONTEXT.test_type != "breakpoint"
+
+
+def _abort_on_slo(environment, reason):
+    """Stop the whole test (master and workers) with exit code 1"""
+    print(f"\n🛑 Aborting test: {reason}")
+    environment.process_exit_code = 1
+    # Not from the checking greenlet itself: quitting stops the monitor
+    gevent.spawn(environment.runner.quit)
+
+
+def _report_slos(environment):
+    """Write and print the SLO verdict; a failed SLO makes Locust exit with 1"""
+    result = SLO_MONITOR.result(RUN_CONTEXT.run_id, abort_enabled=_slo_abort_enabled())
+    try:
+        save_slo_result(SLO_RESULTS_PATH, result)
+    except OSError as e:
+        print(f"WARNING: Could not write SLO results: {e}")
+    print(f"\nSLOs (after a {SLO_WARMUP_SECONDS:g}s warm-up) - saved to {SLO_RESULTS_PATH}")
+    print(format_slo_result(result))
+    if not result["passed"]:
+        environment.process_exit_code = 1
+
+
+def _print_persona_mix():
+    total = sum(weight for _, weight in PERSONA_WEIGHTS)
+    print("User personas:")
+    for persona, weight in PERSONA_WEIGHTS:
+        print(f"   {persona.name:<16} {weight / total * 100:5.1f}% of users - {persona.describe()}")
+
+
+def _report_connection_stats(environment):
+    """Print and save new vs reused connections and TLS handshake times of the run"""
+    requests = environment.stats.total.num_requests
+    if not requests:
+        return
+    summary = CONNECTION_STATS.summary(requests)
+    summary.update(keep_alive=KEEP_ALIVE, tls_session_resumption=TLS_SESSION_RESUMPTION,
+                   pool_size=CONNECTION_POOL_SIZE)
+    save_connection_summary(CONNECTION_STATS_PATH, summary)
+    print(f"\nConnections (keep-alive {'on' if KEEP_ALIVE else 'off'}, TLS session resumption "
+          f"{'on' if TLS_SESSION_RESUMPTION else 'off'}) - saved to {CONNECTION_STATS_PATH}")
+    print(format_connection_summary(summary))
+
+
+def _print_validation_stats(stats):
+    """Checked / invalid 200 responses (sniff and schema levels only)"""
+    if RESPONSE_VALIDATION not in ("sniff", "schema") or not stats["responses"]:
+        return
+    print(f"Response validation ({RESPONSE_VALIDATION}): {stats['invalid']} of {stats['responses']} responses invalid "
+          f"({stats['invalid'] / stats['responses'] * 100:.2f}%), {stats['fully_validated']} fully validated")
+    if stats["last_error"]:
+        print(f"   Last invalid response: {stats['last_error']}")
+
+
+def _print_ttf_writer_stats(stats):
+    """Print TTF writer counters, warning when rows were lost"""
+    print(f"TTF data: {stats['rows_written']} rows written in {stats['flushes']} flushes to {TTF_DATA_PATH}")
+    if stats["rows_dropped"]:
+        print(f"WARNING: {stats['rows_dropped']} TTF rows dropped "
+              f"({stats['write_errors']} write errors) - increase TTF_WRITER_MAX_BUFFER_ROWS or check disk")
+
+
+def login_with_client(client):
+    """
+    Perform login with email and password using the given HTTP client
+    
+    Only the discovered login endpoint/format is posted to, so a misconfigured
+    API_ENDPOINT_LOGIN costs one (unrecorded) discovery per process instead of
+    probing every fallback for every user.
+    
+    Returns:
+        list: Cookies of the authenticated session, or None if login failed
+    """
+    if not LOGIN_EMAIL or not LOGIN_PASSWORD:
+        print("WARNING: LOGIN_EMAIL or LOGIN_PASSWORD not set in .env file")
+        return None
+    
+    login_endpoint = get_login_endpoint()
+    if login_endpoint is None:
+        return None
+    
+    with client.post(
+        login_endpoint["endpoint"],
+        catch_response=True,
+        name="Login",
+        **login_request_kwargs(login_endpoint["format"], LOGIN_EMAIL, LOGIN_PASSWORD, LOGIN_HEADERS)
+    ) as resp:
+        if is_login_success(resp.status_code, resp.text, login_endpoint["format"]):
+            resp.success()
+            return list(client.cookiejar)
+        if resp.status_code == 401:
+            resp.failure("401 Unauthorized - Check login credentials")
+        elif resp.status_code in [404, 405, 415]:
+            resp.failure(f"Login endpoint {login_endpoint['endpoint']} stopped working ({resp.status_code}) - rediscovering")
+            forget_login_endpoint(login_endpoint)
+        else:
+            resp.failure(f"Login failed with status {resp.status_code}")
+    return None
+
+
+def get_login_endpoint():
+    """
+    Return the login endpoint and format to use ({"endpoint", "format"}), discovering it if needed
+    
+    Checked in order: this process's memory, the cache file, then a discovery
+    run. Only one greenlet discovers at a time; the others wait for its result.
+    """
+    global LOGIN_ENDPOINT, LOGIN_DISCOVERY_FAILED_AT
+    if LOGIN_ENDPOINT is not None:
+        return LOGIN_ENDPOINT
+    if not LOGIN_ENDPOINT_DISCOVERY:
+        LOGIN_ENDPOINT = {"endpoint": API_ENDPOINT_LOGIN, "format": "json"}
+        return LOGIN_ENDPOINT
+    
+    with LOGIN_DISCOVERY_LOCK:
+        if LOGIN_ENDPOINT is not None:
+            return LOGIN_ENDPOINT
+        LOGIN_ENDPOINT = load_cached_endpoint(LOGIN_ENDPOINT_CACHE_PATH, CHATBOT_URL, API_ENDPOINT_LOGIN)
+        if LOGIN_ENDPOINT is not None:
+            return LOGIN_ENDPOINT
+        # Don't re-probe for every user while the target keeps rejecting us
+        if LOGIN_DISCOVERY_FAILED_AT is not None and time.time() - LOGIN_DISCOVERY_FAILED_AT < 30:
+            return None
+        
+        login_endpoints = [API_ENDPOINT_LOGIN] + LOGIN_ENDPOINT_FALLBACKS
+        # Remove duplicates while preserving order
+        seen = set()
+        login_endpoints = [x for x in login_endpoints if not (x in seen or seen.add(x))]
+        
+        LOGIN_ENDPOINT, tried = discover_login_endpoint(
+            CHATBOT_URL, login_endpoints, LOGIN_EMAIL, LOGIN_PASSWORD, {**CUSTOM_HEADERS, **LOGIN_HEADERS}
+        )
+        if LOGIN_ENDPOINT is not None:
+            LOGIN_DISCOVERY_FAILED_AT = None
+            save_cached_endpoint(LOGIN_ENDPOINT_CACHE_PATH, CHATBOT_URL, API_ENDPOINT_LOGIN, LOGIN_ENDPOINT)
+            print(f"Login endpoint discovered: {LOGIN_ENDPOINT['endpoint']} ({LOGIN_ENDPOINT['format']})")
+            return LOGIN_ENDPOINT
+        
+        LOGIN_DISCOVERY_FAILED_AT = time.time()
+        print(f"WARNING: Login failed. Check browser Network tab to find the correct login endpoint.")
+        print(f"Tried: {', '.join(f'{endpoint} ({login_format}): {status}' for endpoint, login_format, status in tried)}")
+        print(f"Steps to find correct endpoint:")
+        print(f"1. Open browser DevTools (F12)")
+        print(f"2. Go to Network tab")
+        print(f"3. Login manually at {CHATBOT_URL}")
+        print(f"4. Find the POST request that succeeds")
+        print(f"5. Copy the endpoint URL and set API_ENDPOINT_LOGIN in .env")
+        return None
+
+
+def forget_login_endpoint(login_endpoint):
+    """Drop a login endpoint that stopped working so the next login rediscovers it"""
+    global LOGIN_ENDPOINT
+    if LOGIN_ENDPOINT is not login_endpoint:
+        return
+    LOGIN_ENDPOINT = None
+    if LOGIN_ENDPOINT_DISCOVERY:
+        save_cached_endpoint(LOGIN_ENDPOINT_CACHE_PATH, CHATBOT_URL, API_ENDPOINT_LOGIN, None)
+
+
+class ChatbotUser(FastHttpUser):
+    """
+    Base class for authenticated chatbot users (login, shared sessions, sending messages)
+    
+    Subclasses decide which messages are sent and when (see MyUser and replay_user.py)
     """
+    abstract = True
     host = CHATBOT_URL
     is_authenticated = False
-    wait_time = between(WAIT_TIME_MIN, WAIT_TIME_MAX)  # Configurable wait time between tasks
+    auth_slot = None  # Slot of the shared session pool (session sharing only)
+    auth_session = None
+    last_response_metrics = None  # ResponseMetrics of the last successful chat message (None after a failure)
+    # Answers are only decoded for the validator's sample, unless a subclass needs every one
+    decode_answers = False
+    conversation_id_field = None  # Field parse_response looks for a conversation ID in (None = no lookup)
+    last_answer = None  # Decoded answer of the last successful chat message (None = not decoded)
+    last_conversation_id = None
+    expected_interval_ms = EXPECTED_INTERVAL_MS  # Closed-loop coordinated-omission correction interval
+    # Connection settings (see "Connection Configuration" in test_config.py)
+    concurrency = CONNECTION_POOL_SIZE
+    connection_timeout = CONNECTION_TIMEOUT
+    network_timeout = NETWORK_TIMEOUT
+    default_headers = REQUEST_HEADERS
+
+    def __init__(self, environment):
+        # Own connection pool per user, like a browser; it counts the connections it opens
+        self.client_pool = TrackingClientPool(
+            CONNECTION_STATS,
+            concurrency=self.concurrency,
+            connection_timeout=self.connection_timeout,
+            network_timeout=self.network_timeout,
+            insecure=self.insecure,
+            ssl_context_factory=ssl_context_factory(CONNECTION_STATS, self.insecure, TLS_SESSION_RESUMPTION),
+            proxy_host=self.proxy_host,
+            proxy_port=self.proxy_port,
+        )
+        super().__init__(environment)
 
     def on_start(self):
         """
         Called when a user starts - performs login before accessing chat
         """
-        # Step 1: Load the login page to get any CSRF tokens or session cookies
-        with self.client.get("/", name="Load Login Page", catch_response=True) as resp:
-            if resp.status_code not in [200, 302]:
-                resp.failure(f"Failed to load login page: {resp.status_code}")
-                return
+        if SESSION_CACHE is not None:
+            self.auth_slot = SESSION_CACHE.assign_slot()
+            session = SESSION_CACHE.current(self.auth_slot)
+            if session is not None:
+                # The slot is already logged in - skip the login page and login
+                self._set_session(session)
         
-        # Step 2: Perform login
-        self.login()
+        if not self.is_authenticated:
+            # Step 1: Load the login page to get any CSRF tokens or session cookies
+            with self.client.get("/", name="Load Login Page", catch_response=True) as resp:
+                if resp.status_code not in [200, 302]:
+                    resp.failure(f"Failed to load login page: {resp.status_code}")
+                    return
+            
+            # Step 2: Perform login
+            self.login()
         
         # Step 3: Navigate to chat page after successful login
         if self.is_authenticated:
@@ -93,164 +883,65 @@ class MyUser(FastHttpUser):
                 else:
                     resp.failure(f"Failed to access chat page after login: {resp.status_code}")
     
-    def login(self):
+    def login(self, stale=False):
         """
-        Perform login with email and password
-        Handles different login endpoint formats
+        Log in, reusing the shared session of this user's slot when session sharing is on
+        
+        Args:
+            stale: True if the current session was rejected (401) and must be replaced
         """
-        if not LOGIN_EMAIL or not LOGIN_PASSWORD:
-            print("WARNING: LOGIN_EMAIL or LOGIN_PASSWORD not set in .env file")
+        if SESSION_CACHE is None:
+            self.is_authenticated = login_with_client(self.client) is not None
             return
-        
-        # Prepare login headers
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json, text/plain, */*",
-            "Origin": CHATBOT_URL,
-            "Referer": f"{CHATBOT_URL}/",
-        }
-        
-        # Prepare login payload
-        login_payload = {
-            "email": LOGIN_EMAIL,
-            "password": LOGIN_PASSWORD
-        }
-        
-        # Try login endpoint - common variations
-        # Some sites use form-based login (POST to same page), so we try root path too
-        # Start with the configured endpoint first, then try common variations
-        login_endpoints = [API_ENDPOINT_LOGIN] + LOGIN_ENDPOINT_FALLBACKS
-        # Remove duplicates while preserving order
-        seen = set()
-        login_endpoints = [x for x in login_endpoints if not (x in seen or seen.add(x))]
-        
-        login_success = False
-        last_status = None
-        
-        for endpoint in login_endpoints:
-            # Try JSON format first
-            with self.client.post(
-                endpoint,
-                json=login_payload,
-                headers=headers,
-                catch_response=True,
-                name="Login"
-            ) as resp:
-                last_status = resp.status_code
-                if resp.status_code in [200, 201, 302]:
-                    # Check if we got redirected or got success response
-                    if resp.status_code == 302 or "token" in resp.text.lower() or "success" in resp.text.lower():
-                        self.is_authenticated = True
-                        login_success = True
-                        resp.success()
-                        break
-                    elif resp.status_code in [200, 201]:
-                        # Try to parse response
-                        try:
-                            response_data = resp.json()
-                            if "token" in response_data or "access_token" in response_data or "success" in str(response_data).lower():
-                                self.is_authenticated = True
-                                login_success = True
-                                resp.success()
-                                break
-                        except:
-                            # If response is not JSON but status is OK, assume success
-                            self.is_authenticated = True
-                            login_success = True
-                            resp.success()
-                            break
-                elif resp.status_code == 401:
-                    resp.failure(f"401 Unauthorized - Check login credentials")
-                    # Don't try other endpoints if credentials are wrong
-                    break
-                elif resp.status_code == 404:
-                    # Try next endpoint - don't count 404 as failure when trying multiple endpoints
-                    # Only mark as failure if this is the last endpoint we're trying
-                    if endpoint == login_endpoints[-1]:
-                        resp.failure(f"404 Not Found - All login endpoints failed")
-                    else:
-                        # Don't mark as failure, just continue trying
-                        resp.success()  # Mark as success to avoid inflating failure rate
-                    continue
-                else:
-                    resp.failure(f"Login failed with status {resp.status_code}")
-            
-            # If JSON didn't work with 404 or 415, try form-data format (some APIs use form-data)
-            if last_status == 404 or last_status == 415:
-                form_headers = headers.copy()
-                form_headers["Content-Type"] = "application/x-www-form-urlencoded"
-                with self.client.post(
-                    endpoint,
-                    data=login_payload,
-                    headers=form_headers,
-                    catch_response=True,
-                    name="Login (form-data)"
-                ) as form_resp:
-                    if form_resp.status_code in [200, 201, 302]:
-                        self.is_authenticated = True
-                        login_success = True
-                        form_resp.success()
-                        break
-                    elif form_resp.status_code == 401:
-                        form_resp.failure(f"401 Unauthorized - Check login credentials")
-                        break
-            
-            # If we succeeded, break out of the loop
-            if login_success:
-                break
-        
-        if not login_success:
-            print(f"WARNING: Login failed. Check browser Network tab to find the correct login endpoint.")
-            print(f"Tried endpoints: {', '.join(login_endpoints)}")
-            print(f"Steps to find correct endpoint:")
-            print(f"1. Open browser DevTools (F12)")
-            print(f"2. Go to Network tab")
-            print(f"3. Login manually at {CHATBOT_URL}")
-            print(f"4. Find the POST request that succeeds")
-            print(f"5. Copy the endpoint URL and set API_ENDPOINT_LOGIN in .env")
-            # Still mark as authenticated if cookies were set (some sites use cookie-based auth)
-            # Check if we have session cookies
-            if hasattr(self.client, 'cookies') and len(self.client.cookies) > 0:
-                print("NOTE: Session cookies detected, marking as authenticated")
-                self.is_authenticated = True
-
-    @task(TASK_WEIGHT_CHAT_PAGE)
-    def test_chat_page(self):
+        session = SESSION_CACHE.acquire(
+            self.auth_slot,
+            lambda: login_with_client(self.client),
+            stale=self.auth_session if stale else None,
+        )
+        self._set_session(session)
+    
+    def _set_session(self, session):
+        """Switch to a shared session (None = not authenticated)"""
+        self.auth_session = session
+        self.is_authenticated = session is not None
+        if session is not None:
+            session.apply(self.client.cookiejar)
+    
+    def _ensure_authenticated(self):
         """
-        Load the chat page (weight: 3)
-        Only accessible if authenticated
+        Make sure the user has a valid session before a request
+        
+        Returns:
+            bool: True if authenticated
         """
-        if not self.is_authenticated:
-            # Re-authenticate if session expired
-            self.login()
+        if SESSION_CACHE is None:
+            if not self.is_authenticated:
+                # Re-authenticate if session expired
+                self.login()
+            return self.is_authenticated
         
-        with self.client.get("/chat", name="Load Chat Page", catch_response=True) as resp:
-            if resp.status_code in [200, 302]:
-                resp.success()
-            elif resp.status_code == 401:
-                resp.failure("401 Unauthorized - Session may have expired")
-                self.is_authenticated = False
-            else:
-                resp.failure(f"Failed to load chat page: {resp.status_code}")
+        session = SESSION_CACHE.current(self.auth_slot)
+        if session is None or (session is self.auth_session and not self.is_authenticated):
+            # Expired or rejected with a 401: refresh it (only once for all users of the slot)
+            self.login(stale=True)
+        elif session is not self.auth_session:
+            # Another user of the slot already refreshed the session
+            self._set_session(session)
+        return self.is_authenticated
 
-    @task(TASK_WEIGHT_SEND_MESSAGE)
-    def send_chat_message(self):
+    def post_chat_message(self, message, question_category, context=None, payload_fields=None):
         """
-        Send a message to the chatbot API (weight: 5 - most frequent)
-        This simulates actual user interaction with the chatbot
+        Send one message to the chatbot API and record its TTF data
         
-        Tracks Time To First Token (TTF) for each question category
+        Args:
+            message: Question text
+            question_category: Category used in the Locust stats name and TTF data
+            context: Extra request context passed to Locust request event listeners
+            payload_fields: Extra fields of the request body (e.g. a conversation ID)
         """
-        if not self.is_authenticated:
-            # Re-authenticate if session expired
-            self.login()
-            if not self.is_authenticated:
-                return
-        
-        # Pick a random message from the sample messages
-        message = random.choice(SAMPLE_MESSAGES)
-        question_category = get_question_category(message)
-        
+        context = context or {}
+        self.last_response_metrics = None
+        self.last_answer = self.last_conversation_id = None
         # Prepare headers matching browser request
         headers = {
             "Content-Type": "application/json",
@@ -258,101 +949,282 @@ class MyUser(FastHttpUser):
             "Origin": CHATBOT_URL,
             "Referer": f"{CHATBOT_URL}/chat",
         }
+        if STREAM_RESPONSES:
+            # Compressed bodies are only decoded once complete, so ask for an identity stream
+            headers["Accept"] = "text/event-stream, application/json, text/plain, */*"
+            headers["Accept-Encoding"] = "identity"
         
         # Payload format - API expects message_content field
         payload = {"message_content": message}
-        
-        # Track TTF - measure time to first response
-        request_start_time = time.time()
-        ttf_measured = False
-        ttf_ms = None
+        if payload_fields:
+            payload.update(payload_fields)
         
         # Create custom name for Locust stats based on question category
         task_name = f"Send Chat Message - {question_category}"
         
+        request_start_time = time.perf_counter()
+        
         with self.client.post(
             API_ENDPOINT_SEND,
             json=payload,
             headers=headers,
             catch_response=True,
-            name=task_name
+            name=task_name,
+            stream=STREAM_RESPONSES,
+            context=context,
         ) as resp:
-            # Measure TTF - time until first byte received
-            if not ttf_measured:
-                ttf_ms = (time.time() - request_start_time) * 1000  # Convert to milliseconds
-                ttf_measured = True
-            # Calculate total response time
-            total_response_time_ms = (time.time() - request_start_time) * 1000
+            # Read the body incrementally so TTFB, TTFT and inter-token gaps are measured
+            # separately; connection errors (status 0) have no body to stream
+            if STREAM_RESPONSES and resp.status_code:
+                timings = read_stream(resp, request_start_time, STREAM_FORMAT, STREAM_CHUNK_SIZE)
+                # Locust stops its clock at the headers when streaming - report full response time instead
+                resp.request_meta["response_time"] = timings.total_ms
+                resp.request_meta["response_length"] = timings.byte_count
+            else:
+                timings = buffered_timings(request_start_time, resp.text)
             
             if resp.status_code in [200, 201]:
                 # Validate response
                 status = "Success"
-                try:
-                    response_data = resp.json()
-                    if "response" in response_data or "message" in response_data or "conversations" in response_data:
-                        resp.success()
+                if timings.error is not None:
+                    status = "Stream Interrupted"
+                    resp.failure(f"Response stream interrupted: {timings.error}")
+                else:
+                    # Cheap checks by default; full decoding only for a sample (see response_validation.py)
+                    error = RESPONSE_VALIDATOR.validate(timings)
+                    if error is not None:
+                        status = "Invalid Response"
+                        resp.failure(error)
                     else:
-                        resp.success()  # Status OK is good enough
-                except:
-                    resp.success()  # Status OK is good enough
+                        resp.success()
+                        if self.decode_answers or RESPONSE_VALIDATOR.sampled:
+                            self.last_answer, self.last_conversation_id = parse_response(
+                                timings.body, timings.stream_format, self.conversation_id_field
+                            )
+                        self.last_response_metrics = measure_response(timings, RESPONSE_CHARS_PER_TOKEN, self.last_answer)
+                        RESPONSE_STATS.record(question_category, self.last_response_metrics)
                 
                 # Log TTF data to CSV
-                self._log_ttf_data(question_category, message, ttf_ms, total_response_time_ms, status)
+                self._log_ttf_data(question_category, message, timings, status, context)
+                if LATENCY_HISTOGRAMS is not None and status == "Success":
+                    self._record_latency(question_category, timings, context)
             elif resp.status_code == 401:
                 status = "401 Unauthorized"
                 resp.failure("401 Unauthorized - Session may have expired, re-authenticating")
                 self.is_authenticated = False
-                self.login()
-                self._log_ttf_data(question_category, message, ttf_ms, total_response_time_ms, status)
+                self.login(stale=True)
+                self._log_ttf_data(question_category, message, timings, status, context)
             elif resp.status_code == 405:
                 # Method Not Allowed - endpoint might be wrong or need different format
                 status = "405 Method Not Allowed"
                 resp.failure(f"405 Method Not Allowed - Check browser Network tab for correct endpoint URL")
-                self._log_ttf_data(question_category, message, ttf_ms, total_response_time_ms, status)
+                self._log_ttf_data(question_category, message, timings, status, context)
             elif resp.status_code == 422:
                 # Validation error - payload format might be wrong
                 status = "422 Validation Error"
                 error_msg = f"422 Validation Error - Check payload format"
-                try:
-                    error_body = resp.text[:200]
-                    error_msg += f" - {error_body}"
-                except:
-                    pass
+                if timings.body:
+                    error_msg += f" - {timings.body[:200]}"
                 resp.failure(error_msg)
-                self._log_ttf_data(question_category, message, ttf_ms, total_response_time_ms, status)
+                self._log_ttf_data(question_category, message, timings, status, context)
             else:
                 status = f"Error {resp.status_code}"
                 error_msg = f"Status {resp.status_code}"
-                try:
-                    error_body = resp.text[:200]
-                    error_msg += f" - {error_body}"
-                except:
-                    pass
+                if timings.body:
+                    error_msg += f" - {timings.body[:200]}"
                 resp.failure(error_msg)
-                self._log_ttf_data(question_category, message, ttf_ms, total_response_time_ms, status)
+                self._log_ttf_data(question_category, message, timings, status, context)
+            self.on_chat_response(status, timings, resp.headers or {})
     
-    def _log_ttf_data(self, category, question, ttf_ms, total_ms, status):
-        """Log TTF data to CSV file"""
-        try:
-            import csv
-            from datetime import datetime
-            
-            global TTF_FILE_PATH
-            
-            if not TTF_FILE_PATH:
-                return
-            
-            # Append data to CSV
-            with open(TTF_FILE_PATH, 'a', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    datetime.now().isoformat(),
-                    category,
-                    question[:100],  # Truncate long questions
-                    round(ttf_ms, 2) if ttf_ms else None,
-                    round(total_ms, 2),
-                    status
-                ])
-        except Exception:
-            # Silently fail to avoid disrupting test
-            pass
+    def on_chat_response(self, status, timings, headers):
+        """
+        Called after every chat message with its outcome (subclasses keep conversation state here)
+        
+        Args:
+            status: "Success" or the error status written to the TTF data
+            timings: StreamTimings of the response (body included)
+            headers: Response headers
+        """
+    
+    def _record_latency(self, category, timings, context):
+        """Add a successful response to the HDR histograms with coordinated-omission correction"""
+        if "arrival_lag_ms" in context:
+            # Scheduled sends (open loop / replay): measure from the scheduled time instead
+            LATENCY_HISTOGRAMS.record_response(category, timings, lag_ms=context["arrival_lag_ms"])
+        else:
+            LATENCY_HISTOGRAMS.record_response(category, timings, expected_interval_ms=self.expected_interval_ms)
+    
+    def _log_ttf_data(self, category, question, timings, status, context):
+        """Queue a TTF row for the buffered CSV writer and count the message for the SLOs"""
+        if SLO_MONITOR is not None:
+            success = status == "Success"
+            SLO_MONITOR.record(category, success, timings.ttft_ms if success else None,
+                               timings.total_ms if success else None)
+        if TTF_WRITER is None:
+            return
+        
+        def ms(value):
+            return round(value, 2) if value is not None else None
+        
+        TTF_WRITER.write_row([
+            datetime.now().isoformat(),
+            category,
+            question[:100],  # Truncate long questions
+            ms(timings.ttft_ms),
+            ms(timings.total_ms),
+            status,
+            ms(timings.ttfb_ms),
+            ms(timings.ttlt_ms),
+            ms(timings.mean_inter_token_ms),
+            ms(timings.max_inter_token_ms),
+            timings.token_count if timings.stream_format != "buffered" else None,
+            RUN_CONTEXT.run_id,
+            RUN_CONTEXT.step,
+            context.get("conversation_turn"),
+            context.get("context_chars"),
+        ])
+        
+        if SAMPLE_STORE is not None:
+            metrics = self.last_response_metrics
+            SAMPLE_STORE.append(
+                category,
+                question,
+                status,
+                timings.ttft_ms,
+                timings.total_ms,
+                ttfb_ms=timings.ttfb_ms,
+                ttlt_ms=timings.ttlt_ms,
+                mean_inter_token_ms=timings.mean_inter_token_ms,
+                max_inter_token_ms=timings.max_inter_token_ms,
+                token_count=timings.token_count if timings.stream_format != "buffered" else None,
+                response_bytes=metrics.response_bytes if metrics is not None else timings.byte_count,
+                answer_chars=metrics.answer_chars if metrics is not None else None,
+                estimated_tokens=metrics.estimated_tokens if metrics is not None else None,
+                tokens_per_second=metrics.tokens_per_second if metrics is not None else None,
+                run_id=RUN_CONTEXT.run_id,
+                step=RUN_CONTEXT.step,
+            )
+
+
+class MyUser(ChatbotUser):
+    """
+    User class that simulates authenticated chatbot interactions
+    
+    Each virtual user will:
+    1. Login when they start
+    2. Navigate to chat page
+    3. Send weighted random messages from the question bank (sample_questions.py)
+    4. Wait 2-5 seconds between messages (simulating reading response), or with
+       ARRIVAL_RATE set, start each task at the next open-loop send time
+    
+    With PERSONA_MIX set, persona subclasses (see PersonaUser) take its place.
+    """
+    abstract = bool(PERSONA_WEIGHTS)
+    question_bank = QUESTION_BANK
+    question_corpus = None  # Corpus view with this user's category shares (None = QUESTION_CORPUS as is)
+    closed_loop_wait_time = between(WAIT_TIME_MIN, WAIT_TIME_MAX)  # Configurable wait time between tasks
+    arrival_lag_s = None  # How far behind schedule the current task started (open loop only)
+
+    def on_start(self):
+        super().on_start()
+        if ARRIVAL_SCHEDULE is not None:
+            # The first task must wait for a send slot too, not fire as soon as the user spawns
+            gevent.sleep(self.wait_time())
+
+    def wait_time(self):
+        """Closed loop: think time after each task; open loop (ARRIVAL_RATE): until the next scheduled send"""
+        if ARRIVAL_SCHEDULE is None:
+            return self.closed_loop_wait_time()
+        wait, self.arrival_lag_s = claim_arrival_slot()
+        return wait
+
+    @task(TASK_WEIGHT_CHAT_PAGE)
+    def test_chat_page(self):
+        """
+        Load the chat page (weight: 3)
+        Only accessible if authenticated
+        """
+        self._ensure_authenticated()
+        
+        with self.client.get("/chat", name="Load Chat Page", catch_response=True) as resp:
+            if resp.status_code in [200, 302]:
+                resp.success()
+            elif resp.status_code == 401:
+                resp.failure("401 Unauthorized - Session may have expired")
+                self.is_authenticated = False
+            else:
+                resp.failure(f"Failed to load chat page: {resp.status_code}")
+
+    @task(TASK_WEIGHT_SEND_MESSAGE)
+    def send_chat_message(self):
+        """
+        Send a message to the chatbot API (weight: 5 - most frequent)
+        This simulates actual user interaction with the chatbot
+        
+        Tracks Time To First Token (TTF) for each question category
+        """
+        if not self._ensure_authenticated():
+            return
+        
+        # Pick a weighted random message from the external corpus or the built-in question bank
+        context = {}
+        if QUESTION_CORPUS is not None:
+            question = (self.question_corpus or QUESTION_CORPUS).sample()
+            message, question_category = question.text, question.category
+        else:
+            message, question_category = self.question_bank.sample()
+        if self.arrival_lag_s is not None:
+            context["arrival_lag_ms"] = self.arrival_lag_s * 1000
+        
+        self.post_chat_message(message, question_category, context)
+
+
+class PersonaUser(MyUser):
+    """
+    MyUser with the task mix, question categories and think time of a persona (see personas.py)
+    
+    One subclass per persona in PERSONA_MIX is created below; Locust spawns
+    them in the ratio of their weights. With a reading think-time model the
+    user waits after each message until it has read the answer it received,
+    so those personas decode every answer.
+    """
+    abstract = True
+    persona = None
+    answer_words = 0  # Words of the answer received by the last task
+
+    def closed_loop_wait_time(self):
+        answer_words, self.answer_words = self.answer_words, 0
+        return self.persona.think_time.seconds(answer_words)
+
+    def on_chat_response(self, status, timings, headers):
+        if self.last_response_metrics is not None:
+            # None when the answer was not decoded (uniform think time)
+            self.answer_words = self.last_response_metrics.answer_words or 0
+
+
+def _persona_user_class(persona, weight):
+    """Locust user class of a persona"""
+    if LATENCY_HISTOGRAM_EXPECTED_INTERVAL_MS == "auto":
+        expected_interval_ms = persona.think_time.expected_seconds * 1000
+    else:
+        expected_interval_ms = EXPECTED_INTERVAL_MS
+    user_class = type(persona.class_name, (PersonaUser,), {
+        "__module__": __name__,
+        "__doc__": f"Persona '{persona.name}': {persona.describe()}",
+        "abstract": False,
+        "weight": weight,
+        "persona": persona,
+        "decode_answers": persona.think_time.reads_answers,
+        "question_bank": QUESTION_BANK.with_category_shares(persona.categories) if persona.categories else QUESTION_BANK,
+        "expected_interval_ms": expected_interval_ms,
+    })
+    # Subclasses inherit MyUser's task list; replace it with the persona's mix
+    user_class.tasks = ([MyUser.test_chat_page] * persona.chat_page_weight
+                        + [MyUser.send_chat_message] * persona.send_message_weight)
+    return user_class
+
+
+# Module-level classes, so Locust picks them up like MyUser
+PERSONA_USER_CLASSES = [_persona_user_class(_persona, _weight) for _persona, _weight in PERSONA_WEIGHTS]
+# (no loop variable: Locust would pick it up as another user class)
+globals().update({user_class.__name__: user_class for user_class in PERSONA_USER_CLASSES})
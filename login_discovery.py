@@ -0,0 +1,133 @@
+"""
+Login Endpoint Discovery
+Finds the login endpoint and payload format the target accepts - once, not per user
+
+The configured API_ENDPOINT_LOGIN is tried first, then LOGIN_ENDPOINT_FALLBACKS,
+each with a JSON body and (on 404 / 415) a form-encoded body. Probing uses a
+plain `requests` session, so its traffic never shows up in the Locust stats.
+
+The first endpoint + format that works is saved to LOGIN_ENDPOINT_CACHE_PATH,
+keyed by host, and reused by every user, every worker and later runs until it
+stops working. run_tests.py runs the discovery as a pre-flight step before
+Locust starts.
+"""
+import json
+import time
+from pathlib import Path
+
+import requests
+
+LOGIN_FORMATS = ("json", "form")
+
+
+def login_request_kwargs(login_format, email, password, headers):
+    """Keyword arguments for a login POST in the given format (works for requests and Locust clients)"""
+    payload = {"email": email, "password": password}
+    headers = dict(headers)
+    if login_format == "form":
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        return {"data": payload, "headers": headers}
+    headers["Content-Type"] = "application/json"
+    return {"json": payload, "headers": headers}
+
+
+def is_login_success(status_code, text, login_format="json"):
+    """
+    Decide whether a login response means we are logged in
+
+    JSON logins must redirect or mention a token / success (or return a
+    non-JSON body); form logins only need a 2xx / 302 status.
+    """
+    if status_code not in (200, 201, 302):
+        return False
+    if login_format == "form" or status_code == 302:
+        return True
+    text = (text or "").lower()
+    if "token" in text or "success" in text:
+        return True
+    try:
+        json.loads(text)
+    except ValueError:
+        # If response is not JSON but status is OK, assume success
+        return True
+    return False
+
+
+def discover_login_endpoint(host, endpoints, email, password, headers=None, timeout=10):
+    """
+    Probe login endpoints until one accepts the credentials
+
+    Args:
+        host: Base URL of the target
+        endpoints: Endpoints to try, in order
+        email, password: Login credentials
+        headers: Extra request headers (Origin, Referer, ...)
+        timeout: Per-request timeout in seconds
+
+    Returns:
+        tuple: ({"endpoint": ..., "format": "json" | "form"} or None, list of (endpoint, format, status) tried)
+    """
+    tried = []
+    with requests.Session() as session:
+        for endpoint in endpoints:
+            for login_format in LOGIN_FORMATS:
+                try:
+                    resp = session.post(
+                        host.rstrip("/") + endpoint,
+                        timeout=timeout,
+                        allow_redirects=False,
+                        **login_request_kwargs(login_format, email, password, headers or {}),
+                    )
+                except requests.RequestException as e:
+                    tried.append((endpoint, login_format, str(e)))
+                    break
+                tried.append((endpoint, login_format, resp.status_code))
+                if is_login_success(resp.status_code, resp.text, login_format):
+                    return {"endpoint": endpoint, "format": login_format}, tried
+                if resp.status_code == 401:
+                    # The endpoint exists but the credentials are wrong - no point trying others
+                    return None, tried
+                if resp.status_code not in (404, 415):
+                    # Form-data is only worth trying when JSON was not understood
+                    break
+    return None, tried
+
+
+def load_cached_endpoint(path, host, configured_endpoint):
+    """Return the cached {"endpoint", "format"} for host, or None if absent or for another configuration"""
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f).get(host)
+    except (OSError, ValueError):
+        return None
+    if not entry or entry.get("configured_endpoint") != configured_endpoint:
+        return None
+    if entry.get("format") not in LOGIN_FORMATS or not entry.get("endpoint"):
+        return None
+    return {"endpoint": entry["endpoint"], "format": entry["format"]}
+
+
+def save_cached_endpoint(path, host, configured_endpoint, discovered):
+    """Store (or with discovered=None, forget) the login endpoint for host"""
+    path = Path(path)
+    try:
+        with open(path, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    if discovered is None:
+        if cache.pop(host, None) is None:
+            return
+    else:
+        cache[host] = {
+            "endpoint": discovered["endpoint"],
+            "format": discovered["format"],
+            "configured_endpoint": configured_endpoint,
+            "discovered_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Workers may write concurrently - replace the file atomically
+    tmp_path = path.with_name(f"{path.name}.{time.time_ns()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    tmp_path.replace(path)
@@ -0,0 +1,331 @@
+"""
+Mock Chatbot Server
+Local stand-in for the chatbot, used to benchmark the harness itself and to run tests offline
+
+Usage:
+    python mock_server.py [--host 127.0.0.1] [--port 8765]
+    python run_tests.py load --mock        # starts the mock server and tests against it
+
+Implements the endpoints used by locustfile.py:
+- GET  /                    login page
+- GET  /chat                chat page (401 without a session when MOCK_REQUIRE_AUTH is on)
+- POST API_ENDPOINT_LOGIN   JSON or form login; returns a token and sets a session cookie
+- POST API_ENDPOINT_SEND    chat message, answered as an SSE / NDJSON stream or one JSON document
+- GET  /__mock/stats        counters of the mock server itself (JSON)
+
+Behaviour is configured with the MOCK_* settings in test_config.py:
+- time to first token drawn from a log-normal distribution per question category
+- response tokens streamed at MOCK_TOKENS_PER_SECOND
+- conversations: every answer carries a conversation ID (CONVERSATION_ID_HEADER
+  header, and CONVERSATION_ID_FIELD in JSON answers); a follow-up that sends it
+  back waits MOCK_CONTEXT_MS_PER_KCHAR longer per 1000 characters of history
+- error injection: 401 / 422 / 5xx with configurable probabilities
+- a concurrency limit: requests beyond MOCK_MAX_CONCURRENCY wait for a free slot
+  (so latency climbs like a saturated backend) and requests beyond
+  MOCK_MAX_QUEUE waiting ones are rejected with 503
+
+Only gevent is needed, which is installed with Locust.
+"""
+import argparse
+import json
+import math
+import random
+import secrets
+import signal
+import time
+from urllib.parse import parse_qs
+
+from gevent import signal_handler, sleep
+from gevent.lock import Semaphore
+from gevent.pywsgi import WSGIServer
+
+from sample_questions import get_question_category
+from test_config import (
+    API_ENDPOINT_LOGIN,
+    API_ENDPOINT_SEND,
+    CONVERSATION_ID_FIELD,
+    CONVERSATION_ID_HEADER,
+    MOCK_SERVER_HOST,
+    MOCK_SERVER_PORT,
+    MOCK_TTFT_MS,
+    MOCK_LATENCY_SIGMA,
+    MOCK_RESPONSE_TOKENS,
+    MOCK_TOKENS_PER_SECOND,
+    MOCK_CONTEXT_MS_PER_KCHAR,
+    MOCK_STREAM_FORMAT,
+    MOCK_ERROR_RATE_401,
+    MOCK_ERROR_RATE_422,
+    MOCK_ERROR_RATE_5XX,
+    MOCK_MAX_CONCURRENCY,
+    MOCK_MAX_QUEUE,
+    MOCK_REQUIRE_AUTH,
+    MOCK_SESSION_TTL,
+)
+
+# Words used to build mock responses
+MOCK_WORDS = (
+    "certificate", "origin", "tariff", "export", "customs", "agreement", "trade",
+    "document", "application", "eligibility", "product", "shipment", "rules", "the",
+    "for", "your", "and", "under", "preferential", "requirements",
+)
+
+# Conversation histories kept; the oldest are forgotten beyond this
+MAX_CONVERSATIONS = 10000
+
+
+class MockChatbot:
+    """WSGI application imitating the chatbot's login and chat endpoints"""
+
+    def __init__(self, ttft_ms=None, latency_sigma=MOCK_LATENCY_SIGMA, response_tokens=None,
+                 tokens_per_second=MOCK_TOKENS_PER_SECOND, context_ms_per_kchar=MOCK_CONTEXT_MS_PER_KCHAR,
+                 stream_format=MOCK_STREAM_FORMAT,
+                 error_rate_401=MOCK_ERROR_RATE_401, error_rate_422=MOCK_ERROR_RATE_422,
+                 error_rate_5xx=MOCK_ERROR_RATE_5XX, max_concurrency=MOCK_MAX_CONCURRENCY,
+                 max_queue=MOCK_MAX_QUEUE, require_auth=MOCK_REQUIRE_AUTH, session_ttl=MOCK_SESSION_TTL):
+        self.ttft_ms = ttft_ms if ttft_ms is not None else MOCK_TTFT_MS
+        self.latency_sigma = latency_sigma
+        self.response_tokens = response_tokens if response_tokens is not None else MOCK_RESPONSE_TOKENS
+        self.tokens_per_second = tokens_per_second
+        self.context_ms_per_kchar = context_ms_per_kchar
+        self.stream_format = stream_format
+        self.error_rate_401 = error_rate_401
+        self.error_rate_422 = error_rate_422
+        self.error_rate_5xx = error_rate_5xx
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.require_auth = require_auth
+        self.session_ttl = session_ttl
+
+        # Session token -> expiry time (0 = never expires)
+        self.sessions = {}
+        # Conversation ID -> characters of history (questions and answers)
+        self.conversations = {}
+        self._slots = Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.stats = {
+            "logins": 0,
+            "chat_requests": 0,
+            "follow_ups": 0,
+            "completed": 0,
+            "rejected_503": 0,
+            "injected_errors": 0,
+            "unauthorized": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "queued": 0,
+            "max_queued": 0,
+        }
+
+    def __call__(self, environ, start_response):
+        method = environ["REQUEST_METHOD"]
+        path = environ.get("PATH_INFO", "/")
+
+        if method == "POST" and path == API_ENDPOINT_SEND:
+            return self.send_message(environ, start_response)
+        if method == "POST" and path == API_ENDPOINT_LOGIN:
+            return self.login(environ, start_response)
+        if method == "GET" and path == "/":
+            return _respond(start_response, "200 OK", "<html><body><form>Login</form></body></html>", "text/html")
+        if method == "GET" and path == "/chat":
+            if not self._authenticated(environ):
+                return _respond_json(start_response, "401 Unauthorized", {"detail": "Not authenticated"})
+            return _respond(start_response, "200 OK", "<html><body>Chat</body></html>", "text/html")
+        if method == "GET" and path == "/__mock/stats":
+            return _respond_json(start_response, "200 OK", self.stats)
+        return _respond_json(start_response, "404 Not Found", {"detail": "Not Found"})
+
+    def login(self, environ, start_response):
+        """Accept any non-empty email/password (JSON or form) and start a session"""
+        body = _read_body(environ)
+        credentials = {}
+        if "json" in environ.get("CONTENT_TYPE", ""):
+            try:
+                credentials = json.loads(body or b"{}")
+            except ValueError:
+                return _respond_json(start_response, "422 Unprocessable Entity", {"detail": "Invalid JSON"})
+        else:
+            credentials = {key: values[0] for key, values in parse_qs(body.decode("utf-8", "replace")).items()}
+        if not credentials.get("email") or not credentials.get("password"):
+            return _respond_json(start_response, "401 Unauthorized", {"detail": "Invalid credentials"})
+
+        token = secrets.token_hex(16)
+        self.sessions[token] = time.time() + self.session_ttl if self.session_ttl > 0 else 0
+        self.stats["logins"] += 1
+        headers = [("Set-Cookie", f"session={token}; Path=/; HttpOnly")]
+        return _respond_json(start_response, "200 OK", {"success": True, "token": token}, headers)
+
+    def send_message(self, environ, start_response):
+        """Answer a chat message after a simulated queue wait, TTFT and token stream"""
+        self.stats["chat_requests"] += 1
+        if not self._authenticated(environ):
+            self.stats["unauthorized"] += 1
+            return _respond_json(start_response, "401 Unauthorized", {"detail": "Not authenticated"})
+
+        try:
+            request = json.loads(_read_body(environ) or b"{}")
+            message = request.get("message_content")
+        except (ValueError, AttributeError):
+            request, message = {}, None
+        if not message:
+            return _respond_json(start_response, "422 Unprocessable Entity",
+                                 {"detail": [{"loc": ["body", "message_content"], "msg": "field required"}]})
+
+        error = self._injected_error()
+        if error is not None:
+            self.stats["injected_errors"] += 1
+            return _respond_json(start_response, error, {"detail": "Injected error"})
+
+        if (self._slots is not None and self._slots.locked() and self.max_queue >= 0
+                and self.stats["queued"] >= self.max_queue):
+            self.stats["rejected_503"] += 1
+            return _respond_json(start_response, "503 Service Unavailable", {"detail": "Server busy"})
+
+        category = get_question_category(message)
+        tokens = [random.choice(MOCK_WORDS) for _ in range(self._response_tokens(category))]
+        token_interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+
+        # A longer history takes longer to process before the first token
+        conversation_id = str(request.get(CONVERSATION_ID_FIELD) or "")
+        history_chars = self.conversations.pop(conversation_id, None)
+        if history_chars is None:
+            conversation_id, history_chars = secrets.token_hex(8), 0
+        else:
+            self.stats["follow_ups"] += 1
+        self.conversations[conversation_id] = history_chars + len(message) + sum(len(token) + 1 for token in tokens)
+        if len(self.conversations) > MAX_CONVERSATIONS:
+            del self.conversations[next(iter(self.conversations))]
+        ttft_s = (self._draw_ttft_ms(category) + history_chars / 1000 * self.context_ms_per_kchar) / 1000
+
+        stream_format = self.stream_format
+        content_type = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}.get(stream_format, "application/json")
+        start_response("200 OK", [("Content-Type", content_type), ("Cache-Control", "no-cache"),
+                                  (CONVERSATION_ID_HEADER, conversation_id)])
+        # Headers are only sent with the first body chunk, so queueing shows up as time to first byte
+        return self._generate(stream_format, ttft_s, tokens, token_interval, conversation_id)
+
+    def _generate(self, stream_format, ttft_s, tokens, token_interval, conversation_id):
+        """Body generator: wait for a slot, then emit tokens (holding the slot until done)"""
+        self._acquire_slot()
+        try:
+            if stream_format == "sse":
+                # SSE comment: sends the headers now, carries no token
+                yield b": connected\n\n"
+            sleep(ttft_s)
+            for i, token in enumerate(tokens):
+                if i and token_interval:
+                    sleep(token_interval)
+                if stream_format == "sse":
+                    yield f"data: {json.dumps({'token': token + ' '})}\n\n".encode("utf-8")
+                elif stream_format == "ndjson":
+                    yield (json.dumps({"token": token + " "}) + "\n").encode("utf-8")
+            if stream_format == "sse":
+                yield b"data: [DONE]\n\n"
+            elif stream_format != "ndjson":
+                # Non-streaming: one JSON document once the whole answer is "generated"
+                yield json.dumps({"response": " ".join(tokens), CONVERSATION_ID_FIELD: conversation_id}).encode("utf-8")
+            self.stats["completed"] += 1
+        finally:
+            self._release_slot()
+
+    def _acquire_slot(self):
+        self.stats["queued"] += 1
+        self.stats["max_queued"] = max(self.stats["max_queued"], self.stats["queued"])
+        try:
+            if self._slots is not None:
+                self._slots.acquire()
+        finally:
+            self.stats["queued"] -= 1
+        self.stats["in_flight"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def _release_slot(self):
+        self.stats["in_flight"] -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def _authenticated(self, environ):
+        if not self.require_auth:
+            return True
+        token = _session_cookie(environ)
+        expires = self.sessions.get(token)
+        if expires is None:
+            return False
+        if expires and expires < time.time():
+            del self.sessions[token]
+            return False
+        return True
+
+    def _injected_error(self):
+        """Return an error status line according to the configured error rates, or None"""
+        roll = random.random() * 100
+        if roll < self.error_rate_401:
+            return "401 Unauthorized"
+        roll -= self.error_rate_401
+        if roll < self.error_rate_422:
+            return "422 Unprocessable Entity"
+        roll -= self.error_rate_422
+        if roll < self.error_rate_5xx:
+            return random.choice(("500 Internal Server Error", "502 Bad Gateway", "503 Service Unavailable"))
+        return None
+
+    def _draw_ttft_ms(self, category):
+        """Log-normal time to first token whose median is the category's configured TTFT"""
+        median = self.ttft_ms.get(category, self.ttft_ms.get("default", 0))
+        if median <= 0:
+            return 0
+        return random.lognormvariate(math.log(median), self.latency_sigma) if self.latency_sigma > 0 else median
+
+    def _response_tokens(self, category):
+        return max(1, int(self.response_tokens.get(category, self.response_tokens.get("default", 1))))
+
+
+def _read_body(environ):
+    try:
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+    return environ["wsgi.input"].read(length) if length > 0 else b""
+
+
+def _session_cookie(environ):
+    for part in environ.get("HTTP_COOKIE", "").split(";"):
+        name, _, value = part.strip().partition("=")
+        if name == "session":
+            return value
+    return None
+
+
+def _respond(start_response, status, body, content_type, headers=None):
+    data = body.encode("utf-8")
+    start_response(status, [("Content-Type", content_type), ("Content-Length", str(len(data)))] + (headers or []))
+    return [data]
+
+
+def _respond_json(start_response, status, payload, headers=None):
+    return _respond(start_response, status, json.dumps(payload), "application/json", headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock chatbot server for offline testing")
+    parser.add_argument("--host", default=MOCK_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=MOCK_SERVER_PORT)
+    args = parser.parse_args()
+
+    app = MockChatbot()
+    print(f"Mock chatbot listening on http://{args.host}:{args.port}")
+    print(f"  TTFT medians (ms): {app.ttft_ms}")
+    print(f"  Tokens per response: {app.response_tokens} at {app.tokens_per_second:g} tokens/s ({app.stream_format})")
+    print(f"  Conversation history: +{app.context_ms_per_kchar:g}ms TTFT per 1000 characters")
+    print(f"  Concurrency limit: {app.max_concurrency or 'unlimited'} (queue {app.max_queue})")
+    server = WSGIServer((args.host, args.port), app, log=None)
+    # run_tests.py --mock stops the server with SIGTERM
+    signal_handler(signal.SIGTERM, server.stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Mock chatbot stats: {json.dumps(app.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+User Personas
+Task mixes, question categories and think-time models of different kinds of users
+
+The load test's MyUser is one homogeneous user: the same page-load / message
+mix, the same question distribution and a uniform 2-5s wait for everybody.
+Real users differ: someone looking up a quick fact sends a few short questions
+and skims the answers, a researcher asks long questions and reads long answers
+carefully, an idle visitor mostly reloads the page. A persona describes one
+such kind of user:
+- task weights: loading the chat page vs sending a message
+- question categories: share of Simple / Common / Complex questions (None =
+  the question bank's own weights)
+- think time: how long the user waits after each task
+
+Think-time models:
+- uniform: a random wait between min_seconds and max_seconds
+- reading: min_seconds plus the time it takes to read the answer that was just
+  received at words_per_minute (+/- jitter), capped at max_seconds, so long
+  generations are followed by long pauses as in real use
+
+PERSONA_MIX in test_config.py picks personas and their ratio of users, for
+example "quick_lookup:5,deep_research:2,idle_browser:3". Personas can be
+added or overridden with a JSON file (PERSONAS_PATH) mapping names to the same
+fields as PERSONAS below.
+"""
+import json
+import random
+
+# Built-in personas (PERSONAS_PATH can add more or override them)
+PERSONAS = {
+    # Asks short factual questions and skims the answer
+    "quick_lookup": {
+        "chat_page_weight": 1,
+        "send_message_weight": 6,
+        "categories": {"Simple": 6, "Common": 3, "Complex": 1},
+        "think_time": {"model": "reading", "words_per_minute": 400, "min_seconds": 1, "max_seconds": 15},
+    },
+    # Asks detailed questions and reads every answer carefully
+    "deep_research": {
+        "chat_page_weight": 1,
+        "send_message_weight": 10,
+        "categories": {"Simple": 1, "Common": 3, "Complex": 6},
+        "think_time": {"model": "reading", "words_per_minute": 200, "min_seconds": 5, "max_seconds": 120},
+    },
+    # Keeps the chat open, reloads it now and then and rarely asks anything
+    "idle_browser": {
+        "chat_page_weight": 6,
+        "send_message_weight": 1,
+        "categories": {"Simple": 5, "Common": 4, "Complex": 1},
+        "think_time": {"model": "uniform", "min_seconds": 10, "max_seconds": 30},
+    },
+}
+
+
+class UniformThinkTime:
+    """Random wait between min_seconds and max_seconds"""
+    reads_answers = False  # The wait does not depend on the answer
+
+    def __init__(self, min_seconds, max_seconds):
+        self.min_seconds = float(min_seconds)
+        self.max_seconds = max(float(max_seconds), self.min_seconds)
+
+    def __str__(self):
+        return f"uniform {self.min_seconds:g}-{self.max_seconds:g}s"
+
+    @property
+    def expected_seconds(self):
+        return (self.min_seconds + self.max_seconds) / 2
+
+    def seconds(self, answer_words=0, rng=random):
+        return rng.uniform(self.min_seconds, self.max_seconds)
+
+
+class ReadingThinkTime:
+    """Wait long enough to read the last answer at words_per_minute"""
+    reads_answers = True  # Needs the word count of every answer, so answers are always decoded
+
+    def __init__(self, words_per_minute=240, min_seconds=1, max_seconds=60, jitter=0.3):
+        if float(words_per_minute) <= 0:
+            raise ValueError("words_per_minute must be positive")
+        self.words_per_minute = float(words_per_minute)
+        self.min_seconds = float(min_seconds)
+        self.max_seconds = max(float(max_seconds), self.min_seconds)
+        self.jitter = min(max(float(jitter), 0.0), 1.0)
+
+    def __str__(self):
+        return f"reading {self.words_per_minute:g} wpm, {self.min_seconds:g}-{self.max_seconds:g}s"
+
+    @property
+    def expected_seconds(self):
+        """Shortest wait (nothing to read); used as the coordinated-omission correction interval"""
+        return self.min_seconds
+
+    def seconds(self, answer_words=0, rng=random):
+        """
+        Think time after a task
+
+        Args:
+            answer_words: Words of the answer received by the task (0 = nothing to read)
+        """
+        reading = answer_words / self.words_per_minute * 60
+        reading *= rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(self.min_seconds + reading, self.max_seconds)
+
+
+THINK_TIME_MODELS = {"uniform": UniformThinkTime, "reading": ReadingThinkTime}
+
+
+class Persona:
+    """One kind of user: task weights, question category shares and think-time model"""
+
+    def __init__(self, name, chat_page_weight=3, send_message_weight=5, categories=None, think_time=None):
+        if int(chat_page_weight) < 0 or int(send_message_weight) < 0 or int(chat_page_weight) + int(send_message_weight) == 0:
+            raise ValueError(f"Persona '{name}' needs a positive chat_page_weight or send_message_weight")
+        self.name = name
+        self.chat_page_weight = int(chat_page_weight)
+        self.send_message_weight = int(send_message_weight)
+        self.categories = {category: float(weight) for category, weight in categories.items()} if categories else None
+        self.think_time = think_time or UniformThinkTime(2, 5)
+
+    @classmethod
+    def from_dict(cls, name, data):
+        """
+        Persona from its JSON / PERSONAS entry
+
+        Raises:
+            ValueError: Unknown think-time model or invalid weights
+        """
+        think_time = dict(data.get("think_time") or {"model": "uniform", "min_seconds": 2, "max_seconds": 5})
+        model = think_time.pop("model", "uniform")
+        if model not in THINK_TIME_MODELS:
+            raise ValueError(f"Persona '{name}': unknown think-time model '{model}' (use {', '.join(THINK_TIME_MODELS)})")
+        return cls(
+            name,
+            data.get("chat_page_weight", 3),
+            data.get("send_message_weight", 5),
+            data.get("categories"),
+            THINK_TIME_MODELS[model](**think_time),
+        )
+
+    @property
+    def class_name(self):
+        """Locust user class name ("deep_research" -> "DeepResearchUser")"""
+        return "".join(part.capitalize() for part in self.name.replace("-", "_").split("_") if part) + "User"
+
+    def describe(self):
+        categories = ", ".join(f"{name}:{weight:g}" for name, weight in self.categories.items()) if self.categories else "question bank weights"
+        return (f"page:message {self.chat_page_weight}:{self.send_message_weight}, "
+                f"categories {categories}, think time {self.think_time}")
+
+
+def load_personas(path=None):
+    """
+    Built-in personas, plus / overridden by the personas in a JSON file
+
+    Returns:
+        dict: name -> Persona
+    """
+    definitions = dict(PERSONAS)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            definitions.update(json.load(f))
+    return {name: Persona.from_dict(name, data) for name, data in definitions.items()}
+
+
+def parse_persona_mix(text, personas):
+    """
+    Parse PERSONA_MIX ("quick_lookup:5,deep_research:2")
+
+    Args:
+        text: Comma-separated persona names with their share of users (a name alone = 1)
+        personas: Known personas (see load_personas)
+
+    Returns:
+        list: (Persona, weight) in the given order; empty when text is empty
+
+    Raises:
+        ValueError: Unknown persona or invalid weight
+    """
+    mix = []
+    for item in text.split(","):
+        name, _, weight = item.partition(":")
+        name = name.strip()
+        if not name:
+            continue
+        if name not in personas:
+            raise ValueError(f"Unknown persona '{name}' in PERSONA_MIX (known: {', '.join(sorted(personas))})")
+        try:
+            weight = int(weight) if weight.strip() else 1
+        except ValueError:
+            raise ValueError(f"Invalid PERSONA_MIX weight '{weight.strip()}' for '{name}' (use whole numbers)") from None
+        if weight <= 0:
+            raise ValueError(f"PERSONA_MIX weight of '{name}' must be positive")
+        mix.append((personas[name], weight))
+    return mix
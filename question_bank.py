@@ -0,0 +1,136 @@
+"""
+Question Bank
+Constant-time weighted question sampling and category lookup
+
+Questions are stored once, however large their weights are. Sampling uses
+Walker's alias method: after an O(n) build, picking a question takes two
+random numbers and one table lookup regardless of corpus size or weights.
+Looking up a question's category is a single dict lookup.
+"""
+import random
+from array import array
+
+
+class QuestionBank:
+    """Weighted set of questions, each with a category"""
+
+    def __init__(self):
+        self.questions = []
+        self.category_names = []
+        self._category_ids = array("H")  # category of each question (index into category_names)
+        self._weights = array("d")
+        self._category_index = {}  # question text -> category id (first category wins)
+        self._category_lookup = {}  # category name -> category id
+        self._prob = None
+        self._alias = None
+
+    def __len__(self):
+        return len(self.questions)
+
+    def add(self, question, category, weight=1.0):
+        """Add a question with its category and relative sampling weight"""
+        category_id = self._category_lookup.get(category)
+        if category_id is None:
+            category_id = len(self.category_names)
+            self._category_lookup[category] = category_id
+            self.category_names.append(category)
+        self.questions.append(question)
+        self._category_ids.append(category_id)
+        self._weights.append(max(0.0, float(weight)))
+        self._category_index.setdefault(question, category_id)
+        # Table must be rebuilt before the next sample
+        self._prob = None
+
+    def add_many(self, questions, category, weight=1.0):
+        """Add several questions of one category with the same weight"""
+        for question in questions:
+            self.add(question, category, weight)
+
+    def category_of(self, question, default="Unknown"):
+        """Category of a question (default if it is not in the bank)"""
+        category_id = self._category_index.get(question)
+        return self.category_names[category_id] if category_id is not None else default
+
+    def sample(self, rng=random):
+        """
+        Pick a question according to the weights
+
+        Returns:
+            tuple: (question, category)
+        """
+        if self._prob is None:
+            self.build()
+        i = alias_pick(self._prob, self._alias, rng)
+        return self.questions[i], self.category_names[self._category_ids[i]]
+
+    def build(self):
+        """Build the alias table (called automatically by the first sample())"""
+        if len(self._weights) == 0 or sum(self._weights) <= 0:
+            raise ValueError("Question bank has no questions with a positive weight")
+        self._prob, self._alias = build_alias_table(self._weights)
+
+    def with_category_shares(self, shares):
+        """
+        Copy of the bank in which each category gets the given share of samples
+
+        Args:
+            shares: Category name -> relative share; categories not listed are never sampled
+
+        Raises:
+            ValueError: None of the listed categories is in the bank
+        """
+        totals = {}
+        for category_id, weight in zip(self._category_ids, self._weights):
+            totals[category_id] = totals.get(category_id, 0.0) + weight
+        bank = QuestionBank()
+        for question, category_id, weight in zip(self.questions, self._category_ids, self._weights):
+            name = self.category_names[category_id]
+            share = float(shares.get(name, 0.0))
+            # Keep the relative weights of questions within a category
+            bank.add(question, name, share * weight / totals[category_id] if totals[category_id] else 0.0)
+        bank.build()
+        return bank
+
+    def category_weights(self):
+        """Share of samples (0-1) that each category is expected to get"""
+        total = sum(self._weights)
+        shares = {}
+        for category_id, weight in zip(self._category_ids, self._weights):
+            name = self.category_names[category_id]
+            shares[name] = shares.get(name, 0.0) + (weight / total if total else 0.0)
+        return shares
+
+
+def build_alias_table(weights):
+    """
+    Build Walker/Vose alias tables for a sequence of non-negative weights
+
+    Returns:
+        tuple: (prob, alias) arrays for alias_pick()
+    """
+    n = len(weights)
+    total = sum(weights)
+    # Scale weights so the average is 1, then pair small with large entries
+    scaled = array("d", (w * n / total for w in weights))
+    prob = array("d", [1.0]) * n
+    alias = array("I", range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    # Leftovers are 1.0 up to floating point error
+    for i in small + large:
+        prob[i] = 1.0
+    return prob, alias
+
+
+def alias_pick(prob, alias, rng=random):
+    """Pick an index from alias tables in constant time"""
+    i = int(rng.random() * len(prob))
+    if rng.random() >= prob[i]:
+        i = alias[i]
+    return i
@@ -0,0 +1,293 @@
+"""
+External Question Corpus
+Streams a large question file (JSONL, CSV or Parquet) with per-question metadata
+
+Each row is a question with optional metadata (other fields are ignored):
+- question (or text / message / message_content): the message sent to the chatbot
+- category: used for the Locust stats name and TTF reports (default "Uncategorized")
+- weight: relative sampling weight (default 1)
+
+Rows are sharded deterministically across Locust workers: worker i of n keeps
+the rows whose row number modulo n is i, so every question is sent by exactly
+one worker and the split is the same on every run.
+
+JSONL and CSV files are never loaded into memory. Opening the corpus makes one
+streaming pass that records the byte offset, length and category of each row
+of the shard (about 32 bytes per row including the sampling tables); the file
+is then memory-mapped and a sampled row is parsed only when it is used. Parquet
+files need pyarrow and are read in record batches; only the shard's rows are kept.
+
+with_category_shares() gives a view of the corpus with its own alias tables,
+in which each category gets a given share of the samples (used by personas);
+views share the index and the memory map.
+"""
+import csv
+import io
+import json
+import mmap
+import random
+from array import array
+from pathlib import Path
+
+from question_bank import alias_pick, build_alias_table
+
+FORMATS = ("jsonl", "csv", "parquet")
+
+QUESTION_FIELDS = ("question", "text", "message", "message_content")
+DEFAULT_CATEGORY = "Uncategorized"
+
+
+class CorpusQuestion:
+    """One question of the corpus with its metadata"""
+
+    __slots__ = ("text", "category", "weight")
+
+    def __init__(self, text, category=DEFAULT_CATEGORY, weight=1.0):
+        self.text = text
+        self.category = category
+        self.weight = weight
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a question from a parsed JSON object / CSV row / Parquet record"""
+        text = _first_value(row, QUESTION_FIELDS)
+        if text is None or str(text).strip() == "":
+            raise ValueError(f"Row has no question text (expected one of: {', '.join(QUESTION_FIELDS)})")
+        return cls(
+            text=str(text),
+            category=str(row.get("category") or DEFAULT_CATEGORY),
+            weight=_parse_weight(row.get("weight")),
+        )
+
+
+class QuestionCorpus:
+    """Lazily-read, weighted, sharded question corpus"""
+
+    def __init__(self, path, shard_index=0, shard_count=1, file_format="auto"):
+        self.path = Path(path)
+        self.shard_index = int(shard_index)
+        self.shard_count = max(1, int(shard_count))
+        self.file_format = detect_format(self.path) if file_format == "auto" else file_format
+        if self.file_format not in FORMATS:
+            raise ValueError(f"Unsupported corpus format '{file_format}' (use one of: {', '.join(FORMATS)})")
+        if not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"Shard index {self.shard_index} is out of range for {self.shard_count} shards")
+
+        self.total_rows = 0  # rows in the whole file, all shards
+        self._offsets = array("Q")
+        self._lengths = array("I")
+        self._questions = []  # Parquet only: the shard's rows
+        self._weights = array("d")
+        self._weighted = False
+        self.category_names = []
+        self._category_ids = array("H")  # category of each row (index into category_names)
+        self._category_lookup = {}  # category name -> category id
+        self._prob = None
+        self._alias = None
+        self._file = None
+        self._mmap = None
+        self._csv_header = None
+
+    def __len__(self):
+        if self.file_format == "parquet":
+            return len(self._questions)
+        return len(self._offsets)
+
+    def open(self):
+        """Index the shard's rows and build the sampling tables"""
+        if self.file_format == "parquet":
+            self._load_parquet()
+        else:
+            self._index_text_file()
+        if len(self) == 0:
+            self.close()
+            raise ValueError(f"Corpus {self.path} has no rows for shard {self.shard_index} of {self.shard_count}")
+        if self._weighted:
+            if sum(self._weights) <= 0:
+                self.close()
+                raise ValueError(f"Corpus {self.path} has no questions with a positive weight")
+            self._prob, self._alias = build_alias_table(self._weights)
+        else:
+            # Uniform corpora need no per-row weights
+            self._weights = array("d")
+        return self
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def sample(self, rng=random):
+        """Pick a question of this shard according to the weights (CorpusQuestion)"""
+        if self._prob is not None:
+            i = alias_pick(self._prob, self._alias, rng)
+        else:
+            i = int(rng.random() * len(self))
+        return self.get(i)
+
+    def with_category_shares(self, shares):
+        """
+        View of the opened corpus in which each category gets the given share of samples
+
+        Like QuestionBank.with_category_shares: rows keep their relative weights within a category.
+
+        Args:
+            shares: Category name -> relative share; categories not listed are never sampled
+
+        Returns:
+            CorpusView
+
+        Raises:
+            ValueError: None of the listed categories has a question in this shard
+        """
+        totals = array("d", [0.0]) * len(self.category_names)
+        for i, category_id in enumerate(self._category_ids):
+            totals[category_id] += self._row_weight(i)
+        category_shares = [float(shares.get(name, 0.0)) for name in self.category_names]
+        weights = array("d", (
+            category_shares[category_id] * self._row_weight(i) / totals[category_id] if totals[category_id] else 0.0
+            for i, category_id in enumerate(self._category_ids)
+        ))
+        if sum(weights) <= 0:
+            raise ValueError(f"None of the categories {', '.join(shares)} has questions in corpus {self.path} "
+                             f"(corpus categories: {', '.join(self.category_names)})")
+        return CorpusView(self, *build_alias_table(weights))
+
+    def get(self, i):
+        """The i-th question of this shard (parsed on demand for JSONL / CSV)"""
+        if self.file_format == "parquet":
+            return self._questions[i]
+        start = self._offsets[i]
+        record = self._mmap[start:start + self._lengths[i]]
+        return CorpusQuestion.from_row(self._parse_record(record))
+
+    def _row_weight(self, i):
+        return self._weights[i] if self._weighted else 1.0
+
+    def _add_category(self, category):
+        category_id = self._category_lookup.get(category)
+        if category_id is None:
+            category_id = self._category_lookup[category] = len(self.category_names)
+            self.category_names.append(category)
+        self._category_ids.append(category_id)
+
+    def _index_text_file(self):
+        weights = self._weights
+        with open(self.path, "rb") as f:
+            if self.file_format == "csv":
+                self._csv_header = next(csv.reader([f.readline().decode("utf-8-sig")]), None)
+                if not self._csv_header:
+                    raise ValueError(f"CSV corpus {self.path} has no header row")
+                self._csv_header = [name.strip() for name in self._csv_header]
+            for start, record in self._iter_records(f):
+                row_number = self.total_rows
+                self.total_rows += 1
+                if row_number % self.shard_count != self.shard_index:
+                    continue
+                # Parse once to validate the row and read its weight; the row itself is not kept
+                question = CorpusQuestion.from_row(self._parse_record(record))
+                self._offsets.append(start)
+                self._lengths.append(len(record))
+                weights.append(question.weight)
+                self._add_category(question.category)
+                if question.weight != 1.0:
+                    self._weighted = True
+        self._file = open(self.path, "rb")
+        if len(self._offsets):
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _iter_records(self, f):
+        """Yield (byte offset, record bytes) for every non-blank record"""
+        start = f.tell()
+        pending = b""
+        pending_start = start
+        for line in iter(f.readline, b""):
+            if not pending:
+                pending_start = start
+            start += len(line)
+            pending += line
+            # A CSV record continues while a quoted field is open (quoted newlines)
+            if self.file_format == "csv" and pending.count(b'"') % 2:
+                continue
+            record = pending.rstrip(b"\r\n")
+            pending = b""
+            if record.strip():
+                yield pending_start, record
+        if pending.strip():
+            yield pending_start, pending.rstrip(b"\r\n")
+
+    def _parse_record(self, record):
+        text = record.decode("utf-8")
+        if self.file_format == "csv":
+            values = next(csv.reader(io.StringIO(text)))
+            return dict(zip(self._csv_header, values))
+        row = json.loads(text)
+        if isinstance(row, str):
+            return {"question": row}
+        return row
+
+    def _load_parquet(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet question corpora requires pyarrow (pip install pyarrow)") from None
+        parquet_file = pq.ParquetFile(self.path)
+        wanted = set(QUESTION_FIELDS + ("category", "weight"))
+        columns = [name for name in parquet_file.schema_arrow.names if name in wanted]
+        for batch in parquet_file.iter_batches(columns=columns):
+            rows = batch.to_pylist()
+            # Row numbers are global, so the sharding matches the JSONL / CSV readers
+            first = (self.shard_index - self.total_rows) % self.shard_count
+            self.total_rows += len(rows)
+            for row in rows[first::self.shard_count]:
+                question = CorpusQuestion.from_row(row)
+                self._questions.append(question)
+                self._weights.append(question.weight)
+                self._add_category(question.category)
+                if question.weight != 1.0:
+                    self._weighted = True
+
+
+class CorpusView:
+    """Corpus sampled with other weights (see QuestionCorpus.with_category_shares)"""
+
+    def __init__(self, corpus, prob, alias):
+        self.corpus = corpus
+        self._prob = prob
+        self._alias = alias
+
+    def __len__(self):
+        return len(self.corpus)
+
+    def sample(self, rng=random):
+        """Pick a question according to the view's weights (CorpusQuestion)"""
+        return self.corpus.get(alias_pick(self._prob, self._alias, rng))
+
+
+def detect_format(path):
+    """Corpus format from the file extension"""
+    suffix = Path(path).suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Cannot tell the format of corpus {path} from its extension; set QUESTION_CORPUS_FORMAT")
+
+
+def _first_value(row, names):
+    for name in names:
+        value = row.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _parse_weight(value):
+    if value in (None, ""):
+        return 1.0
+    return max(0.0, float(value))
@@ -0,0 +1,141 @@
+"""
+Replay Test User
+Replays a recorded traffic log (see traffic_replay.py) instead of random questions
+
+Used by `python run_tests.py replay`:
+    locust -f replay_user.py --headless --host ...
+
+Importing locustfile registers its event listeners (TTF writer, shared login
+sessions, generator health), so a replay run produces the same reports as the
+other tests. Each ReplayUser takes the next recorded session in start order,
+waits until each of its requests is due and sends them one after the other.
+The test stops as soon as every process has replayed all of its sessions;
+the run time (replay length + REPLAY_TEST_TAIL) is only an upper bound.
+"""
+import time
+
+import gevent
+from locust import constant, events, task
+from locust.runners import LocalRunner, MasterRunner, WorkerRunner
+
+from config_replay_test import REPLAY_TEST_CONFIG
+from locustfile import QUESTION_BANK, ChatbotUser
+from test_config import LOCUST_WORKER_COUNT
+from traffic_replay import LATE_THRESHOLD_S, ReplaySchedule, combine_stats, load_replay_log
+
+# Sessions of this process's shard and their timeline (created on test start)
+REPLAY_SCHEDULE = None
+
+# Latest replay counters reported by each worker (only used on the master)
+WORKER_REPLAY_STATS = {}
+
+# Environment of the running test (used to stop it once the replay has finished)
+REPLAY_ENVIRONMENT = None
+REPLAY_STOPPING = False
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Load this process's share of the recorded sessions and start the replay clock"""
+    global REPLAY_SCHEDULE, REPLAY_ENVIRONMENT, REPLAY_STOPPING
+    REPLAY_ENVIRONMENT = environment
+    REPLAY_STOPPING = False
+    if isinstance(environment.runner, MasterRunner):
+        WORKER_REPLAY_STATS.clear()
+        return
+    shard_index, shard_count = 0, 1
+    if isinstance(environment.runner, WorkerRunner):
+        shard_index, shard_count = environment.runner.worker_index, LOCUST_WORKER_COUNT
+    sessions = load_replay_log(
+        REPLAY_TEST_CONFIG["log_path"],
+        shard_index,
+        shard_count,
+        category_of=lambda question: QUESTION_BANK.category_of(question, default=None),
+    )
+    REPLAY_SCHEDULE = ReplaySchedule(sessions, REPLAY_TEST_CONFIG["speedup"])
+    REPLAY_SCHEDULE.start()
+    print(f"Replaying {len(sessions)} sessions ({sum(len(s.events) for s in sessions)} requests) "
+          f"over {REPLAY_SCHEDULE.duration_s:.0f}s at {REPLAY_SCHEDULE.speedup:g}x speed")
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    """Report how faithfully this process kept to the recorded schedule"""
+    if REPLAY_SCHEDULE is not None and not isinstance(environment.runner, MasterRunner):
+        _print_replay_stats(REPLAY_SCHEDULE.stats())
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    """On the master, report replay counters combined over all workers"""
+    if isinstance(environment.runner, MasterRunner) and WORKER_REPLAY_STATS:
+        _print_replay_stats(combine_stats(WORKER_REPLAY_STATS.values()))
+
+
+@events.report_to_master.add_listener
+def on_report_to_master(client_id, data, **kwargs):
+    if REPLAY_SCHEDULE is not None:
+        data["replay"] = REPLAY_SCHEDULE.stats()
+
+
+@events.worker_report.add_listener
+def on_worker_report(client_id, data, **kwargs):
+    global REPLAY_STOPPING
+    if "replay" not in data:
+        return
+    WORKER_REPLAY_STATS[client_id] = data["replay"]
+    runner = REPLAY_ENVIRONMENT.runner if REPLAY_ENVIRONMENT is not None else None
+    if (not REPLAY_STOPPING and isinstance(runner, MasterRunner) and len(WORKER_REPLAY_STATS) >= runner.worker_count
+            and all(stats["finished"] for stats in WORKER_REPLAY_STATS.values())):
+        REPLAY_STOPPING = True
+        print("Replay finished on all workers - stopping the test")
+        gevent.spawn(runner.quit)
+
+
+def _print_replay_stats(stats):
+    print(f"Replay: {stats['requests']} requests from {stats['sessions_started']}/{stats['sessions']} sessions, "
+          f"mean lag {stats['mean_lag_s']:.2f}s, max lag {stats['max_lag_s']:.2f}s")
+    if stats["late_sessions"]:
+        print(f"⚠️  {stats['late_sessions']} sessions started more than {LATE_THRESHOLD_S:g}s late - "
+              f"add users (REPLAY_TEST_USERS) to replay the log faithfully")
+    late_in_session = stats["late_requests"] - stats["late_sessions"]
+    if late_in_session:
+        print(f"   {late_in_session} follow-up requests were late because the previous response "
+              f"took longer than the recorded gap")
+
+
+class ReplayUser(ChatbotUser):
+    """
+    User that replays recorded sessions on their original schedule
+    
+    A user replays one session at a time; its requests are sent in recorded
+    order, each no earlier than its (sped-up) recorded time.
+    """
+    wait_time = constant(0)
+
+    @task
+    def replay_session(self):
+        global REPLAY_STOPPING
+        session = REPLAY_SCHEDULE.next_session() if REPLAY_SCHEDULE is not None else None
+        if session is None:
+            # Every recorded session has been handed out
+            gevent.sleep(1)
+            return
+        
+        try:
+            for index, (offset_s, question, category) in enumerate(session.events):
+                delay = REPLAY_SCHEDULE.due_at(offset_s) - time.time()
+                if delay > 0:
+                    gevent.sleep(delay)
+                if not self._ensure_authenticated():
+                    continue
+                lag_s = REPLAY_SCHEDULE.record_start(offset_s, session_start=index == 0)
+                self.post_chat_message(question, category, {"replay_session": session.session_id, "arrival_lag_ms": lag_s * 1000})
+        finally:
+            REPLAY_SCHEDULE.finish_session()
+        
+        if REPLAY_SCHEDULE.finished and isinstance(self.environment.runner, LocalRunner) and not REPLAY_STOPPING:
+            REPLAY_STOPPING = True
+            print("Replay finished - stopping the test")
+            # Quit from a separate greenlet: quitting stops this user's greenlet too
+            gevent.spawn(self.environment.runner.quit)
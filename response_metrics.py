@@ -0,0 +1,176 @@
+"""
+Response Metrics
+Payload size, answer length and generation throughput per question category
+
+Latency alone cannot tell "the model got slower" from "the model gives longer
+answers". For every successful chat response this records:
+- response_bytes: size of the response body as received
+- answer_chars: characters of the answer text decoded from the SSE / NDJSON
+  frames or JSON document (see conversation.parse_response). Decoding is
+  kept off most requests: only the RESPONSE_VALIDATION_SAMPLE_RATE fraction
+  sampled by the response validator is decoded (and users that need every
+  answer, see ChatbotUser.decode_answers), so answer_chars and
+  estimated_tokens come from that sample
+- estimated_tokens: answer_chars / chars_per_token (about 4 for English text),
+  the same estimate whatever the stream's frame size is
+- tokens_per_second: output rate while the answer was generated, i.e. token
+  frames over TTFT -> TTLT, from the stream timings of every response (no
+  decoding). Only streamed answers with at least MIN_RATE_FRAMES token frames
+  over at least MIN_GENERATION_MS are counted; answers that arrive in one
+  burst, and buffered responses (STREAM_RESPONSES=false, no TTFT), have no
+  generation rate.
+
+ResponseStats keeps small HDR histograms of these per category. Like
+LatencyHistograms they merge by adding counts, so workers ship what they
+counted since their last report and the master has the totals live (shown in
+the "Response Size" tab of the Locust web UI) and at the end.
+"""
+import json
+from pathlib import Path
+
+from latency_histogram import HdrHistogram
+
+# Metrics recorded per category, with the factor values are scaled by before being counted as integers
+METRICS = {
+    "response_bytes": 1,
+    "answer_chars": 1,
+    "estimated_tokens": 1,
+    "tokens_per_second": 1000,  # counted in milli-tokens/second to keep the fractions
+}
+
+SUMMARY_PERCENTILES = (50, 95)
+
+# Tokens/second is only measured over a real generation window: an answer sent in one burst (split
+# across a few reads) has a TTFT -> TTLT time of microseconds and would record absurd rates
+MIN_RATE_FRAMES = 2
+MIN_GENERATION_MS = 50
+
+
+class ResponseMetrics:
+    """Size and throughput of one response (None = could not be measured)"""
+    __slots__ = ("response_bytes", "answer_chars", "answer_words", "estimated_tokens", "tokens_per_second")
+
+    def __init__(self, response_bytes=None, answer_chars=None, answer_words=None, estimated_tokens=None,
+                 tokens_per_second=None):
+        self.response_bytes = response_bytes
+        self.answer_chars = answer_chars
+        self.answer_words = answer_words
+        self.estimated_tokens = estimated_tokens
+        self.tokens_per_second = tokens_per_second
+
+
+def measure_response(timings, chars_per_token=4.0, answer=None):
+    """
+    Size and throughput of a response
+
+    Args:
+        timings: StreamTimings of the response (see stream_metrics.py)
+        chars_per_token: Characters per token used to estimate the token count
+        answer: Decoded answer text (conversation.parse_response); None = not decoded, no answer chars / tokens
+
+    Returns:
+        ResponseMetrics
+    """
+    rate = None
+    # Buffered responses have no generation window (their total time includes the wait for the first token)
+    if (timings.stream_format != "buffered" and timings.token_count >= MIN_RATE_FRAMES
+            and timings.ttft_ms is not None and timings.ttlt_ms is not None):
+        generation_ms = timings.ttlt_ms - timings.ttft_ms
+        if generation_ms >= MIN_GENERATION_MS:
+            rate = timings.token_count / (generation_ms / 1000)
+    if answer is None:
+        return ResponseMetrics(response_bytes=timings.byte_count, tokens_per_second=rate)
+    tokens = round(len(answer) / chars_per_token) if chars_per_token > 0 else None
+    return ResponseMetrics(timings.byte_count, len(answer), len(answer.split()), tokens, rate)
+
+
+class ResponseStats:
+    """HDR histograms of the response metrics per question category"""
+
+    def __init__(self):
+        self.histograms = {}  # (category, metric) -> HdrHistogram
+
+    def get(self, category, metric):
+        key = (category, metric)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = HdrHistogram(significant_digits=2)
+        return histogram
+
+    def record(self, category, metrics):
+        for metric, scale in METRICS.items():
+            value = getattr(metrics, metric)
+            if value is not None:
+                self.get(category, metric).record(value * scale)
+
+    def merge(self, other):
+        for (category, metric), histogram in other.histograms.items():
+            self.get(category, metric).merge(histogram)
+
+    def to_dict(self):
+        return [
+            {"category": category, "metric": metric, "histogram": histogram.to_dict()}
+            for (category, metric), histogram in sorted(self.histograms.items())
+        ]
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for entry in data:
+            stats.histograms[(entry["category"], entry["metric"])] = HdrHistogram.from_dict(entry["histogram"])
+        return stats
+
+    def __bool__(self):
+        return any(histogram.total_count for histogram in self.histograms.values())
+
+    def summary(self):
+        """
+        Mean, percentiles and maximum per category
+
+        Returns:
+            list of dict: category, count, decoded (responses with answer metrics), and <metric>_mean / _p50 / _p95 / _max per metric
+        """
+        rows = []
+        for category in sorted({category for category, _ in self.histograms}):
+            row = {"category": category, "count": 0, "decoded": 0}
+            for metric, scale in METRICS.items():
+                histogram = self.histograms.get((category, metric))
+                if histogram is None or histogram.total_count == 0:
+                    for suffix in ("mean", *(f"p{p}" for p in SUMMARY_PERCENTILES), "max"):
+                        row[f"{metric}_{suffix}"] = None
+                    continue
+                if metric == "response_bytes":
+                    row["count"] = histogram.total_count
+                elif metric == "answer_chars":
+                    row["decoded"] = histogram.total_count
+                row[f"{metric}_mean"] = histogram.mean_us / scale
+                for percentile in SUMMARY_PERCENTILES:
+                    row[f"{metric}_p{percentile}"] = histogram.value_at_percentile(percentile) / scale
+                row[f"{metric}_max"] = histogram.max_us / scale
+            rows.append(row)
+        return rows
+
+
+def save_stats(path, stats):
+    """Write the summary and the histograms (mergeable with other runs) as JSON"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"summary": stats.summary(), "histograms": stats.to_dict()}, f, indent=2)
+
+
+def format_summary(rows):
+    """Text table: responses, decoded sample, mean size, answer length, estimated tokens and tokens/second per category"""
+    lines = [f"{'Category':<20} {'Count':>7} {'Decoded':>8} {'Bytes':>9} {'Chars':>8} {'Tokens':>7} "
+             f"{'Tok/s p50':>10} {'Tok/s p95':>10}"]
+    for row in rows:
+        lines.append(
+            f"{row['category'][:20]:<20} {row['count']:>7} {row['decoded']:>8} {_format(row['response_bytes_mean'], 0):>9} "
+            f"{_format(row['answer_chars_mean'], 0):>8} {_format(row['estimated_tokens_mean'], 0):>7} "
+            f"{_format(row['tokens_per_second_p50'], 1):>10} {_format(row['tokens_per_second_p95'], 1):>10}"
+        )
+    return "\n".join(lines)
+
+
+def _format(value, digits):
+    return f"{value:.{digits}f}" if value is not None else "-"
@@ -0,0 +1,119 @@
+"""
+Response Validation
+Configurable checks that a 200 response really is a chatbot answer, cheap enough for the hot path
+
+Decoding every answer as JSON only to look for a few keys costs more
+generator CPU than anything else on the send path once answers are long and
+the request rate is high. The validation level (RESPONSE_VALIDATION) trades
+that cost against how many malformed responses are caught:
+- none: the body is never looked at; a 200 / 201 is a success. Response
+  metrics then only have the byte size (see response_metrics.py)
+- status: the status code decides
+- sniff: the first `sniff_bytes` characters of the body must contain one of
+  the expected keys (e.g. '"token"' or '"response"'); a substring search, no
+  JSON decoding
+- schema: like sniff, plus a full check of a random `sample_rate` fraction of
+  responses: every JSON frame of an SSE / NDJSON stream (or the JSON document)
+  must decode, one of them must have an expected key and the answer text must
+  not be empty. Malformed responses are caught statistically at a fraction of
+  the cost of checking all of them
+
+At every level except none, the validator also draws the `sample_rate`
+sample whose answers are decoded for the response metrics (`sampled`); at
+schema that is the same sample that is fully checked. All other responses are
+never JSON-decoded.
+
+Counts of checked and invalid responses are kept per process and summed over
+workers at the end.
+"""
+import random
+
+from conversation import decode_frames, split_frames
+
+LEVELS = ("none", "status", "sniff", "schema")
+
+
+class ResponseValidator:
+    """Validates 200 responses at the configured level and counts the outcomes"""
+
+    def __init__(self, level="status", expected_keys=(), sniff_bytes=1024, sample_rate=0.05, rng=random):
+        if level not in LEVELS:
+            raise ValueError(f"Unknown RESPONSE_VALIDATION level '{level}' (use {', '.join(LEVELS)})")
+        self.level = level
+        self.expected_keys = tuple(expected_keys)
+        self.sniff_bytes = max(1, int(sniff_bytes))
+        self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        self.rng = rng
+        # Quoted keys, as they appear in a JSON document
+        self._key_markers = tuple(f'"{key}"' for key in self.expected_keys)
+        self.counts = {"responses": 0, "sniffed": 0, "fully_validated": 0, "invalid": 0}
+        self.last_error = None
+        self.sampled = False  # Whether the last validated response is in the decoded sample
+
+    def validate(self, timings):
+        """
+        Check a 200 / 201 response
+
+        Args:
+            timings: StreamTimings of the response (body and stream format)
+
+        Returns:
+            str: Why the response is invalid, or None if it passed
+        """
+        self.counts["responses"] += 1
+        self.sampled = self.level != "none" and self.rng.random() < self.sample_rate
+        if self.level in ("none", "status"):
+            return None
+        error = self._sniff(timings.body)
+        self.counts["sniffed"] += 1
+        if error is None and self.level == "schema" and self.sampled:
+            self.counts["fully_validated"] += 1
+            error = self._validate_full(timings.body, timings.stream_format)
+        if error is not None:
+            self.counts["invalid"] += 1
+            self.last_error = error
+        return error
+
+    def stats(self):
+        return dict(self.counts, last_error=self.last_error)
+
+    def _sniff(self, body):
+        head = (body or "")[:self.sniff_bytes]
+        if not head.strip():
+            return "Empty response body"
+        if self._key_markers and not any(marker in head for marker in self._key_markers):
+            return f"Unexpected response: none of {', '.join(self.expected_keys)} in the first {self.sniff_bytes} bytes"
+        return None
+
+    def _validate_full(self, body, stream_format):
+        """Decode the whole body and check its structure"""
+        frames = split_frames(body, stream_format)
+        has_key = False
+        has_text = False
+        for i, (frame, value) in enumerate(zip(frames, decode_frames(frames))):
+            if frame[:1] not in ("{", "["):
+                # Plain text frame / body: the answer itself
+                has_text = has_text or bool(frame.strip())
+                continue
+            if value is None:
+                where = f"frame {i + 1}" if len(frames) > 1 else "response"
+                return f"Invalid JSON in {where}: {frame[:80]}"
+            if isinstance(value, dict):
+                present = [key for key in self.expected_keys if key in value]
+                has_key = has_key or bool(present) or not self.expected_keys
+                has_text = has_text or any(value[key] not in (None, "", [], {}) for key in present)
+        if not has_key and not has_text:
+            return f"Response has none of the expected keys ({', '.join(self.expected_keys)})"
+        if not has_text:
+            return "Response has no answer text"
+        return None
+
+
+def combine_stats(stats_list):
+    """Sum the validation counts of several processes"""
+    totals = {"responses": 0, "sniffed": 0, "fully_validated": 0, "invalid": 0, "last_error": None}
+    for stats in stats_list:
+        for key in ("responses", "sniffed", "fully_validated", "invalid"):
+            totals[key] += stats.get(key, 0)
+        totals["last_error"] = stats.get("last_error") or totals["last_error"]
+    return totals
@@ -0,0 +1,196 @@
+"""
+Run Registry
+Run identifiers for TTF data and an index of where each run's rows are
+
+Every Locust run gets a run ID (set by run_tests.py through the RUN_ID
+environment variable, or generated when Locust is started directly). The ID and
+the breakpoint step are written into every TTF row (Run_ID / Step columns), so
+rows of different runs and steps in the shared ttf_data.csv can always be told
+apart.
+
+The run index (RUN_INDEX_PATH, JSON lines) has one record per run and step:
+test type, users, spawn rate, run time, workers, a snapshot of test_config.py
+and the byte offset in ttf_data.csv where the run's rows start. Runs never
+overlap and ttf_data.csv is only appended to, so a run's rows lie between its
+start offset and the next run's and can be read by seeking there instead of
+scanning the whole file (the Run_ID column filters out stray rows). Records are
+appended when a run starts and again when it ends; later records of the same
+run and step update earlier ones, so a crashed run still has its start offset.
+"""
+import csv
+import json
+import os
+import secrets
+from datetime import datetime
+from pathlib import Path
+
+# test_config.py settings left out of the config snapshot
+SECRET_SETTING_MARKERS = ("PASSWORD", "EMAIL", "SECRET", "TOKEN", "HEADERS")
+
+
+class RunContext:
+    """Run ID, test type and current step of this process"""
+
+    def __init__(self, run_id=None, test_type=None, step=0, step_users=None):
+        self.run_id = run_id
+        self.test_type = test_type
+        self.step = step
+        self.step_users = step_users
+
+    @classmethod
+    def from_environment(cls):
+        """Context handed down by run_tests.py (RUN_ID, TEST_TYPE, RUN_STEP); run_id is None when unset"""
+        step = os.getenv("RUN_STEP", "")
+        return cls(
+            run_id=os.getenv("RUN_ID") or None,
+            test_type=os.getenv("TEST_TYPE") or None,
+            step=int(step) if step else 0,
+        )
+
+    def to_dict(self):
+        return {"run_id": self.run_id, "test_type": self.test_type, "step": self.step, "step_users": self.step_users}
+
+    def update(self, data):
+        self.run_id = data.get("run_id", self.run_id)
+        self.test_type = data.get("test_type", self.test_type)
+        self.step = data.get("step", self.step)
+        self.step_users = data.get("step_users", self.step_users)
+
+
+_RUN_CONTEXT = RunContext.from_environment()
+
+
+def get_run_context():
+    """Return the run context of this process"""
+    return _RUN_CONTEXT
+
+
+def new_run_id(test_type="locust"):
+    """Sortable, unique run ID, e.g. 20260101-120000-load-3fa2"""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{test_type}-{secrets.token_hex(2)}"
+
+
+def config_snapshot():
+    """JSON-serializable settings of test_config.py (credentials and headers left out)"""
+    import test_config
+
+    snapshot = {}
+    for name, value in vars(test_config).items():
+        if not name.isupper() or any(marker in name for marker in SECRET_SETTING_MARKERS):
+            continue
+        if isinstance(value, (str, int, float, bool, type(None), list, tuple, dict)):
+            snapshot[name] = value
+    return snapshot
+
+
+class RunIndex:
+    """Append-only JSON lines index of runs"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def record(self, entry):
+        """Append a record (at least run_id and step); fields update earlier records of the same run and step"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        entry = dict(entry, recorded_at=datetime.now().isoformat(timespec="seconds"))
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def entries(self):
+        """One merged record per (run_id, step), in the order the runs started"""
+        merged = {}
+        if not self.path.exists():
+            return []
+        with open(self.path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A record cut short by a crash
+                    continue
+                key = (entry.get("run_id"), entry.get("step", 0))
+                merged.setdefault(key, {}).update(entry)
+        entries = list(merged.values())
+        # A run's rows end where the next run's rows start
+        for i, entry in enumerate(entries):
+            start = entry.get("start_offset", 0)
+            later = [other["start_offset"] for other in entries[i + 1:]
+                     if other.get("start_offset", -1) > start and other.get("ttf_data_path") == entry.get("ttf_data_path")]
+            entry["read_end_offset"] = min(later) if later else None
+        return entries
+
+    def find(self, run_id):
+        """
+        Records of one run (one per step; subprocess-mode breakpoint runs have several)
+
+        Args:
+            run_id: A run ID, a unique prefix of one, or "latest"
+        """
+        entries = self.entries()
+        if run_id == "latest":
+            run_id = entries[-1]["run_id"] if entries else None
+        matches = [entry for entry in entries if entry["run_id"] == run_id]
+        if not matches:
+            candidates = {entry["run_id"] for entry in entries if entry["run_id"].startswith(run_id or "\0")}
+            if len(candidates) == 1:
+                matches = [entry for entry in entries if entry["run_id"] in candidates]
+        return matches
+
+
+def file_size(path):
+    """Current size of a file (0 if it does not exist)"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def read_ttf_rows(path, entries=None):
+    """
+    Stream TTF rows as lists, only from the byte ranges of the given index records
+
+    Args:
+        path: ttf_data.csv
+        entries: RunIndex records of one run (None = the whole file)
+
+    Returns:
+        tuple: (header, iterator of rows)
+    """
+    f = open(path, "rb")
+    header = next(csv.reader([f.readline().decode("utf-8-sig")]), [])
+    if entries is None:
+        return header, _rows_in_ranges(f, [(f.tell(), None)])
+    ranges = []
+    spans = [(entry.get("start_offset", 0), entry.get("read_end_offset")) for entry in entries]
+    for start, end in sorted(spans, key=lambda span: span[0]):
+        start = max(start, f.tell())
+        # Steps of one run are contiguous: merge their ranges
+        if ranges and ranges[-1][1] is not None and ranges[-1][1] >= start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    run_ids = {entry["run_id"] for entry in entries}
+    rows = _rows_in_ranges(f, ranges)
+    if "Run_ID" in header:
+        column = header.index("Run_ID")
+        rows = (row for row in rows if len(row) > column and row[column] in run_ids)
+    return header, rows
+
+
+def _rows_in_ranges(f, ranges):
+    with f:
+        for start, end in ranges:
+            yield from csv.reader(_lines_in_range(f, start, end))
+
+
+def _lines_in_range(f, start, end):
+    f.seek(start)
+    position = start
+    while end is None or position < end:
+        line = f.readline()
+        if not line:
+            return
+        position += len(line)
+        yield line.decode("utf-8")
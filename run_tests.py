@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 """
 Performance Testing Script for Chatbot
-Supports 4 test types: load, endurance, stress, breakpoint
+Supports 6 test types: load, endurance, stress, breakpoint, replay, conversation
 
 Usage:
     python run_tests.py load                    # Run load test with defaults
     python run_tests.py endurance              # Run endurance test with defaults
     python run_tests.py stress                 # Run stress test with defaults
     python run_tests.py breakpoint             # Run breakpoint test with defaults
+    python run_tests.py replay                 # Replay REPLAY_LOG_PATH on its recorded schedule
+    python run_tests.py conversation           # Multi-turn conversations with growing context
+    python run_tests.py analyze [path]         # Summarize ttf_data.csv (or a sample store) per run
+    python run_tests.py analyze --run latest   # Only one run (read from its offset in the run index)
+    python run_tests.py baseline [--run ID]    # Save a run (default: the latest) as the baseline
+    python run_tests.py compare [--run ID]     # Compare a run with the baseline; exit code 1 on regression
     
     # Override defaults with custom parameters:
     python run_tests.py load [users] [spawn_rate] [duration]
@@ -16,12 +22,21 @@ Usage:
     
     # Example:
     python run_tests.py load 10 2 5m
+    
+    # Distribute load generation over N local worker processes (default: CPU count):
+    python run_tests.py stress --workers 4
+    
+    # Open loop: send 20 requests/second regardless of response times (users = max in flight):
+    python run_tests.py stress 100 100 5m --rate 20
 """
 import os
 import sys
+import socket
 import subprocess
 import time
 import csv
+import html
+import json
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -34,7 +49,193 @@ Path("reports").mkdir(exist_ok=True)
 CHATBOT_URL = os.getenv("CHATBOT_URL", "https://cfoti.org")
 
 
-def run_load_test(users=None, spawn_rate=None, run_time=None):
+def _default_workers():
+    """Number of local worker processes to use when --workers is not given"""
+    try:
+        from test_config import LOCUST_WORKERS
+        return LOCUST_WORKERS
+    except ImportError:
+        return os.cpu_count() or 1
+
+
+def _free_port():
+    """Pick a free local TCP port for the master to bind to"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _stop_processes(processes, timeout=15):
+    """Wait for processes to exit on their own, then terminate (and finally kill) stragglers"""
+    deadline = time.time() + timeout
+    for process in processes:
+        try:
+            process.wait(timeout=max(deadline - time.time(), 0.1))
+        except subprocess.TimeoutExpired:
+            process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def _run_locust(cmd, workers=1, capture_output=False, text=False):
+    """
+    Run a headless locust command, distributed over local worker processes if workers > 1
+    
+    A single Locust process is limited to one CPU core. With workers > 1 the
+    command is started as a master (which waits for all workers to connect and
+    writes the aggregated reports) plus `workers` local worker processes.
+    All processes are torn down when the master exits or on Ctrl-C.
+    
+    Args:
+        cmd: locust command line (must contain "-f <locustfile>")
+        workers: Number of local worker processes (1 = single process)
+        capture_output, text: Passed to subprocess for the master's output
+    
+    Returns:
+        subprocess.CompletedProcess: Result of the master (or single) process
+    """
+    # Each run writes a fresh generator health and SLO verdict
+    for verdict_path in (_generator_health_summary_path(), _slo_results_path()):
+        if verdict_path is not None and verdict_path.exists():
+            verdict_path.unlink()
+    
+    if workers is None or workers <= 1:
+        return subprocess.run(cmd, check=False, capture_output=capture_output, text=text)
+    
+    try:
+        from test_config import LOCUST_WORKER_CONNECT_TIMEOUT as connect_timeout
+    except ImportError:
+        connect_timeout = 60
+    
+    locustfile = cmd[cmd.index("-f") + 1]
+    master_port = _free_port()
+    master_cmd = cmd + [
+        "--master",
+        "--master-bind-host", "127.0.0.1",
+        "--master-bind-port", str(master_port),
+        "--expect-workers", str(workers),
+        "--expect-workers-max-wait", str(connect_timeout),
+    ]
+    worker_cmd = [
+        "locust",
+        "-f", locustfile,
+        "--worker",
+        "--master-host", "127.0.0.1",
+        "--master-port", str(master_port),
+    ]
+    output = subprocess.PIPE if capture_output else None
+    worker_output = subprocess.DEVNULL if capture_output else None
+    
+    print(f"Starting Locust master with {workers} local workers (waiting up to {connect_timeout}s for them to connect)...")
+    master = subprocess.Popen(master_cmd, stdout=output, stderr=output, text=text)
+    # Workers shard the question corpus by their index over the worker count
+    worker_env = dict(os.environ, LOCUST_WORKER_COUNT=str(workers))
+    worker_processes = [
+        subprocess.Popen(worker_cmd, stdout=worker_output, stderr=worker_output, env=worker_env)
+        for _ in range(workers)
+    ]
+    try:
+        stdout, stderr = master.communicate()
+    except KeyboardInterrupt:
+        # Ctrl-C reaches every process in the group; give the master time to write its reports
+        _stop_processes([master], timeout=30)
+        raise
+    finally:
+        _stop_processes(worker_processes)
+    return subprocess.CompletedProcess(master_cmd, master.returncode, stdout, stderr)
+
+
+def _generator_health_summary_path():
+    """Path of the generator health verdict written by locustfile.py (None if not configured)"""
+    try:
+        from test_config import GENERATOR_HEALTH_SUMMARY_PATH
+    except ImportError:
+        return None
+    return Path(GENERATOR_HEALTH_SUMMARY_PATH)
+
+
+def _read_generator_health():
+    """
+    Read the load generator health verdict of the last Locust run
+    
+    Returns:
+        dict: Verdict from generator_health.combine_summaries(), or None if monitoring was off
+    """
+    path = _generator_health_summary_path()
+    if path is None or not path.exists():
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read generator health summary: {e}")
+        return None
+
+
+def _slo_results_path():
+    """Path of the SLO verdict written by locustfile.py (None if not configured)"""
+    try:
+        from test_config import SLO_RESULTS_PATH
+    except ImportError:
+        return None
+    return Path(SLO_RESULTS_PATH)
+
+
+def _print_slo_results(run_id):
+    """
+    Print the SLO verdict of a run
+    
+    Returns:
+        bool: True if every SLO was met, False if one failed, None if no SLOs were checked
+    """
+    path = _slo_results_path()
+    if path is None:
+        return None
+    from slo import load_result
+    result = load_result(path)
+    if result is None or result.get("run_id") != run_id:
+        return None
+    if result["passed"]:
+        print(f"\n🎯 SLOs met: {', '.join(rule['rule'] for rule in result['rules'])}")
+        return True
+    print("\n❌ SLO FAILED:")
+    for rule in result["rules"]:
+        if rule["passed"]:
+            continue
+        if rule["sustained_breach"]:
+            print(f"   • {rule['rule']}: breached for {rule['longest_breach_seconds']:.0f}s "
+                  f"(worst window {rule['worst_window_value']:.1f})")
+        else:
+            print(f"   • {rule['rule']}: {rule['run_value']:.1f} over the run")
+    if result["aborted"]:
+        print(f"   Test aborted early: {result['abort_reason']}")
+    print(f"   Details: {path}")
+    return False
+
+
+def _print_generator_health(verdict):
+    """Print whether the load generator itself stayed healthy during the run"""
+    if verdict is None:
+        return
+    if not verdict["valid"]:
+        print(f"\n⚠️  RESULTS INVALID: the load generator was saturated in {verdict['saturated_percent']:.1f}% "
+              f"of samples ({', '.join(verdict['saturated_processes'])})")
+        print(f"   Max CPU {verdict['max_cpu_percent']:.0f}%, max mean event-loop lag {verdict['max_loop_lag_mean_ms']:.0f}ms "
+              f"(worst {verdict['max_loop_lag_ms']:.0f}ms).")
+        print("   Latency was partly caused by this machine - rerun with more --workers or fewer users.")
+    elif verdict["saturated_samples"]:
+        print(f"\n⚠️  Load generator was briefly saturated ({verdict['saturated_samples']} samples) - "
+              f"results are still considered valid")
+    else:
+        print(f"\n🖥️  Load generator healthy (max CPU {verdict['max_cpu_percent']:.0f}%, "
+              f"max mean event-loop lag {verdict['max_loop_lag_mean_ms']:.0f}ms, worst {verdict['max_loop_lag_ms']:.0f}ms)")
+
+
+def run_load_test(users=None, spawn_rate=None, run_time=None, workers=None):
     """Run load test - normal expected load conditions"""
     # Load defaults from config if not provided
     if users is None or spawn_rate is None or run_time is None:
@@ -55,6 +256,7 @@ def run_load_test(users=None, spawn_rate=None, run_time=None):
     print(f"Users: {users}")
     print(f"Spawn Rate: {spawn_rate} users/second")
     print(f"Duration: {run_time}")
+    print(f"Load Generators: {_describe_workers(workers)}")
     print(f"Host: {CHATBOT_URL}")
     print("-" * 60)
     print("\nThis test will:")
@@ -80,7 +282,7 @@ def run_load_test(users=None, spawn_rate=None, run_time=None):
     report_path = Path("reports/load_test_report.html")
     
     try:
-        result = subprocess.run(cmd, check=False)
+        result = _run_locust(cmd, workers)
         
         # Check if reports were generated (test completed successfully)
         if report_path.exists():
@@ -94,6 +296,8 @@ def run_load_test(users=None, spawn_rate=None, run_time=None):
             print("  • HTML Report: reports/load_test_report.html")
             print("  • CSV Stats: reports/load_test_report_stats.csv")
             print("  • TTF Data: reports/ttf_data.csv")
+            print("  • Generator Health: reports/generator_health.csv")
+            _print_generator_health(_read_generator_health())
             print("\nOpen reports/load_test_report.html in your browser to view results.")
             return True
         else:
@@ -105,7 +309,7 @@ def run_load_test(users=None, spawn_rate=None, run_time=None):
         return False
 
 
-def run_endurance_test(users=None, spawn_rate=None, run_time=None):
+def run_endurance_test(users=None, spawn_rate=None, run_time=None, workers=None):
     """Run endurance test - long duration with moderate load"""
     # Load defaults from config if not provided
     if users is None or spawn_rate is None or run_time is None:
@@ -126,6 +330,7 @@ def run_endurance_test(users=None, spawn_rate=None, run_time=None):
     print(f"Users: {users}")
     print(f"Spawn Rate: {spawn_rate} users/second")
     print(f"Duration: {run_time}")
+    print(f"Load Generators: {_describe_workers(workers)}")
     print(f"Host: {CHATBOT_URL}")
     print("-" * 60)
     print("\nThis test will:")
@@ -150,7 +355,7 @@ def run_endurance_test(users=None, spawn_rate=None, run_time=None):
     report_path = Path("reports/endurance_test_report.html")
     
     try:
-        result = subprocess.run(cmd, check=False)
+        result = _run_locust(cmd, workers)
         
         # Check if reports were generated (test completed successfully)
         if report_path.exists():
@@ -164,8 +369,12 @@ def run_endurance_test(users=None, spawn_rate=None, run_time=None):
             print("  • HTML Report: reports/endurance_test_report.html")
             print("  • CSV Stats: reports/endurance_test_report_stats.csv")
             print("  • TTF Data: reports/ttf_data.csv")
+            print("  • Generator Health: reports/generator_health.csv")
+            print("  • Degradation Analysis: reports/endurance_degradation.json")
+            _print_generator_health(_read_generator_health())
+            passed = _analyze_endurance_degradation()
             print("\nOpen reports/endurance_test_report.html in your browser to view results.")
-            return True
+            return passed is not False
         else:
             print(f"\n❌ Error: Test did not complete successfully (exit code: {result.returncode})")
             print("Reports were not generated. Check the error messages above.")
@@ -175,7 +384,52 @@ def run_endurance_test(users=None, spawn_rate=None, run_time=None):
         return False
 
 
-def run_stress_test(users=None, spawn_rate=None, run_time=None):
+def _analyze_endurance_degradation():
+    """
+    Window the TTF data of the endurance run, fit trends and print the verdict
+    
+    Returns:
+        bool: True if no degradation was found, False if it was, None if there was too little data
+    """
+    try:
+        from config_endurance_test import ENDURANCE_TEST_CONFIG
+        from test_config import TTF_DATA_PATH, RUN_INDEX_PATH
+        from degradation import DegradationAnalyzer, format_trends, save_result
+        from run_registry import RunIndex
+    except ImportError:
+        return None
+    if not Path(TTF_DATA_PATH).exists():
+        return None
+    
+    # Only this run's rows: ttf_data.csv also holds every earlier run
+    run_entries = RunIndex(RUN_INDEX_PATH).find(os.environ.get("RUN_ID"))
+    if not run_entries:
+        return None
+    analyzer = DegradationAnalyzer.from_config(ENDURANCE_TEST_CONFIG)
+    analyzer.add_ttf_csv(TTF_DATA_PATH, run_entries)
+    result = analyzer.result()
+    save_result(ENDURANCE_TEST_CONFIG["analysis_path"], result)
+    
+    print("\n" + "-" * 60)
+    print(f"DEGRADATION ANALYSIS ({ENDURANCE_TEST_CONFIG['window_seconds']:g}s windows, "
+          f"first {ENDURANCE_TEST_CONFIG['warmup_seconds']:g}s ignored)")
+    print("-" * 60)
+    if result["passed"] is None:
+        print("⚠️  Not enough data for a trend: run longer or use shorter windows (ENDURANCE_WINDOW_SECONDS)")
+        return None
+    print(format_trends(result))
+    if result["passed"]:
+        print(f"\n✅ No degradation: latency drift within {result['max_latency_drift_percent']:g}%, "
+              f"error rate drift within {result['max_error_rate_increase']:g} points")
+    else:
+        print("\n❌ DEGRADATION DETECTED:")
+        for failure in result["failures"]:
+            print(f"   • {failure}")
+    print(f"   Per-window metrics and trends: {ENDURANCE_TEST_CONFIG['analysis_path']}")
+    return result["passed"]
+
+
+def run_stress_test(users=None, spawn_rate=None, run_time=None, workers=None):
     """Run stress test - high load beyond normal capacity"""
     # Load defaults from config if not provided
     if users is None or spawn_rate is None or run_time is None:
@@ -196,6 +450,7 @@ def run_stress_test(users=None, spawn_rate=None, run_time=None):
     print(f"Users: {users}")
     print(f"Spawn Rate: {spawn_rate} users/second")
     print(f"Duration: {run_time}")
+    print(f"Load Generators: {_describe_workers(workers)}")
     print(f"Host: {CHATBOT_URL}")
     print("-" * 60)
     print("\nThis test will:")
@@ -220,7 +475,7 @@ def run_stress_test(users=None, spawn_rate=None, run_time=None):
     report_path = Path("reports/stress_test_report.html")
     
     try:
-        result = subprocess.run(cmd, check=False)
+        result = _run_locust(cmd, workers)
         
         # Check if reports were generated (test completed successfully)
         if report_path.exists():
@@ -234,6 +489,8 @@ def run_stress_test(users=None, spawn_rate=None, run_time=None):
             print("  • HTML Report: reports/stress_test_report.html")
             print("  • CSV Stats: reports/stress_test_report_stats.csv")
             print("  • TTF Data: reports/ttf_data.csv")
+            print("  • Generator Health: reports/generator_health.csv")
+            _print_generator_health(_read_generator_health())
             print("\nOpen reports/stress_test_report.html in your browser to view results.")
             return True
         else:
@@ -245,7 +502,8 @@ def run_stress_test(users=None, spawn_rate=None, run_time=None):
         return False
 
 
-def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
+def _generate_breakpoint_summary_report(steps_data, breaking_point_users, failure_rate_threshold=10,
+                                        knee_users=None, stop_reason=None):
     """Generate a consolidated HTML report for breakpoint test"""
     from datetime import datetime
     
@@ -313,6 +571,10 @@ def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
         .success {{
             background-color: #e8f5e9;
         }}
+        .invalid {{
+            background-color: #eceff1;
+            color: #607d8b;
+        }}
         .metric {{
             font-weight: bold;
             color: #1976D2;
@@ -335,6 +597,8 @@ def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
             <p><strong>Total Steps:</strong> {total_steps}</p>
             <p><strong>Users Tested:</strong> {start_users} to {max_users}</p>
             <p><strong>Breaking Point:</strong> <span style="color: #f44336; font-weight: bold;">{breaking_point}</span></p>
+            <p><strong>Saturation Knee:</strong> {knee}</p>
+            <p><strong>Early Stop:</strong> {stop_reason}</p>
         </div>
 """
     
@@ -361,6 +625,7 @@ def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
                     <th>Median Response (ms)</th>
                     <th>95th %ile (ms)</th>
                     <th>RPS</th>
+                    <th>Throughput Scaling</th>
                     <th>Status</th>
                 </tr>
             </thead>
@@ -369,7 +634,14 @@ def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
     
     for step in steps_data:
         failure_rate = (step['failures'] / step['requests'] * 100) if step['requests'] > 0 else 0
-        row_class = "failed" if failure_rate > 10 else ("warning" if failure_rate > 0 else "success")
+        row_class = "failed" if failure_rate > failure_rate_threshold else ("warning" if failure_rate > 0 or step.get('saturated') else "success")
+        scaling = f"{step['efficiency']:.2f}" if step.get('efficiency') is not None else "-"
+        if step.get('saturated'):
+            scaling += " (saturated)"
+        status = '❌ Failed' if failure_rate > failure_rate_threshold else ('⚠️ Degraded' if failure_rate > 0 else ('⚠️ Saturated' if step.get('saturated') else '✅ OK'))
+        if step.get('generator_saturated'):
+            row_class = "invalid"
+            status += " · 🖥️ Generator saturated"
         
         html_content += f"""
                 <tr class="{row_class}">
@@ -382,7 +654,8 @@ def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
                     <td>{step['median_response']:.0f}</td>
                     <td>{step['p95_response']:.0f}</td>
                     <td>{step['rps']:.2f}</td>
-                    <td>{'❌ Failed' if failure_rate > 10 else ('⚠️ Degraded' if failure_rate > 0 else '✅ OK')}</td>
+                    <td>{scaling}</td>
+                    <td>{status}</td>
                 </tr>
 """
     
@@ -391,6 +664,8 @@ def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
     start_users = steps_data[0]['users'] if steps_data else 'N/A'
     max_users = steps_data[-1]['users'] if steps_data else 'N/A'
     breaking_point = f"{breaking_point_users} users" if breaking_point_users else "Not reached"
+    knee = f"{knee_users} users (throughput stopped scaling beyond this load)" if knee_users else "Not detected"
+    stop_reason = html.escape(stop_reason) if stop_reason else "No - ramp ran to completion"
     
     html_content += """
             </tbody>
@@ -398,8 +673,10 @@ def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
         <div class="footer">
             <p><strong>Legend:</strong></p>
             <p><span class="success" style="padding: 5px 10px; border-radius: 3px;">✅ OK</span> - No failures detected</p>
-            <p><span class="warning" style="padding: 5px 10px; border-radius: 3px;">⚠️ Degraded</span> - Some failures (&lt;10%)</p>
-            <p><span class="failed" style="padding: 5px 10px; border-radius: 3px;">❌ Failed</span> - High failure rate (&gt;10%)</p>
+            <p><span class="warning" style="padding: 5px 10px; border-radius: 3px;">⚠️ Degraded</span> - Some failures (&lt;""" + f"{failure_rate_threshold:g}" + """%)</p>
+            <p><span class="failed" style="padding: 5px 10px; border-radius: 3px;">❌ Failed</span> - High failure rate (&gt;""" + f"{failure_rate_threshold:g}" + """%)</p>
+            <p><span class="warning" style="padding: 5px 10px; border-radius: 3px;">⚠️ Saturated</span> - Throughput stopped scaling with users while p95 latency rose</p>
+            <p><span class="invalid" style="padding: 5px 10px; border-radius: 3px;">🖥️ Generator saturated</span> - The load generator itself ran out of CPU or event-loop time; latency in this step is not trustworthy</p>
             <p style="margin-top: 20px;"><em>Generated on """ + test_date + """</em></p>
         </div>
     </div>
@@ -413,7 +690,9 @@ def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
         total_steps=len(steps_data),
         start_users=start_users,
         max_users=max_users,
-        breaking_point=breaking_point
+        breaking_point=breaking_point,
+        knee=knee,
+        stop_reason=stop_reason
     )
     
     # Write the HTML file
@@ -424,41 +703,231 @@ def _generate_breakpoint_summary_report(steps_data, breaking_point_users):
     return report_path
 
 
-def run_breakpoint_test():
-    """Run breakpoint test - gradually increase load until system fails"""
+def run_replay_test(users=None, spawn_rate=None, run_time=None, workers=None):
+    """Run replay test - recorded production traffic on its original schedule"""
     try:
-        from config_breakpoint_test import BREAKPOINT_TEST_CONFIG
-        start_users = BREAKPOINT_TEST_CONFIG["start_users"]
-        max_users = BREAKPOINT_TEST_CONFIG["max_users"]
-        spawn_rate = BREAKPOINT_TEST_CONFIG["spawn_rate"]
-        step_duration = BREAKPOINT_TEST_CONFIG["step_duration"]
-        user_increment = BREAKPOINT_TEST_CONFIG["user_increment"]
-    except ImportError:
-        # Fallback defaults
-        start_users = 1
-        max_users = 15
-        spawn_rate = 1
-        step_duration = "1m"
-        user_increment = 2
+        from config_replay_test import REPLAY_TEST_CONFIG
+        from traffic_replay import load_replay_log, max_concurrent_sessions
+    except ImportError as e:
+        print(f"❌ Error: Replay test is not available ({e})")
+        return False
+    
+    log_path = REPLAY_TEST_CONFIG["log_path"]
+    if not log_path or not Path(log_path).exists():
+        print("❌ Error: Set REPLAY_LOG_PATH to a recorded traffic log (CSV / JSONL with timestamp, session, question)")
+        return False
+    try:
+        sessions = load_replay_log(log_path)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: Could not read replay log: {e}")
+        return False
+    if not sessions:
+        print(f"❌ Error: Replay log {log_path} has no requests")
+        return False
+    
+    # Defaults derived from the log: enough users for the busiest moment, long enough for the last request
+    speedup = REPLAY_TEST_CONFIG["speedup"]
+    peak_sessions = max_concurrent_sessions(sessions)
+    duration_s = max(session.end for session in sessions) / speedup
+    users = users or REPLAY_TEST_CONFIG["users"] or max(1, 2 * peak_sessions)
+    spawn_rate = spawn_rate or REPLAY_TEST_CONFIG["spawn_rate"] or users
+    run_time = run_time or REPLAY_TEST_CONFIG["run_time"] or f"{int(duration_s) + REPLAY_TEST_CONFIG['tail_seconds']}s"
     
     print("=" * 60)
-    print("CHATBOT BREAKPOINT TEST")
+    print("CHATBOT REPLAY TEST")
     print("=" * 60)
-    print(f"Start Users: {start_users}")
-    print(f"Max Users: {max_users}")
+    print(f"Log: {log_path}")
+    print(f"Sessions: {len(sessions)} ({sum(len(session.events) for session in sessions)} requests, "
+          f"peak {peak_sessions} overlapping)")
+    print(f"Speed-up: {speedup:g}x (replay length {duration_s:.0f}s)")
+    print(f"Users: {users}")
     print(f"Spawn Rate: {spawn_rate} users/second")
-    print(f"Step Duration: {step_duration}")
-    print(f"User Increment: {user_increment} users per step")
+    print(f"Duration: {run_time}")
+    print(f"Load Generators: {_describe_workers(workers)}")
     print(f"Host: {CHATBOT_URL}")
     print("-" * 60)
     print("\nThis test will:")
-    print("  • Gradually increase load from {} to {} users".format(start_users, max_users))
-    print("  • Run {} at each load level".format(step_duration))
-    print("  • Identify exact breaking point")
-    print("  • Test graceful degradation under overload")
-    print("  • Generate consolidated summary report")
+    print("  • Send recorded questions at their original time offsets")
+    print("  • Keep the request order within each recorded session")
+    print("  • Report requests that could not be sent on time")
+    print("  • Track Time To First Token (TTF) for each question")
+    print("\nStarting test...\n")
+    
+    cmd = [
+        "locust",
+        "-f", "replay_user.py",
+        "--users", str(users),
+        "--spawn-rate", str(spawn_rate),
+        "--run-time", run_time,
+        "--host", CHATBOT_URL,
+        "--headless",
+        "--html", "reports/replay_test_report.html",
+        "--csv", "reports/replay_test_report"
+    ]
+    
+    report_path = Path("reports/replay_test_report.html")
+    
+    try:
+        result = _run_locust(cmd, workers)
+        
+        # Check if reports were generated (test completed successfully)
+        if report_path.exists():
+            print("\n" + "=" * 60)
+            print("REPLAY TEST COMPLETED!")
+            print("=" * 60)
+            if result.returncode != 0:
+                print("\n⚠️  Note: Some requests failed (this is normal in performance testing)")
+                print("   Check the HTML report for detailed failure information.")
+            print("\nReports generated:")
+            print("  • HTML Report: reports/replay_test_report.html")
+            print("  • CSV Stats: reports/replay_test_report_stats.csv")
+            print("  • TTF Data: reports/ttf_data.csv")
+            print("  • Generator Health: reports/generator_health.csv")
+            _print_generator_health(_read_generator_health())
+            print("\nOpen reports/replay_test_report.html in your browser to view results.")
+            return True
+        else:
+            print(f"\n❌ Error: Test did not complete successfully (exit code: {result.returncode})")
+            print("Reports were not generated. Check the error messages above.")
+            return False
+    except KeyboardInterrupt:
+        print("\n\nReplay test interrupted by user")
+        return False
+
+
+def run_conversation_test(users=None, spawn_rate=None, run_time=None, workers=None):
+    """Run conversation test - multi-turn conversations with growing context"""
+    try:
+        from config_conversation_test import CONVERSATION_TEST_CONFIG
+        from conversation import load_dialogue_trees
+    except ImportError as e:
+        print(f"❌ Error: Conversation test is not available ({e})")
+        return False
+    
+    try:
+        dialogues = load_dialogue_trees(CONVERSATION_TEST_CONFIG["scripts_path"])
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: Could not read dialogue scripts: {e}")
+        return False
+    
+    users = users or CONVERSATION_TEST_CONFIG["users"]
+    spawn_rate = spawn_rate or CONVERSATION_TEST_CONFIG["spawn_rate"]
+    run_time = run_time or CONVERSATION_TEST_CONFIG["run_time"]
+    
+    print("=" * 60)
+    print("CHATBOT CONVERSATION TEST")
+    print("=" * 60)
+    print(f"Users: {users}")
+    print(f"Spawn Rate: {spawn_rate} users/second")
+    print(f"Duration: {run_time}")
+    print(f"Dialogues: {len(dialogues)} ({CONVERSATION_TEST_CONFIG['turns']} turns per conversation)")
+    print(f"Load Generators: {_describe_workers(workers)}")
+    print(f"Host: {CHATBOT_URL}")
+    print("-" * 60)
+    print("\nThis test will:")
+    print("  • Hold multi-turn conversations, sending the conversation ID back with every follow-up")
+    print("  • Grow each conversation's context turn by turn")
+    print("  • Track Time To First Token (TTF) per turn and context length")
+    print("  • Generate performance reports")
     print("\nStarting test...\n")
     
+    cmd = [
+        "locust",
+        "-f", "conversation_user.py",
+        "--users", str(users),
+        "--spawn-rate", str(spawn_rate),
+        "--run-time", run_time,
+        "--host", CHATBOT_URL,
+        "--headless",
+        "--html", "reports/conversation_test_report.html",
+        "--csv", "reports/conversation_test_report"
+    ]
+    
+    report_path = Path("reports/conversation_test_report.html")
+    
+    try:
+        result = _run_locust(cmd, workers)
+        
+        # Check if reports were generated (test completed successfully)
+        if report_path.exists():
+            print("\n" + "=" * 60)
+            print("CONVERSATION TEST COMPLETED!")
+            print("=" * 60)
+            if result.returncode != 0:
+                print("\n⚠️  Note: Some requests failed (this is normal in performance testing)")
+                print("   Check the HTML report for detailed failure information.")
+            print("\nReports generated:")
+            print("  • HTML Report: reports/conversation_test_report.html")
+            print("  • CSV Stats: reports/conversation_test_report_stats.csv")
+            print("  • TTF Data: reports/ttf_data.csv (Turn and Context_Chars columns)")
+            print("  • Latency by Turn / Context: reports/conversation_latency.json")
+            print("  • Generator Health: reports/generator_health.csv")
+            _print_generator_health(_read_generator_health())
+            print("\nOpen reports/conversation_test_report.html in your browser to view results.")
+            return True
+        else:
+            print(f"\n❌ Error: Test did not complete successfully (exit code: {result.returncode})")
+            print("Reports were not generated. Check the error messages above.")
+            return False
+    except KeyboardInterrupt:
+        print("\n\nConversation test interrupted by user")
+        return False
+
+
+def _run_breakpoint_shape(workers=1):
+    """
+    Run all breakpoint steps inside a single Locust process using breakpoint_shape.py
+
+    Users stay alive (and logged in) across steps; only the added users ramp up.
+    
+    Returns:
+        tuple: (steps_data, breaking_point_users, knee_users, stop_reason) read back from BREAKPOINT_STEPS_PATH
+    """
+    from test_config import BREAKPOINT_STEPS_PATH
+    
+    steps_path = Path(BREAKPOINT_STEPS_PATH)
+    if steps_path.exists():
+        steps_path.unlink()
+    
+    cmd = [
+        "locust",
+        "-f", "locustfile.py,breakpoint_shape.py",
+        "--host", CHATBOT_URL,
+        "--headless",
+        "--html", "reports/breakpoint_test_report.html",
+        "--csv", "reports/breakpoint_test_report"
+    ]
+    
+    try:
+        result = _run_locust(cmd, workers)
+        if result.returncode != 0 and not steps_path.exists():
+            print(f"\n❌ Breakpoint test did not complete successfully (exit code: {result.returncode})")
+    except KeyboardInterrupt:
+        # Locust receives the Ctrl-C too and records the step that was running
+        print("\n\nBreakpoint test interrupted by user")
+    
+    if not steps_path.exists():
+        return [], None, None, None
+    try:
+        with open(steps_path, 'r') as f:
+            results = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read breakpoint step results: {e}")
+        return [], None, None, None
+    return results["steps"], results["breaking_point_users"], results.get("knee_users"), results.get("stop_reason")
+
+
+def _run_breakpoint_steps_as_subprocesses(start_users, max_users, spawn_rate, step_duration,
+                                          user_increment, failure_rate_threshold, detector=None, workers=1):
+    """
+    Run each breakpoint step as a separate Locust process (legacy mode)
+    
+    If a KneeDetector is given, each completed step is fed to it and the ramp
+    stops once it reports that the system is past its saturation knee.
+    
+    Returns:
+        tuple: (steps_data, breaking_point_users, knee_users, stop_reason)
+    """
     current_users = start_users
     step_number = 1
     steps_data = []
@@ -480,9 +949,11 @@ def run_breakpoint_test():
             "--html", f"reports/breakpoint_test_step_{step_number}_{current_users}users.html",
             "--csv", f"reports/breakpoint_test_step_{step_number}_{current_users}users"
         ]
+        # Each step is its own Locust run: same run ID, own step number in the run index
+        os.environ["RUN_STEP"] = str(step_number)
         
         try:
-            result = subprocess.run(cmd, check=False, capture_output=True, text=True)
+            result = _run_locust(cmd, workers, capture_output=True, text=True)
             
             # Check if report was generated
             step_report_path = Path(f"reports/breakpoint_test_step_{step_number}_{current_users}users.html")
@@ -516,8 +987,10 @@ def run_breakpoint_test():
                                 })
                                 
                                 failure_rate = (failures / requests * 100) if requests > 0 else 0
+                                if detector is not None:
+                                    steps_data[-1].update(detector.add_step(current_users, rps, p95_response, failure_rate))
                                 
-                                if failure_rate > 10:
+                                if failure_rate > failure_rate_threshold:
                                     print(f"\n⚠️  High failure rate ({failure_rate:.2f}%) detected at {current_users} users")
                                     print("This indicates the system is at or past its breaking point.")
                                     if breaking_point_users is None:
@@ -529,7 +1002,16 @@ def run_breakpoint_test():
                 except Exception as e:
                     print(f"Warning: Could not parse CSV metrics: {e}")
                 
+                health = _read_generator_health()
+                if steps_data and steps_data[-1]['users'] == current_users:
+                    steps_data[-1]['generator_saturated'] = health["saturated_processes"] if health else []
+                    if steps_data[-1]['generator_saturated']:
+                        print(f"\n⚠️  Load generator saturated during this step - its latency numbers are not trustworthy")
+                
                 print(f"✓ Step {step_number} completed with {current_users} users")
+                if detector is not None and detector.should_stop:
+                    print(f"\n🛑 Stopping ramp early: {detector.stop_reason}")
+                    break
             else:
                 print(f"\n❌ Step {step_number} failed at {current_users} users - no report generated")
                 if breaking_point_users is None:
@@ -557,13 +1039,79 @@ def run_breakpoint_test():
             print(f"\nWaiting 5 seconds before next step...")
             time.sleep(5)
     
+    os.environ.pop("RUN_STEP", None)
+    if detector is None:
+        return steps_data, breaking_point_users, None, None
+    return steps_data, breaking_point_users, detector.knee_users, detector.stop_reason
+
+
+def run_breakpoint_test(workers=None):
+    """Run breakpoint test - gradually increase load until system fails"""
+    try:
+        from config_breakpoint_test import BREAKPOINT_TEST_CONFIG
+        start_users = BREAKPOINT_TEST_CONFIG["start_users"]
+        max_users = BREAKPOINT_TEST_CONFIG["max_users"]
+        spawn_rate = BREAKPOINT_TEST_CONFIG["spawn_rate"]
+        step_duration = BREAKPOINT_TEST_CONFIG["step_duration"]
+        user_increment = BREAKPOINT_TEST_CONFIG["user_increment"]
+        failure_rate_threshold = BREAKPOINT_TEST_CONFIG["failure_rate_threshold"]
+        mode = BREAKPOINT_TEST_CONFIG["mode"]
+        early_stop = BREAKPOINT_TEST_CONFIG["early_stop"]
+    except ImportError:
+        # Fallback defaults
+        start_users = 1
+        max_users = 15
+        spawn_rate = 1
+        step_duration = "1m"
+        user_increment = 2
+        failure_rate_threshold = 10
+        mode = "shape"
+        early_stop = False
+    
+    print("=" * 60)
+    print("CHATBOT BREAKPOINT TEST")
+    print("=" * 60)
+    print(f"Start Users: {start_users}")
+    print(f"Max Users: {max_users}")
+    print(f"Spawn Rate: {spawn_rate} users/second")
+    print(f"Step Duration: {step_duration}")
+    print(f"User Increment: {user_increment} users per step")
+    print(f"Mode: {mode}")
+    print(f"Load Generators: {_describe_workers(workers)}")
+    print(f"Early Stop: {'on (stops past the saturation knee)' if early_stop else 'off'}")
+    print(f"Host: {CHATBOT_URL}")
+    print("-" * 60)
+    print("\nThis test will:")
+    print("  • Gradually increase load from {} to {} users".format(start_users, max_users))
+    print("  • Run {} at each load level".format(step_duration))
+    print("  • Identify exact breaking point")
+    print("  • Test graceful degradation under overload")
+    print("  • Generate consolidated summary report")
+    print("\nStarting test...\n")
+    
+    if mode == "subprocess":
+        detector = None
+        if early_stop:
+            from knee_detector import KneeDetector
+            detector = KneeDetector.from_config(BREAKPOINT_TEST_CONFIG)
+        steps_data, breaking_point_users, knee_users, stop_reason = _run_breakpoint_steps_as_subprocesses(
+            start_users, max_users, spawn_rate, step_duration, user_increment, failure_rate_threshold, detector,
+            workers
+        )
+        step_reports = "reports/breakpoint_test_step_*.html"
+    else:
+        steps_data, breaking_point_users, knee_users, stop_reason = _run_breakpoint_shape(workers)
+        step_reports = "reports/breakpoint_test_report.html"
+    
     # Generate consolidated summary report
     if steps_data:
         print("\n" + "=" * 60)
         print("Generating consolidated summary report...")
         print("=" * 60)
         
-        summary_report_path = _generate_breakpoint_summary_report(steps_data, breaking_point_users)
+        summary_report_path = _generate_breakpoint_summary_report(
+            steps_data, breaking_point_users, failure_rate_threshold, knee_users, stop_reason
+        )
         
         print("\n" + "=" * 60)
         print("BREAKPOINT TEST COMPLETED!")
@@ -574,9 +1122,17 @@ def run_breakpoint_test():
             print(f"Last successful load: {breaking_point_users - user_increment} users")
         else:
             print("\n✅ No breaking point detected within tested range")
+        if knee_users:
+            print(f"📈 Saturation knee: throughput stopped scaling after {knee_users} users")
+        if stop_reason:
+            print(f"🛑 Ramp stopped early: {stop_reason}")
+        invalid_steps = [step['users'] for step in steps_data if step.get('generator_saturated')]
+        if invalid_steps:
+            print(f"🖥️  Load generator saturated at {', '.join(map(str, invalid_steps))} users - "
+                  f"treat those steps (and any knee/breakpoint among them) with caution")
         print("\nReports generated:")
         print(f"  • 📊 Consolidated Summary: {summary_report_path}")
-        print(f"  • 📁 Individual Step Reports: reports/breakpoint_test_step_*.html")
+        print(f"  • 📁 Locust Reports: {step_reports}")
         print("\nOpen the consolidated summary report to see the breaking point analysis.")
     else:
         print("\n" + "=" * 60)
@@ -587,6 +1143,279 @@ def run_breakpoint_test():
     return True
 
 
+def run_analysis(path=None, run_id=None):
+    """
+    Stream ttf_data.csv (or a sample store directory) into per-run summaries
+    
+    Args:
+        path: TTF CSV file or sample store directory (default: TTF_DATA_PATH)
+        run_id: Only analyze this run (a run ID, a unique prefix of one, or "latest")
+    
+    Returns:
+        bool: True if there was data to analyze
+    """
+    from test_config import (
+        TTF_DATA_PATH,
+        ANALYSIS_JSON_PATH,
+        ANALYSIS_HTML_PATH,
+        ANALYSIS_BUCKET_SECONDS,
+        ANALYSIS_MAX_BUCKETS,
+        ANALYSIS_RUN_GAP_SECONDS,
+        RUN_INDEX_PATH,
+    )
+    from run_registry import RunIndex
+    from ttf_analysis import TtfAnalyzer, format_latency, format_runs, save_result, write_html
+    
+    path = Path(path or TTF_DATA_PATH)
+    if not path.exists():
+        print(f"❌ {path} not found - run a test first")
+        return False
+    run_index = RunIndex(RUN_INDEX_PATH)
+    run_entries = None
+    if run_id is not None:
+        run_entries = run_index.find(run_id)
+        if not run_entries:
+            print(f"❌ Run '{run_id}' not found in {RUN_INDEX_PATH}")
+            return False
+    
+    print("=" * 60)
+    print("ANALYZING TTF DATA")
+    print("=" * 60)
+    print(f"Source: {path}" + (f" (run {run_entries[0]['run_id']})" if run_entries else ""))
+    print()
+    
+    analyzer = TtfAnalyzer(
+        bucket_seconds=ANALYSIS_BUCKET_SECONDS,
+        run_gap_seconds=ANALYSIS_RUN_GAP_SECONDS,
+        max_buckets=ANALYSIS_MAX_BUCKETS,
+        run_index_entries=run_index.entries(),
+    )
+    started = time.time()
+    if path.is_dir():
+        analyzer.add_sample_store(path, run_entries[0]["run_id"] if run_entries else None)
+    else:
+        analyzer.add_ttf_csv(path, run_entries)
+    result = analyzer.result()
+    if not result["runs"]:
+        print(f"❌ No TTF rows in {path}")
+        return False
+    
+    print(f"Read {result['rows']} rows in {time.time() - started:.1f}s", end="")
+    print(f" ({result['skipped_rows']} unreadable rows skipped)" if result["skipped_rows"] else "")
+    print("\nRuns:")
+    print(format_runs(result))
+    latest = result["runs"][-1]
+    print(f"\nLatency of run {latest['run']} (ms, successful requests):")
+    print(format_latency(latest))
+    
+    save_result(ANALYSIS_JSON_PATH, result)
+    write_html(ANALYSIS_HTML_PATH, result)
+    print(f"\n📊 Reports generated:")
+    print(f"   - JSON Summary: {ANALYSIS_JSON_PATH}")
+    print(f"   - HTML Report: {ANALYSIS_HTML_PATH}")
+    return True
+
+
+def _load_run_summary(run_id):
+    """
+    Summarize one run of TTF_DATA_PATH, read through the run index
+    
+    Returns:
+        ttf_analysis.RunSummary, or None (after printing why) if the run cannot be used
+    """
+    from test_config import TTF_DATA_PATH, RUN_INDEX_PATH
+    from run_registry import RunIndex
+    from ttf_analysis import TtfAnalyzer
+    
+    run_index = RunIndex(RUN_INDEX_PATH)
+    run_entries = run_index.find(run_id)
+    if not run_entries or not Path(TTF_DATA_PATH).exists():
+        print(f"❌ Run '{run_id}' not found in {RUN_INDEX_PATH}")
+        return None
+    # Short buckets, so even a few minutes of traffic give a throughput series for the t-test
+    analyzer = TtfAnalyzer(bucket_seconds=10, run_index_entries=run_index.entries())
+    analyzer.add_ttf_csv(TTF_DATA_PATH, run_entries)
+    if not analyzer.runs:
+        print(f"❌ Run {run_entries[0]['run_id']} has no TTF data")
+        return None
+    if len(analyzer.runs) > 1:
+        print(f"❌ Run {run_entries[0]['run_id']} has {len(analyzer.runs)} breakpoint steps - "
+              f"baselines need a single load level (use a load, stress, endurance, replay or conversation run)")
+        return None
+    return analyzer.runs[0]
+
+
+def run_save_baseline(run_id="latest", name=None):
+    """Save a run's latency histograms, error counts and throughput as a named baseline"""
+    from test_config import BASELINE_DIR, BASELINE_NAME
+    from baseline import save_baseline, snapshot_run
+    
+    run = _load_run_summary(run_id)
+    if run is None:
+        return False
+    snapshot = snapshot_run(run, name or BASELINE_NAME)
+    path = save_baseline(BASELINE_DIR, snapshot)
+    total = snapshot["categories"]["All"]
+    print(f"✅ Saved run {snapshot['run_id']} ({snapshot['test_type']}, {snapshot['users']} users, "
+          f"{total['requests']} requests) as baseline '{snapshot['name']}': {path}")
+    return True
+
+
+def run_compare(run_id="latest", name=None):
+    """
+    Compare a run with a saved baseline and print the checks
+    
+    Returns:
+        bool: True if nothing regressed, False on a regression, None if there is no baseline or run
+    """
+    from test_config import (
+        BASELINE_DIR,
+        BASELINE_NAME,
+        BASELINE_MAX_LATENCY_INCREASE_PERCENT,
+        BASELINE_MAX_THROUGHPUT_DECREASE_PERCENT,
+        BASELINE_MAX_ERROR_RATE_INCREASE,
+        BASELINE_SIGNIFICANCE_LEVEL,
+        BASELINE_MIN_SAMPLES,
+        BASELINE_COMPARISON_PATH,
+    )
+    from baseline import compare, format_comparison, load_baseline, snapshot_run
+    
+    name = name or BASELINE_NAME
+    baseline = load_baseline(BASELINE_DIR, name)
+    if baseline is None:
+        print(f"⚠️  No baseline '{name}' in {BASELINE_DIR} - save one with: python run_tests.py baseline --run <RUN_ID>")
+        return None
+    run = _load_run_summary(run_id)
+    if run is None:
+        return None
+    
+    result = compare(
+        baseline,
+        snapshot_run(run),
+        max_latency_increase_percent=BASELINE_MAX_LATENCY_INCREASE_PERCENT,
+        max_throughput_decrease_percent=BASELINE_MAX_THROUGHPUT_DECREASE_PERCENT,
+        max_error_rate_increase=BASELINE_MAX_ERROR_RATE_INCREASE,
+        significance_level=BASELINE_SIGNIFICANCE_LEVEL,
+        min_samples=BASELINE_MIN_SAMPLES,
+    )
+    path = Path(BASELINE_COMPARISON_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    
+    print("\n" + "=" * 60)
+    print(f"BASELINE COMPARISON: run {result['current']['run_id']} vs '{name}' ({result['baseline']['run_id']})")
+    print("=" * 60)
+    print(format_comparison(result))
+    for note in result["notes"]:
+        print(f"⚠️  {note}")
+    if result["passed"]:
+        print(f"\n✅ No significant regression (latency +{BASELINE_MAX_LATENCY_INCREASE_PERCENT:g}%, "
+              f"throughput -{BASELINE_MAX_THROUGHPUT_DECREASE_PERCENT:g}%, "
+              f"errors +{BASELINE_MAX_ERROR_RATE_INCREASE:g} points, p < {BASELINE_SIGNIFICANCE_LEVEL:g})")
+    else:
+        print("\n❌ PERFORMANCE REGRESSION:")
+        for regression in result["regressions"]:
+            print(f"   • {regression}")
+    print(f"   Comparison saved to {BASELINE_COMPARISON_PATH}")
+    return result["passed"]
+
+
+def _pop_option(args, option, description):
+    """Remove "option value" from args and return the value (None if the option is absent)"""
+    if option not in args:
+        return None
+    index = args.index(option)
+    if index + 1 >= len(args):
+        print(f"Error: {option} requires {description}")
+        print_usage()
+        sys.exit(1)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
+def _start_mock_server():
+    """
+    Start mock_server.py on a free local port and point the tests at it
+    
+    Returns:
+        subprocess.Popen: The mock server process (stop it with _stop_processes)
+    """
+    global CHATBOT_URL
+    port = _free_port()
+    process = subprocess.Popen([sys.executable, "mock_server.py", "--host", "127.0.0.1", "--port", str(port)])
+    
+    # Wait until the server accepts connections
+    deadline = time.time() + 15
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if process.poll() is not None or time.time() > deadline:
+                _stop_processes([process], timeout=1)
+                print("❌ Error: Mock chatbot server did not start")
+                sys.exit(1)
+            time.sleep(0.2)
+    
+    # Locust processes read these from the environment via test_config.py
+    CHATBOT_URL = f"http://127.0.0.1:{port}"
+    os.environ["CHATBOT_URL"] = CHATBOT_URL
+    # The mock accepts any non-empty credentials
+    if not os.environ.get("LOGIN_EMAIL") or not os.environ.get("LOGIN_PASSWORD"):
+        os.environ["LOGIN_EMAIL"] = "mock@example.com"
+        os.environ["LOGIN_PASSWORD"] = "mock"
+    print(f"🧪 Testing against local mock chatbot at {CHATBOT_URL}\n")
+    return process
+
+
+def _discover_login_endpoint():
+    """
+    Pre-flight: find the working login endpoint once, before Locust starts
+    
+    The result is cached in LOGIN_ENDPOINT_CACHE_PATH, so no virtual user has to
+    probe the fallback endpoints and the probing never reaches the Locust stats.
+    """
+    try:
+        from test_config import (
+            API_ENDPOINT_LOGIN,
+            LOGIN_ENDPOINT_FALLBACKS,
+            LOGIN_ENDPOINT_DISCOVERY,
+            LOGIN_ENDPOINT_CACHE_PATH,
+        )
+        from login_discovery import discover_login_endpoint, save_cached_endpoint
+    except ImportError:
+        return
+    # Read from the environment: --mock may have set them after test_config was imported
+    email = os.getenv("LOGIN_EMAIL", "")
+    password = os.getenv("LOGIN_PASSWORD", "")
+    if not LOGIN_ENDPOINT_DISCOVERY or not email or not password:
+        return
+    
+    endpoints = list(dict.fromkeys([API_ENDPOINT_LOGIN] + LOGIN_ENDPOINT_FALLBACKS))
+    headers = {"Accept": "application/json, text/plain, */*", "Origin": CHATBOT_URL, "Referer": f"{CHATBOT_URL}/"}
+    discovered, tried = discover_login_endpoint(CHATBOT_URL, endpoints, email, password, headers)
+    save_cached_endpoint(LOGIN_ENDPOINT_CACHE_PATH, CHATBOT_URL, API_ENDPOINT_LOGIN, discovered)
+    if discovered is None:
+        print("⚠️  Pre-flight login failed - users will retry discovery during the test")
+        for endpoint, login_format, status in tried:
+            print(f"   {endpoint} ({login_format}): {status}")
+        print()
+    elif discovered["endpoint"] != API_ENDPOINT_LOGIN or discovered["format"] != "json":
+        print(f"🔑 Login endpoint: {discovered['endpoint']} ({discovered['format']}) - "
+              f"set API_ENDPOINT_LOGIN={discovered['endpoint']} in .env to skip discovery\n")
+    else:
+        print(f"🔑 Login endpoint: {discovered['endpoint']} ({discovered['format']})\n")
+
+
+def _describe_workers(workers):
+    """Human readable description of the load generator processes"""
+    if workers is None or workers <= 1:
+        return "1 process"
+    return f"1 master + {workers} local workers"
+
+
 def print_usage():
     """Print usage information"""
     print("=" * 60)
@@ -597,14 +1426,30 @@ def print_usage():
     print("  2. endurance  - Long duration, moderate load (memory leaks)")
     print("  3. stress     - High load beyond normal capacity")
     print("  4. breakpoint - Gradually increase load until failure")
+    print("  5. replay     - Recorded production traffic on its original schedule")
+    print("  6. conversation - Multi-turn conversations with growing context (latency per turn)")
+    print("\nAnalysis:")
+    print("  analyze [path] - Summarize ttf_data.csv or a sample store per run (streamed, any file size)")
+    print("  baseline       - Save a run as the baseline (latency histograms, errors, throughput)")
+    print("  compare        - Compare a run with the baseline; exit code 1 on a significant regression")
     print("\nUsage:")
-    print("  python run_tests.py [test_type] [users] [spawn_rate] [duration]")
+    print("  python run_tests.py [test_type] [users] [spawn_rate] [duration] [--workers N] [--rate R] [--mock]")
+    print("  python run_tests.py analyze [path] [--run RUN_ID|latest]")
+    print("  python run_tests.py baseline|compare [--run RUN_ID|latest] [--name BASELINE]")
     print("\nExamples:")
     print("  python run_tests.py load                    # Use defaults")
     print("  python run_tests.py load 10 2 5m           # Custom parameters")
     print("  python run_tests.py endurance              # Use defaults")
     print("  python run_tests.py stress                 # Use defaults")
     print("  python run_tests.py breakpoint             # Use defaults")
+    print("  python run_tests.py replay                 # Replays REPLAY_LOG_PATH")
+    print("  python run_tests.py conversation           # Use defaults")
+    print("  python run_tests.py stress --workers 4     # 1 master + 4 local worker processes")
+    print("  python run_tests.py breakpoint --mock      # Offline run against mock_server.py")
+    print("\nLoad generation:")
+    print("  --workers N  Local Locust worker processes (default: CPU count, 1 = single process)")
+    print("  --rate R     Open loop: start R requests/second whatever the response times (users = max in flight)")
+    print("  --mock       Start the local mock chatbot (mock_server.py) and test against it")
     print("\nConfiguration:")
     print("  Edit test_config.py or set environment variables to customize")
     print("  All test configurations are in config_*_test.py files")
@@ -613,42 +1458,121 @@ def print_usage():
 
 def main():
     """Main function"""
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    
+    # Parse --workers N (may appear anywhere)
+    workers = _default_workers()
+    if "--workers" in args:
+        index = args.index("--workers")
+        try:
+            workers = int(args[index + 1])
+        except (ValueError, IndexError):
+            print("Error: --workers requires a number")
+            print_usage()
+            sys.exit(1)
+        del args[index:index + 2]
+    
+    # Parse --rate R (open-loop target requests/second, read by locustfile.py via ARRIVAL_RATE)
+    if "--rate" in args:
+        index = args.index("--rate")
+        try:
+            rate = float(args[index + 1])
+        except (ValueError, IndexError):
+            print("Error: --rate requires a number (requests/second)")
+            print_usage()
+            sys.exit(1)
+        del args[index:index + 2]
+        os.environ["ARRIVAL_RATE"] = str(rate)
+    
+    # Parse --mock (test against the local mock chatbot instead of CHATBOT_URL)
+    use_mock = "--mock" in args
+    if use_mock:
+        args.remove("--mock")
+    
+    if len(args) < 1:
         print_usage()
         sys.exit(1)
     
-    test_type = sys.argv[1].lower()
+    test_type = args[0].lower()
+    
+    if test_type in ("analyze", "baseline", "compare"):
+        run_id = _pop_option(args, "--run", "a run ID (or 'latest')")
+        name = _pop_option(args, "--name", "a baseline name")
+        if test_type == "analyze":
+            passed = run_analysis(args[1] if len(args) > 1 else None, run_id)
+        elif test_type == "baseline":
+            passed = run_save_baseline(run_id or "latest", name)
+        else:
+            passed = run_compare(run_id or "latest", name)
+        if not passed:
+            sys.exit(1)
+        return
     
     # Parse optional parameters
     users = None
     spawn_rate = None
     run_time = None
     
-    if len(sys.argv) > 2:
+    if len(args) > 1:
         try:
-            users = int(sys.argv[2])
-            spawn_rate = float(sys.argv[3]) if len(sys.argv) > 3 else None
-            run_time = sys.argv[4] if len(sys.argv) > 4 else None
+            users = int(args[1])
+            spawn_rate = float(args[2]) if len(args) > 2 else None
+            run_time = args[3] if len(args) > 3 else None
         except (ValueError, IndexError):
             print("Error: Invalid parameters")
             print_usage()
             sys.exit(1)
     
-    # Run appropriate test
+    if test_type not in ("load", "endurance", "stress", "breakpoint", "replay", "conversation"):
+        print(f"Error: Unknown test type '{test_type}'")
+        print_usage()
+        sys.exit(1)
+    
+    mock_server = _start_mock_server() if use_mock else None
+    try:
+        _discover_login_endpoint()
+        _run_test(test_type, users, spawn_rate, run_time, workers)
+    finally:
+        if mock_server is not None:
+            mock_server.terminate()
+            _stop_processes([mock_server], timeout=5)
+
+
+def _run_test(test_type, users, spawn_rate, run_time, workers):
+    """Run the selected test type"""
+    from run_registry import new_run_id
+    
+    # Tags every TTF row of this test and its record in the run index (see run_registry.py)
+    os.environ["RUN_ID"] = new_run_id(test_type)
+    os.environ["TEST_TYPE"] = test_type
+    print(f"🏷️  Run ID: {os.environ['RUN_ID']}\n")
+    degraded = False
     if test_type == "load":
-        run_load_test(users, spawn_rate, run_time)
+        run_load_test(users, spawn_rate, run_time, workers)
     elif test_type == "endurance":
-        run_endurance_test(users, spawn_rate, run_time)
+        # False = degradation detected (or the test did not complete)
+        degraded = run_endurance_test(users, spawn_rate, run_time, workers) is False
     elif test_type == "stress":
-        run_stress_test(users, spawn_rate, run_time)
+        run_stress_test(users, spawn_rate, run_time, workers)
     elif test_type == "breakpoint":
         if users is not None or spawn_rate is not None or run_time is not None:
             print("Warning: Breakpoint test uses its own configuration.")
             print("Parameters are ignored. Edit config_breakpoint_test.py to customize.")
-        run_breakpoint_test()
-    else:
-        print(f"Error: Unknown test type '{test_type}'")
-        print_usage()
+        run_breakpoint_test(workers)
+    elif test_type == "replay":
+        run_replay_test(users, spawn_rate, run_time, workers)
+    elif test_type == "conversation":
+        run_conversation_test(users, spawn_rate, run_time, workers)
+    
+    if test_type == "breakpoint":
+        # Breakpoint tests go past the limits on purpose; they are not gated
+        return
+    slo_failed = _print_slo_results(os.environ["RUN_ID"]) is False
+    from test_config import BASELINE_AUTO_COMPARE
+    # Deployment gate: endurance degradation, a missed SLO or a significant regression against the
+    # baseline fails the command
+    regressed = BASELINE_AUTO_COMPARE and run_compare(os.environ["RUN_ID"]) is False
+    if degraded or slo_failed or regressed:
         sys.exit(1)
 
 
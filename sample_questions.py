@@ -5,6 +5,7 @@ Easy-to-edit file containing all test questions organized by category
 To add or modify questions, simply edit the lists below.
 The weights at the bottom control how frequently each category appears.
 """
+from question_bank import QuestionBank
 
 # ============================================================================
 # Simple Questions
@@ -115,13 +116,39 @@ COMPLEX_WEIGHT = 5     # Complex questions
 # You typically don't need to modify this - it's calculated automatically
 # ============================================================================
 def get_sample_messages():
-    """Get combined sample messages with weights applied"""
+    """
+    Get combined sample messages with weights applied
+    
+    Repeats every question `weight` times; the load test samples from
+    get_question_bank() instead, which does not.
+    """
     return (
         SIMPLE_MESSAGES * SIMPLE_WEIGHT +
         COMMON_QUESTIONS * COMMON_WEIGHT +
         COMPLEX_QUESTIONS * COMPLEX_WEIGHT
     )
 
+# ============================================================================
+# Question Bank
+# ============================================================================
+# Each question is stored once with its category weight, so sampling and
+# category lookup are constant-time and memory does not grow with the weights
+# ============================================================================
+_QUESTION_BANK = None
+
+
+def get_question_bank():
+    """Get the question bank built from the lists and weights above"""
+    global _QUESTION_BANK
+    if _QUESTION_BANK is None:
+        bank = QuestionBank()
+        bank.add_many(SIMPLE_MESSAGES, "Simple", SIMPLE_WEIGHT)
+        bank.add_many(COMMON_QUESTIONS, "Common", COMMON_WEIGHT)
+        bank.add_many(COMPLEX_QUESTIONS, "Complex", COMPLEX_WEIGHT)
+        _QUESTION_BANK = bank
+    return _QUESTION_BANK
+
+
 # ============================================================================
 # Question Category Helper
 # ============================================================================
@@ -135,12 +162,96 @@ def get_question_category(message):
     Returns:
         str: Category name ("Simple", "Common", "Complex", or "Unknown")
     """
-    if message in SIMPLE_MESSAGES:
-        return "Simple"
-    elif message in COMMON_QUESTIONS:
-        return "Common"
-    elif message in COMPLEX_QUESTIONS:
-        return "Complex"
-    else:
-        return "Unknown"
+    return get_question_bank().category_of(message)
+
+
 
+# ============================================================================
+# Multi-Turn Dialogues
+# Scripted conversations for the conversation test (conversation_user.py)
+# ============================================================================
+# Each dialogue starts with "question"; every turn continues with a random
+# entry of "follow_ups" until a question without follow-ups is reached. After
+# that, FOLLOW_UP_MESSAGES keep the conversation going until it has
+# CONVERSATION_TURNS turns. "category" is optional: opening questions default
+# to their question bank category, follow-ups to "Follow-up".
+# ============================================================================
+DIALOGUE_TREES = [
+    {
+        "question": "How do I apply for a Preferential Certificate of Origin?",
+        "follow_ups": [
+            {
+                "question": "What documents do I need to attach to that application?",
+                "follow_ups": [
+                    {"question": "Can I submit scanned copies instead of the originals?"},
+                    {"question": "How long do I have to keep those documents after export?"},
+                ],
+            },
+            {
+                "question": "How long does the approval usually take?",
+                "follow_ups": [
+                    {"question": "Is there a way to expedite it for an urgent shipment?"},
+                    {"question": "What happens if the shipment leaves before the certificate is issued?"},
+                ],
+            },
+        ],
+    },
+    {
+        "question": "Check product eligibility for Free Trade Agreements (FTA) and Preferential Tariffs",
+        "follow_ups": [
+            {
+                "question": "My product is a stainless steel kitchen sink made with imported steel sheets. Does it qualify?",
+                "follow_ups": [
+                    {"question": "Which FTA would give me the lowest tariff into Vietnam for it?"},
+                    {"question": "How do I calculate the regional value content for it?"},
+                ],
+            },
+            {
+                "question": "Which rules of origin apply to it under RCEP?",
+                "follow_ups": [
+                    {"question": "How is that different under the ASEAN Trade in Goods Agreement?"},
+                ],
+            },
+        ],
+    },
+    {
+        "question": "What is the difference between PCO and OCO?",
+        "follow_ups": [
+            {
+                "question": "Which one do I need for a shipment to the EU?",
+                "follow_ups": [
+                    {"question": "And for a shipment to China?"},
+                    {"question": "Can one shipment need both?"},
+                ],
+            },
+            {"question": "Which one is faster to get?"},
+        ],
+    },
+    {
+        "question": "I'm exporting electronics to multiple ASEAN countries. Can you explain the complete process for obtaining Preferential Certificates of Origin for each country, including the specific requirements, documentation needed, and how to verify product eligibility under different FTAs?",
+        "follow_ups": [
+            {
+                "question": "Let's start with Indonesia. What is different there compared to the others you mentioned?",
+                "follow_ups": [
+                    {"question": "And what changes if the circuit boards come from Taiwan?"},
+                ],
+            },
+            {
+                "question": "Can you summarise the documents as a checklist?",
+                "follow_ups": [
+                    {"question": "Which of those items are most often missing in rejected applications?"},
+                ],
+            },
+        ],
+    },
+]
+
+# Generic follow-ups used once a dialogue runs out of scripted turns
+FOLLOW_UP_MESSAGES = [
+    "Can you explain that in more detail?",
+    "Can you give me an example?",
+    "What would change if the goods were shipped through Malaysia first?",
+    "Can you summarise everything we discussed so far?",
+    "Are there any exceptions to what you just said?",
+    "What is the most common mistake people make here?",
+]
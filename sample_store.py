@@ -0,0 +1,429 @@
+"""
+Compact Binary Sample Store
+Optional columnar storage for per-request latency samples, written alongside ttf_data.csv
+
+Layout of a sample store directory:
+- samples.bin: a sequence of row groups. Each row group is a small header
+  (magic + row count) followed by one contiguous little-endian array per column.
+- dictionaries.ndjson: append-only log of the ID -> text entries of the
+  categories, questions, statuses and run IDs dictionaries, one JSON object per
+  line. Each flush appends only the entries added since the previous one, and
+  readers replay the log to rebuild the lookup tables.
+
+Runs append to the same store; their samples are told apart by the run_id and
+step columns (see run_registry.py), not by gaps between timestamps.
+
+Categories, questions, statuses and run IDs are dictionary-encoded integer IDs,
+timestamps are int64 epoch nanoseconds and latencies are float32 (NaN = not measured).
+Only the standard library is needed to write and read the store; if NumPy is
+installed, load_samples() decodes the columns straight into NumPy arrays.
+"""
+import heapq
+import json
+import math
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+
+SAMPLES_FILE = "samples.bin"
+DICTIONARIES_FILE = "dictionaries.ndjson"
+
+ROW_GROUP_MAGIC = b"TTFG"
+ROW_GROUP_HEADER = struct.Struct("<4sI")
+
+# Column name -> array typecode, in on-disk order
+COLUMNS = (
+    ("timestamp_ns", "q"),
+    ("category_id", "H"),
+    ("question_id", "I"),
+    ("status_id", "H"),
+    ("ttft_ms", "f"),
+    ("total_ms", "f"),
+    ("ttfb_ms", "f"),
+    ("ttlt_ms", "f"),
+    ("mean_inter_token_ms", "f"),
+    ("max_inter_token_ms", "f"),
+    ("token_count", "i"),
+    ("response_bytes", "i"),
+    ("answer_chars", "i"),
+    ("estimated_tokens", "i"),
+    ("tokens_per_second", "f"),
+    ("run_id", "i"),  # -1 = unknown run
+    ("step", "H"),
+)
+
+# Dictionary-encoded column -> dictionary
+DICTIONARY_COLUMNS = (("category_id", "categories"), ("question_id", "questions"), ("status_id", "statuses"),
+                      ("run_id", "runs"))
+
+# Float columns use NaN and integer columns -1 for "not measured"
+FLOAT_COLUMNS = ("ttft_ms", "total_ms", "ttfb_ms", "ttlt_ms", "mean_inter_token_ms", "max_inter_token_ms", "tokens_per_second")
+COUNT_COLUMNS = ("token_count", "response_bytes", "answer_chars", "estimated_tokens")
+
+# NumPy dtypes matching the typecodes above (little-endian)
+NUMPY_DTYPES = {"q": "<i8", "H": "<u2", "I": "<u4", "f": "<f4", "i": "<i4"}
+
+_NEEDS_BYTESWAP = sys.byteorder != "little"
+
+
+class SampleStore:
+    """Appends dictionary-encoded samples to a store directory in row-group chunks"""
+
+    def __init__(self, directory, row_group_size=10000):
+        self.directory = Path(directory)
+        self.row_group_size = max(1, int(row_group_size))
+
+        self.rows_written = 0
+        self.row_groups_written = 0
+
+        self._dictionaries = {"categories": [], "questions": [], "statuses": [], "runs": []}
+        self._ids = {name: {} for name in self._dictionaries}
+        # Dictionary entries not yet written to the log
+        self._new_entries = []
+        self._columns = self._new_columns()
+        self._file = None
+        self._dictionary_file = None
+
+    def open(self):
+        """Open samples.bin for appending, continuing the IDs of any existing dictionaries"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        dictionaries_path = self.directory / DICTIONARIES_FILE
+        if dictionaries_path.exists():
+            stored, size = _read_dictionaries(dictionaries_path)
+            # Cut off a line left half-written by an interrupted run so new entries start on a new line
+            if size != dictionaries_path.stat().st_size:
+                with open(dictionaries_path, "rb+") as f:
+                    f.truncate(size)
+            for name in self._dictionaries:
+                self._dictionaries[name] = stored[name]
+                self._ids[name] = {value: i for i, value in enumerate(self._dictionaries[name])}
+        self._dictionary_file = open(dictionaries_path, "a", encoding="utf-8")
+        samples_path = self.directory / SAMPLES_FILE
+        if samples_path.exists():
+            _truncate_incomplete_row_group(samples_path)
+        self._file = open(samples_path, "ab")
+
+    def append(self, category, question, status, ttft_ms, total_ms, ttfb_ms=None,
+               ttlt_ms=None, mean_inter_token_ms=None, max_inter_token_ms=None,
+               token_count=None, timestamp_ns=None, response_bytes=None, answer_chars=None,
+               estimated_tokens=None, tokens_per_second=None, run_id=None, step=0):
+        """Add one sample; writes a row group once row_group_size samples are buffered"""
+        columns = self._columns
+        columns["timestamp_ns"].append(timestamp_ns if timestamp_ns is not None else time.time_ns())
+        columns["category_id"].append(self._encode("categories", category))
+        columns["question_id"].append(self._encode("questions", question))
+        columns["status_id"].append(self._encode("statuses", status))
+        columns["ttft_ms"].append(_float_or_nan(ttft_ms))
+        columns["total_ms"].append(_float_or_nan(total_ms))
+        columns["ttfb_ms"].append(_float_or_nan(ttfb_ms))
+        columns["ttlt_ms"].append(_float_or_nan(ttlt_ms))
+        columns["mean_inter_token_ms"].append(_float_or_nan(mean_inter_token_ms))
+        columns["max_inter_token_ms"].append(_float_or_nan(max_inter_token_ms))
+        columns["token_count"].append(token_count if token_count is not None else -1)
+        columns["response_bytes"].append(response_bytes if response_bytes is not None else -1)
+        columns["answer_chars"].append(answer_chars if answer_chars is not None else -1)
+        columns["estimated_tokens"].append(estimated_tokens if estimated_tokens is not None else -1)
+        columns["tokens_per_second"].append(_float_or_nan(tokens_per_second))
+        columns["run_id"].append(self._encode("runs", run_id) if run_id else -1)
+        columns["step"].append(step or 0)
+
+        if len(columns["timestamp_ns"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered samples as one row group and save any new dictionary entries"""
+        if self._file is None:
+            return
+        # Dictionaries first, so every ID in samples.bin can always be decoded
+        if self._new_entries:
+            self._write_dictionaries()
+        row_count = len(self._columns["timestamp_ns"])
+        if row_count:
+            columns, self._columns = self._columns, self._new_columns()
+            self._file.write(ROW_GROUP_HEADER.pack(ROW_GROUP_MAGIC, row_count))
+            for name, _ in COLUMNS:
+                values = columns[name]
+                if _NEEDS_BYTESWAP:
+                    values.byteswap()
+                self._file.write(values.tobytes())
+            self._file.flush()
+            self.rows_written += row_count
+            self.row_groups_written += 1
+
+    def close(self):
+        """Write the final row group and close the store"""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+        self._dictionary_file.close()
+        self._dictionary_file = None
+
+    def _encode(self, dictionary, value):
+        """Return the integer ID for value, adding it to the dictionary if new"""
+        ids = self._ids[dictionary]
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = len(self._dictionaries[dictionary])
+            ids[value] = value_id
+            self._dictionaries[dictionary].append(value)
+            self._new_entries.append((dictionary, value_id, value))
+        return value_id
+
+    def _write_dictionaries(self):
+        """Append the dictionary entries added since the last flush to the log"""
+        entries, self._new_entries = self._new_entries, []
+        self._dictionary_file.write("".join(
+            json.dumps({"dictionary": dictionary, "id": value_id, "value": value}) + "\n"
+            for dictionary, value_id, value in entries
+        ))
+        self._dictionary_file.flush()
+
+    @staticmethod
+    def _new_columns():
+        return {name: array(typecode) for name, typecode in COLUMNS}
+
+
+def _row_group_size(row_count):
+    """Size in bytes of a row group holding row_count samples"""
+    return ROW_GROUP_HEADER.size + row_count * sum(array(typecode).itemsize for _, typecode in COLUMNS)
+
+
+def _truncate_incomplete_row_group(path):
+    """Cut off a row group left half-written by an interrupted run so new groups stay aligned"""
+    file_size = path.stat().st_size
+    offset = 0
+    with open(path, "rb+") as f:
+        while offset + ROW_GROUP_HEADER.size <= file_size:
+            f.seek(offset)
+            magic, row_count = ROW_GROUP_HEADER.unpack(f.read(ROW_GROUP_HEADER.size))
+            if magic != ROW_GROUP_MAGIC or offset + _row_group_size(row_count) > file_size:
+                break
+            offset += _row_group_size(row_count)
+        if offset != file_size:
+            f.truncate(offset)
+
+
+def _float_or_nan(value):
+    return float(value) if value is not None else math.nan
+
+
+def _read_dictionaries(path):
+    """
+    Replay a dictionary log
+
+    Returns:
+        tuple: (dictionaries, size) - the lookup tables, and the byte size of the complete lines
+        (a line half-written by an interrupted run is ignored)
+    """
+    dictionaries = {"categories": [], "questions": [], "statuses": [], "runs": []}
+    size = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            entry = json.loads(line)
+            values = dictionaries[entry["dictionary"]]
+            if entry["id"] != len(values):
+                raise ValueError(f"Corrupt sample store: dictionary entry out of order in {path}")
+            values.append(entry["value"])
+            size += len(line)
+    return dictionaries, size
+
+
+def _read_row_groups(directory, np):
+    """Read one store directory; returns ({column: [chunks]}, dictionaries)"""
+    dictionaries, _ = _read_dictionaries(directory / DICTIONARIES_FILE)
+    with open(directory / SAMPLES_FILE, "rb") as f:
+        data = f.read()
+
+    parts = {name: [] for name, _ in COLUMNS}
+    offset = 0
+    while offset + ROW_GROUP_HEADER.size <= len(data):
+        magic, row_count = ROW_GROUP_HEADER.unpack_from(data, offset)
+        if magic != ROW_GROUP_MAGIC:
+            raise ValueError(f"Corrupt sample store: bad row group header at byte {offset} of {directory}")
+        offset += ROW_GROUP_HEADER.size
+        if offset + _row_group_size(row_count) - ROW_GROUP_HEADER.size > len(data):
+            # Row group truncated by an interrupted run - ignore the incomplete tail
+            break
+        for name, typecode in COLUMNS:
+            size = row_count * array(typecode).itemsize
+            if np is not None:
+                parts[name].append(np.frombuffer(data, dtype=NUMPY_DTYPES[typecode], count=row_count, offset=offset))
+            else:
+                values = array(typecode)
+                values.frombytes(data[offset:offset + size])
+                if _NEEDS_BYTESWAP:
+                    values.byteswap()
+                parts[name].append(values)
+            offset += size
+
+    return parts, dictionaries
+
+
+def load_samples(directory):
+    """
+    Load every row group of a sample store
+
+    In distributed runs each worker writes its own store in a worker_<N>
+    subdirectory; these are merged, with their dictionary IDs remapped onto
+    one combined set of dictionaries.
+
+    Args:
+        directory: Path of the sample store directory
+
+    Returns:
+        tuple: (columns, dictionaries) where columns maps column name to a NumPy
+        array (or array.array if NumPy is not installed) and dictionaries maps
+        "categories" / "questions" / "statuses" / "runs" to lists indexed by ID (run_id -1 = unknown run)
+    """
+    directory = Path(directory)
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    stores = [directory] if (directory / SAMPLES_FILE).exists() else []
+    stores += sorted(path for path in directory.glob("worker_*") if (path / SAMPLES_FILE).exists())
+    if not stores:
+        raise FileNotFoundError(f"No sample store found in {directory}")
+
+    typecodes = dict(COLUMNS)
+    dictionaries = {"categories": [], "questions": [], "statuses": [], "runs": []}
+    ids = {name: {} for name in dictionaries}
+    parts = {name: [] for name, _ in COLUMNS}
+    for store in stores:
+        store_parts, store_dictionaries = _read_row_groups(store, np)
+        for column, dictionary in DICTIONARY_COLUMNS:
+            mapping = []
+            for value in store_dictionaries[dictionary]:
+                if value not in ids[dictionary]:
+                    ids[dictionary][value] = len(dictionaries[dictionary])
+                    dictionaries[dictionary].append(value)
+                mapping.append(ids[dictionary][value])
+            if mapping == list(range(len(mapping))):
+                continue
+            typecode = typecodes[column]
+            if np is not None:
+                lookup = np.array(mapping, dtype=NUMPY_DTYPES[typecode])
+                # Negative IDs (unknown run) stay as they are
+                store_parts[column] = [np.where(chunk < 0, chunk, lookup[np.maximum(chunk, 0)])
+                                       for chunk in store_parts[column]]
+            else:
+                store_parts[column] = [array(typecode, (mapping[i] if i >= 0 else i for i in chunk))
+                                       for chunk in store_parts[column]]
+        for name in parts:
+            parts[name].extend(store_parts[name])
+
+    columns = {}
+    for name, typecode in COLUMNS:
+        chunks = parts[name]
+        if np is not None:
+            columns[name] = np.concatenate(chunks) if chunks else np.empty(0, dtype=NUMPY_DTYPES[typecode])
+        else:
+            merged = array(typecode)
+            for chunk in chunks:
+                merged.extend(chunk)
+            columns[name] = merged
+    return columns, dictionaries
+
+
+def iter_samples(directory):
+    """
+    Stream the samples of a sample store one row group at a time, in timestamp order
+
+    Unlike load_samples(), only one row group per store is held in memory, so
+    stores of any size can be scanned. Per-worker stores are merged by timestamp.
+
+    Yields:
+        dict: timestamp_s, category, status, run_id (None = unknown), step and the latency / token /
+        response size columns (None = not measured)
+    """
+    directory = Path(directory)
+    stores = [directory] if (directory / SAMPLES_FILE).exists() else []
+    stores += sorted(path for path in directory.glob("worker_*") if (path / SAMPLES_FILE).exists())
+    if not stores:
+        raise FileNotFoundError(f"No sample store found in {directory}")
+    # Rows of one store are in write order; the sequence number keeps heapq from comparing dicts
+    streams = [
+        ((row["timestamp_s"], i, sequence, row) for sequence, row in enumerate(_iter_store(store)))
+        for i, store in enumerate(stores)
+    ]
+    for _, _, _, row in heapq.merge(*streams):
+        yield row
+
+
+def _iter_store(directory):
+    dictionaries, _ = _read_dictionaries(directory / DICTIONARIES_FILE)
+    categories, statuses, runs = dictionaries["categories"], dictionaries["statuses"], dictionaries["runs"]
+    with open(directory / SAMPLES_FILE, "rb") as f:
+        while True:
+            header = f.read(ROW_GROUP_HEADER.size)
+            if len(header) < ROW_GROUP_HEADER.size:
+                return
+            magic, row_count = ROW_GROUP_HEADER.unpack(header)
+            if magic != ROW_GROUP_MAGIC:
+                raise ValueError(f"Corrupt sample store: bad row group header in {directory}")
+            columns = {}
+            for name, typecode in COLUMNS:
+                values = array(typecode)
+                data = f.read(row_count * values.itemsize)
+                if len(data) < row_count * values.itemsize:
+                    # Row group truncated by an interrupted run - ignore the incomplete tail
+                    return
+                values.frombytes(data)
+                if _NEEDS_BYTESWAP:
+                    values.byteswap()
+                columns[name] = values
+            for i in range(row_count):
+                row = {
+                    "timestamp_s": columns["timestamp_ns"][i] / 1e9,
+                    "category": categories[columns["category_id"][i]],
+                    "status": statuses[columns["status_id"][i]],
+                    "run_id": runs[columns["run_id"][i]] if columns["run_id"][i] >= 0 else None,
+                    "step": columns["step"][i],
+                }
+                for name in COUNT_COLUMNS:
+                    value = columns[name][i]
+                    row[name] = value if value >= 0 else None
+                for name in FLOAT_COLUMNS:
+                    value = columns[name][i]
+                    row[name] = None if math.isnan(value) else value
+                yield row
+
+
+def load_dataframe(directory):
+    """
+    Load a sample store into a pandas DataFrame with decoded category/question/status columns
+
+    Requires pandas (and NumPy). Text columns are returned as pandas categoricals,
+    so memory stays proportional to the number of distinct values.
+    """
+    import pandas as pd
+
+    columns, dictionaries = load_samples(directory)
+    frame = pd.DataFrame({
+        "Timestamp": pd.to_datetime(columns["timestamp_ns"], unit="ns"),
+        "Question_Category": pd.Categorical.from_codes(columns["category_id"], dictionaries["categories"]),
+        "Question_Text": pd.Categorical.from_codes(columns["question_id"], dictionaries["questions"]),
+        "Status": pd.Categorical.from_codes(columns["status_id"], dictionaries["statuses"]),
+        "TTF_ms": columns["ttft_ms"],
+        "Total_Response_Time_ms": columns["total_ms"],
+        "TTFB_ms": columns["ttfb_ms"],
+        "TTLT_ms": columns["ttlt_ms"],
+        "Mean_Inter_Token_ms": columns["mean_inter_token_ms"],
+        "Max_Inter_Token_ms": columns["max_inter_token_ms"],
+        "Token_Count": columns["token_count"],
+        "Response_Bytes": columns["response_bytes"],
+        "Answer_Chars": columns["answer_chars"],
+        "Estimated_Tokens": columns["estimated_tokens"],
+        "Tokens_Per_Second": columns["tokens_per_second"],
+        # Code -1 (unknown run) becomes NaN
+        "Run_ID": pd.Categorical.from_codes(columns["run_id"], dictionaries["runs"]),
+        "Step": columns["step"],
+    })
+    return frame
@@ -0,0 +1,116 @@
+"""
+Shared Login Session Cache
+Process-wide pool of authenticated sessions shared by all virtual users
+
+Without sharing, every virtual user logs in on start and again on every 401.
+With hundreds of users on one LOGIN_EMAIL that is a login stampede that
+dominates the first minutes of a run and skews the statistics.
+
+The cache keeps `pool_size` sessions (the cookies captured after a successful
+login). Users are assigned to a slot round-robin and copy that slot's cookies
+into their own HTTP client. When a session expires (after `ttl` seconds, when
+one of its cookies expires, or when a user gets a 401), only one greenlet per
+slot logs in again - the others wait for it and reuse the fresh session
+(single-flight).
+"""
+import itertools
+import time
+
+from gevent.lock import Semaphore
+
+
+class AuthSession:
+    """Cookies captured from one successful login"""
+
+    def __init__(self, cookies, ttl=0):
+        self.cookies = list(cookies)
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl if ttl > 0 else None
+
+    @property
+    def expired(self):
+        if self.expires_at is not None and time.time() >= self.expires_at:
+            return True
+        return any(cookie.is_expired() for cookie in self.cookies)
+
+    def apply(self, cookiejar):
+        """Copy the session cookies into an HTTP client's cookie jar"""
+        for cookie in self.cookies:
+            cookiejar.set_cookie(cookie)
+
+
+class SessionCache:
+    """Pool of shared login sessions with single-flight refresh"""
+
+    def __init__(self, pool_size=1, ttl=0, retry_interval=5.0):
+        self.pool_size = max(1, int(pool_size))
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+
+        self.logins = 0
+        self.failed_logins = 0
+        self.reused = 0
+
+        self._sessions = [None] * self.pool_size
+        self._locks = [Semaphore() for _ in range(self.pool_size)]
+        self._last_failure = [None] * self.pool_size
+        self._next_slot = itertools.count()
+
+    def assign_slot(self):
+        """Slot for a new user (round-robin over the pool)"""
+        return next(self._next_slot) % self.pool_size
+
+    def current(self, slot):
+        """The slot's session if it is still valid, else None"""
+        session = self._sessions[slot]
+        if session is None or session.expired:
+            return None
+        return session
+
+    def acquire(self, slot, login, stale=None):
+        """
+        Return a valid session for slot, logging in if needed (single-flight)
+
+        Args:
+            slot: Pool slot from assign_slot()
+            login: Callable that performs a login and returns the captured cookies
+                (an iterable of http.cookiejar.Cookie) or None on failure
+            stale: Session the caller found to be rejected (e.g. after a 401);
+                it is replaced even if it has not expired yet
+
+        Returns:
+            AuthSession or None if logging in failed
+        """
+        session = self.current(slot)
+        if session is not None and session is not stale:
+            self.reused += 1
+            return session
+
+        with self._locks[slot]:
+            # Another greenlet may have refreshed the session while we waited
+            session = self.current(slot)
+            if session is not None and session is not stale:
+                self.reused += 1
+                return session
+
+            # Don't hammer the login endpoint while it is failing
+            last_failure = self._last_failure[slot]
+            if last_failure is not None and time.time() - last_failure < self.retry_interval:
+                return None
+
+            cookies = login()
+            if cookies is None:
+                self.failed_logins += 1
+                self._last_failure[slot] = time.time()
+                self._sessions[slot] = None
+                return None
+
+            self.logins += 1
+            self._last_failure[slot] = None
+            session = AuthSession(cookies, self.ttl)
+            self._sessions[slot] = session
+            return session
+
+    def stats(self):
+        """Counters for reporting (logins, failed logins, sessions reused)"""
+        return {"logins": self.logins, "failed_logins": self.failed_logins, "reused": self.reused}
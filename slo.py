@@ -0,0 +1,344 @@
+"""
+Service Level Objectives
+Declarative latency / error-rate / throughput limits, checked while the test runs
+
+SLOs are declared in test_config.py (SLO_RULES) as comma-separated rules of
+the form "<category>:<metric><operator><limit>", for example:
+    Complex:p95_ttft_ms<4000,All:error_rate<1,All:rps>=2
+Categories are question categories ("All" = every chat message). Metrics:
+- p<N>_ttft_ms / p<N>_total_ms: percentile of time to first token or total
+  response time in ms (successful responses only)
+- error_rate: failed chat messages in percent
+- rps: chat messages per second
+
+Every process counts its chat messages into small HDR histograms per category.
+Workers ship what they counted since their last report to the master, which
+(like a local run) keeps the last `window_seconds` of them and evaluates every
+rule over that rolling window every `check_interval` seconds. A rule that stays
+breached for `abort_after_seconds` is a sustained breach: the test is aborted
+(unless abort is off) and the rule fails. At the end every rule is also
+evaluated over the whole run after the warm-up; the run passes when no rule was
+breached for a sustained window and every whole-run value meets its limit.
+"""
+import json
+import operator
+import re
+import time
+from collections import deque
+from pathlib import Path
+
+import gevent
+
+from latency_histogram import HdrHistogram
+
+ALL_CATEGORIES = "All"
+
+OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+RULE_PATTERN = re.compile(r"^\s*(?P<category>[^:]+?)\s*:\s*(?P<metric>[a-z0-9_.]+)\s*(?P<operator><=|>=|<|>)\s*(?P<limit>[-+0-9.eE]+)\s*$")
+PERCENTILE_METRIC_PATTERN = re.compile(r"^p(?P<percentile>\d+(?:\.\d+)?)_(?P<metric>ttft_ms|total_ms)$")
+
+
+class SloRule:
+    """One objective: metric of a category compared with a limit"""
+
+    def __init__(self, category, metric, comparison, limit):
+        if comparison not in OPERATORS:
+            raise ValueError(f"Unknown SLO operator '{comparison}'")
+        if metric not in ("error_rate", "rps") and not PERCENTILE_METRIC_PATTERN.match(metric):
+            raise ValueError(f"Unknown SLO metric '{metric}' (use p<N>_ttft_ms, p<N>_total_ms, error_rate or rps)")
+        self.category = category
+        self.metric = metric
+        self.comparison = comparison
+        self.limit = float(limit)
+
+    def __str__(self):
+        return f"{self.category}:{self.metric}{self.comparison}{self.limit:g}"
+
+    def holds(self, value):
+        return OPERATORS[self.comparison](value, self.limit)
+
+
+def parse_slo_rules(text):
+    """
+    Parse SLO_RULES ("Complex:p95_ttft_ms<4000,All:error_rate<1")
+
+    Raises:
+        ValueError: A rule is malformed or uses an unknown metric
+    """
+    rules = []
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        match = RULE_PATTERN.match(item)
+        if match is None:
+            raise ValueError(f"Invalid SLO rule '{item.strip()}' (expected <category>:<metric><operator><limit>)")
+        rules.append(SloRule(match["category"], match["metric"], match["operator"], float(match["limit"])))
+    return rules
+
+
+class _Counts:
+    __slots__ = ("requests", "errors", "ttft_ms", "total_ms")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.ttft_ms = HdrHistogram(significant_digits=2)
+        self.total_ms = HdrHistogram(significant_digits=2)
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.ttft_ms.merge(other.ttft_ms)
+        self.total_ms.merge(other.total_ms)
+
+
+class SloCounts:
+    """Request / error counts and latency histograms per category over some period"""
+
+    def __init__(self):
+        self.categories = {}
+
+    def record(self, category, success, ttft_ms=None, total_ms=None):
+        for name in (category, ALL_CATEGORIES):
+            counts = self.categories.get(name)
+            if counts is None:
+                counts = self.categories[name] = _Counts()
+            counts.requests += 1
+            if not success:
+                counts.errors += 1
+                continue
+            if ttft_ms is not None:
+                counts.ttft_ms.record(ttft_ms * 1000)
+            if total_ms is not None:
+                counts.total_ms.record(total_ms * 1000)
+
+    def merge(self, other):
+        for name, counts in other.categories.items():
+            self.categories.setdefault(name, _Counts()).merge(counts)
+
+    def to_dict(self):
+        return {
+            name: {
+                "requests": counts.requests,
+                "errors": counts.errors,
+                "ttft_ms": counts.ttft_ms.to_dict(),
+                "total_ms": counts.total_ms.to_dict(),
+            }
+            for name, counts in self.categories.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        result = cls()
+        for name, entry in data.items():
+            counts = result.categories[name] = _Counts()
+            counts.requests = entry["requests"]
+            counts.errors = entry["errors"]
+            counts.ttft_ms = HdrHistogram.from_dict(entry["ttft_ms"])
+            counts.total_ms = HdrHistogram.from_dict(entry["total_ms"])
+        return result
+
+    def __bool__(self):
+        return bool(self.categories)
+
+    def value(self, rule, seconds, min_samples):
+        """Value of a rule's metric (None when there are fewer than min_samples to judge)"""
+        counts = self.categories.get(rule.category)
+        if counts is None:
+            return None
+        if rule.metric == "rps":
+            return counts.requests / seconds if seconds > 0 else None
+        if rule.metric == "error_rate":
+            return counts.errors / counts.requests * 100 if counts.requests >= min_samples else None
+        match = PERCENTILE_METRIC_PATTERN.match(rule.metric)
+        histogram = getattr(counts, match["metric"])
+        if histogram.total_count < min_samples:
+            return None
+        return histogram.value_at_percentile(float(match["percentile"])) / 1000
+
+
+class SloMonitor:
+    """Evaluates SLO rules over a rolling window and over the whole run"""
+
+    def __init__(self, rules, window_seconds=30.0, abort_after_seconds=60.0, check_interval=5.0,
+                 warmup_seconds=30.0, min_samples=20):
+        self.rules = rules
+        self.window_seconds = float(window_seconds)
+        self.abort_after_seconds = float(abort_after_seconds)
+        self.check_interval = max(0.5, float(check_interval))
+        self.warmup_seconds = float(warmup_seconds)
+        self.min_samples = min_samples
+
+        self.started = None
+        self.stopped = None
+        self.abort_reason = None
+        # Counted in this process since they were last collected (shipped to the master or taken by check())
+        self.pending = SloCounts()
+        # Whole run after the warm-up
+        self.run_counts = SloCounts()
+        self._recent = deque()  # (arrival time, SloCounts)
+        self._state = {str(rule): {"breached_since": None, "longest_breach_seconds": 0.0,
+                                   "sustained": False, "worst_window_value": None} for rule in rules}
+        self._greenlet = None
+
+    def record(self, category, success, ttft_ms=None, total_ms=None):
+        """Count one chat message (ms latencies of a successful response, None = not measured)"""
+        self.pending.record(category, success, ttft_ms, total_ms)
+
+    def take_pending(self):
+        """Counts since the last call (workers send them with every report)"""
+        pending, self.pending = self.pending, SloCounts()
+        return pending
+
+    def add(self, counts, now=None):
+        """Add counts collected by this process or a worker"""
+        now = time.time() if now is None else now
+        if self.started is None:
+            self.started = now
+        # Ramp-up is judged neither in the rolling window nor over the run
+        if not counts or now - self.started < self.warmup_seconds:
+            return
+        self._recent.append((now, counts))
+        self.run_counts.merge(counts)
+
+    def start(self, on_abort=None):
+        """Check the rules every check_interval seconds; on_abort(reason) is called once on a sustained breach (None = never abort)"""
+        self.started = time.time()
+        self._greenlet = gevent.spawn(self._check_loop, on_abort)
+
+    def stop(self):
+        if self._greenlet is not None:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+        self.stopped = time.time()
+        self.add(self.take_pending())
+
+    def check(self, now=None):
+        """
+        Evaluate the rules over the rolling window
+
+        Returns:
+            str: Reason to abort (the first rule breached for abort_after_seconds), else None
+        """
+        now = time.time() if now is None else now
+        self.add(self.take_pending(), now)
+        while self._recent and now - self._recent[0][0] > self.window_seconds:
+            self._recent.popleft()
+        if now - self.started < self.warmup_seconds:
+            return None
+
+        window = SloCounts()
+        for _, counts in self._recent:
+            window.merge(counts)
+        seconds = min(self.window_seconds, now - self.started - self.warmup_seconds)
+        abort_reason = None
+        for rule in self.rules:
+            state = self._state[str(rule)]
+            value = window.value(rule, seconds, self.min_samples)
+            if value is None:
+                # Too few samples to tell either way: a running breach does not end
+                continue
+            worst = state["worst_window_value"]
+            state["worst_window_value"] = value if worst is None else _worse(rule, worst, value)
+            if rule.holds(value):
+                if state["breached_since"] is not None:
+                    print(f"✅ SLO {rule} met again ({value:.1f})")
+                state["breached_since"] = None
+                continue
+            if state["breached_since"] is None:
+                state["breached_since"] = now
+                print(f"⚠️  SLO {rule} breached: {value:.1f} over the last {seconds:.0f}s")
+            breach = now - state["breached_since"]
+            state["longest_breach_seconds"] = max(state["longest_breach_seconds"], breach)
+            if breach >= self.abort_after_seconds and not state["sustained"]:
+                state["sustained"] = True
+                abort_reason = abort_reason or f"SLO {rule} breached for {breach:.0f}s (last {seconds:.0f}s: {value:.1f})"
+        return abort_reason
+
+    def result(self, run_id=None, abort_enabled=True):
+        """
+        Verdict per rule and for the run
+
+        Returns:
+            dict: rules (whole-run value, worst window value, breach times, passed), aborted, abort_reason, passed
+        """
+        end = self.stopped or time.time()
+        seconds = end - (self.started or end) - self.warmup_seconds
+        rules = []
+        for rule in self.rules:
+            state = self._state[str(rule)]
+            value = self.run_counts.value(rule, seconds, self.min_samples)
+            run_met = value is None or rule.holds(value)
+            rules.append({
+                "rule": str(rule),
+                "category": rule.category,
+                "metric": rule.metric,
+                "operator": rule.comparison,
+                "limit": rule.limit,
+                "run_value": value,
+                "worst_window_value": state["worst_window_value"],
+                "longest_breach_seconds": state["longest_breach_seconds"],
+                "sustained_breach": state["sustained"],
+                "judged": value is not None,
+                "passed": run_met and not state["sustained"],
+            })
+        return {
+            "run_id": run_id,
+            "window_seconds": self.window_seconds,
+            "abort_after_seconds": self.abort_after_seconds,
+            "abort_enabled": abort_enabled,
+            "warmup_seconds": self.warmup_seconds,
+            "min_samples": self.min_samples,
+            "rules": rules,
+            "aborted": self.abort_reason is not None,
+            "abort_reason": self.abort_reason,
+            "passed": all(rule["passed"] for rule in rules),
+        }
+
+    def _check_loop(self, on_abort):
+        while True:
+            gevent.sleep(self.check_interval)
+            reason = self.check()
+            if reason is not None and on_abort is not None and self.abort_reason is None:
+                self.abort_reason = reason
+                on_abort(reason)
+
+
+def save_result(path, result):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+def load_result(path):
+    """Saved SLO verdict (None if there is none)"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def format_result(result):
+    """Text table of the rules: whole-run value, worst window, longest breach and verdict"""
+    lines = [f"{'SLO':<32} {'Run':>10} {'Worst':>10} {'Breached':>9}  Verdict"]
+    for rule in result["rules"]:
+        if rule["passed"]:
+            verdict = "✅ met" if rule["judged"] else "➖ not enough data"
+        elif rule["sustained_breach"]:
+            verdict = "❌ sustained breach"
+        else:
+            verdict = "❌ missed over the run"
+        lines.append(f"{rule['rule'][:32]:<32} {_format_value(rule['run_value']):>10} "
+                     f"{_format_value(rule['worst_window_value']):>10} {rule['longest_breach_seconds']:>8.0f}s  {verdict}")
+    return "\n".join(lines)
+
+
+def _worse(rule, a, b):
+    """The value of a and b that is further on the wrong side of the rule's limit"""
+    return max(a, b) if rule.comparison in ("<", "<=") else min(a, b)
+
+
+def _format_value(value):
+    return f"{value:.1f}" if value is not None else "-"
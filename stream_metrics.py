@@ -0,0 +1,206 @@
+"""
+Streaming Response Metrics
+Reads chatbot responses incrementally to measure real Time To First Token (TTF)
+
+The chat endpoint may answer with Server-Sent Events (`data:` frames),
+newline-delimited JSON chunks, or a plain chunked body. Reading the body as it
+arrives lets us separate:
+- Time to first byte (TTFB): response headers received - queueing before generation
+- Time to first token (TTFT): first token-bearing frame received
+- Inter-token gaps: time between consecutive token frames - generation speed
+- Time to last token (TTLT): last token-bearing frame received
+"""
+import codecs
+import time
+
+# Supported stream formats ("auto" picks one from the Content-Type header)
+STREAM_FORMATS = ("auto", "sse", "ndjson", "raw")
+
+
+class StreamTimings:
+    """Timing measurements for a single chat response (all values in milliseconds)"""
+
+    def __init__(self):
+        self.ttfb_ms = None
+        self.ttft_ms = None
+        self.ttlt_ms = None
+        self.total_ms = None
+        self.token_count = 0
+        self.inter_token_gaps_ms = []
+        self.byte_count = 0
+        self.body = ""
+        self.stream_format = None
+        self.error = None
+
+    @property
+    def mean_inter_token_ms(self):
+        """Average gap between consecutive tokens, or None if fewer than 2 tokens"""
+        if not self.inter_token_gaps_ms:
+            return None
+        return sum(self.inter_token_gaps_ms) / len(self.inter_token_gaps_ms)
+
+    @property
+    def max_inter_token_ms(self):
+        """Longest gap between consecutive tokens, or None if fewer than 2 tokens"""
+        if not self.inter_token_gaps_ms:
+            return None
+        return max(self.inter_token_gaps_ms)
+
+
+def detect_stream_format(content_type, configured="auto"):
+    """
+    Decide how to split a response body into token frames
+
+    Args:
+        content_type: Value of the response Content-Type header (may be None)
+        configured: One of STREAM_FORMATS; anything other than "auto" is returned as-is
+
+    Returns:
+        str: "sse", "ndjson" or "raw"
+    """
+    if configured and configured != "auto":
+        return configured
+    content_type = (content_type or "").lower()
+    if "text/event-stream" in content_type:
+        return "sse"
+    if "ndjson" in content_type or "jsonl" in content_type or "stream+json" in content_type:
+        return "ndjson"
+    return "raw"
+
+
+def _line_has_token(line, stream_format):
+    """Return True if a complete line carries a token for the given format"""
+    line = line.strip()
+    if not line:
+        return False
+    if stream_format == "sse":
+        if not line.startswith("data:"):
+            # Comments (":"), "event:", "id:" and "retry:" lines carry no tokens
+            return False
+        data = line[5:].strip()
+        return bool(data) and data != "[DONE]"
+    # ndjson: every non-empty line is one JSON chunk
+    return True
+
+
+def _iter_received_chunks(resp, chunk_size):
+    """
+    Yield body bytes as soon as they arrive on the socket
+
+    FastResponse.iter_content() blocks until a full chunk_size block has been
+    read, which would merge small token frames together and hide the real
+    arrival times. geventhttpclient's parser fills a body buffer on every
+    socket read, so we drain that buffer after each recv() instead.
+    """
+    raw = getattr(resp, "_response", None)
+    if raw is None or not hasattr(raw, "_body_buffer"):
+        # Unknown response implementation - fall back to block reads
+        yield from resp.iter_content(chunk_size=chunk_size, decode_content=False)
+        return
+
+    while True:
+        if raw._body_buffer:
+            data = bytes(raw._body_buffer)
+            del raw._body_buffer[:]
+            yield data
+            continue
+        if raw.message_complete or raw._sock is None:
+            return
+        try:
+            data = raw._sock.recv(chunk_size)
+            raw.feed(data)
+        except BaseException:
+            raw.release()
+            raise
+        if not data:
+            return
+
+
+def buffered_timings(request_start, body):
+    """
+    Build timings for a response that was read in one go (streaming disabled)
+
+    Only the total time is known; TTFB/TTFT/TTLT are left as None because they
+    cannot be separated from the full response time without streaming.
+    """
+    timings = StreamTimings()
+    timings.total_ms = (time.perf_counter() - request_start) * 1000
+    timings.body = body or ""
+    timings.byte_count = len(timings.body.encode("utf-8"))
+    timings.stream_format = "buffered"
+    return timings
+
+
+def read_stream(resp, request_start, stream_format="auto", chunk_size=1024):
+    """
+    Consume a streamed response body and record token timings
+
+    Must be called on a response requested with stream=True, right after the
+    request returns (i.e. once headers have been received).
+
+    Args:
+        resp: Locust FastHttp response object (requested with stream=True)
+        request_start: time.perf_counter() value taken just before the request was sent
+        stream_format: One of STREAM_FORMATS
+        chunk_size: Maximum number of bytes to read per socket read
+
+    Returns:
+        StreamTimings: Timing measurements plus the decoded body text
+    """
+    timings = StreamTimings()
+    timings.ttfb_ms = (time.perf_counter() - request_start) * 1000
+
+    headers = resp.headers or {}
+    timings.stream_format = detect_stream_format(headers.get("content-type"), stream_format)
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    body_parts = []
+    pending_line = ""
+    last_token_at = None
+    last_chunk_at = None
+
+    def mark_token(now):
+        nonlocal last_token_at
+        elapsed_ms = (now - request_start) * 1000
+        if timings.ttft_ms is None:
+            timings.ttft_ms = elapsed_ms
+        else:
+            timings.inter_token_gaps_ms.append((now - last_token_at) * 1000)
+        timings.ttlt_ms = elapsed_ms
+        timings.token_count += 1
+        last_token_at = now
+
+    try:
+        for chunk in _iter_received_chunks(resp, chunk_size):
+            now = last_chunk_at = time.perf_counter()
+            timings.byte_count += len(chunk)
+            text = decoder.decode(chunk)
+            if not text:
+                continue
+            body_parts.append(text)
+
+            if timings.stream_format == "raw":
+                mark_token(now)
+                continue
+
+            # Frame-based formats: only complete lines are counted
+            pending_line += text
+            *lines, pending_line = pending_line.split("\n")
+            for line in lines:
+                if _line_has_token(line, timings.stream_format):
+                    mark_token(now)
+    except Exception as e:
+        # Connection dropped or timed out mid-stream - keep what we measured
+        timings.error = e
+
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        body_parts.append(tail)
+        pending_line += tail
+    # A final frame without a trailing newline arrived with the last chunk
+    if timings.stream_format != "raw" and _line_has_token(pending_line, timings.stream_format):
+        mark_token(last_chunk_at or time.perf_counter())
+
+    timings.body = "".join(body_parts)
+    timings.total_ms = (time.perf_counter() - request_start) * 1000
+    return timings
@@ -24,6 +24,16 @@ API_ENDPOINT_SEND = os.getenv("API_ENDPOINT_SEND", "/api/chat")
 LOGIN_EMAIL = os.getenv("LOGIN_EMAIL", "")
 LOGIN_PASSWORD = os.getenv("LOGIN_PASSWORD", "")
 
+# Share login sessions between virtual users instead of every user logging in (see session_cache.py)
+# Only one user per session re-logs in when a session expires or is rejected; the others wait and reuse it
+SESSION_SHARING = os.getenv("SESSION_SHARING", "true").lower() in ("1", "true", "yes")
+# Number of separate login sessions per Locust process; users are spread over them round-robin
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "1"))
+# Seconds after which a session is refreshed proactively (0 = only when rejected or its cookies expire)
+SESSION_TTL = float(os.getenv("SESSION_TTL", "0"))
+# Log every session in at test start, before any user is spawned
+SESSION_PREWARM = os.getenv("SESSION_PREWARM", "false").lower() in ("1", "true", "yes")
+
 # ============================================================================
 # Load Test Configuration
 # Normal expected load conditions - baseline performance testing
@@ -40,6 +50,15 @@ ENDURANCE_TEST_USERS = int(os.getenv("ENDURANCE_TEST_USERS", "3"))
 ENDURANCE_TEST_SPAWN_RATE = float(os.getenv("ENDURANCE_TEST_SPAWN_RATE", "0.5"))
 ENDURANCE_TEST_RUN_TIME = os.getenv("ENDURANCE_TEST_RUN_TIME", "10m")
 
+# Degradation analysis (see degradation.py): TTF rows are grouped into windows and a trend is fitted
+ENDURANCE_WINDOW_SECONDS = float(os.getenv("ENDURANCE_WINDOW_SECONDS", "60"))
+# Windows starting within this many seconds of the first request are ignored (ramp-up)
+ENDURANCE_WARMUP_SECONDS = float(os.getenv("ENDURANCE_WARMUP_SECONDS", "60"))
+# The run fails if the p95 TTFT / total latency trend rises by more than this percentage over the run...
+ENDURANCE_MAX_LATENCY_DRIFT_PERCENT = float(os.getenv("ENDURANCE_MAX_LATENCY_DRIFT_PERCENT", "25"))
+# ...or the error rate trend rises by more than this many percentage points
+ENDURANCE_MAX_ERROR_RATE_INCREASE = float(os.getenv("ENDURANCE_MAX_ERROR_RATE_INCREASE", "5"))
+
 # ============================================================================
 # Stress Test Configuration
 # High load beyond normal capacity to find breaking point
@@ -57,6 +76,169 @@ BREAKPOINT_TEST_MAX_USERS = int(os.getenv("BREAKPOINT_TEST_MAX_USERS", "150"))
 BREAKPOINT_TEST_SPAWN_RATE = float(os.getenv("BREAKPOINT_TEST_SPAWN_RATE", "1"))
 BREAKPOINT_TEST_STEP_DURATION = os.getenv("BREAKPOINT_TEST_STEP_DURATION", "1m")
 BREAKPOINT_TEST_USER_INCREMENT = int(os.getenv("BREAKPOINT_TEST_USER_INCREMENT", "20"))
+# Failure rate (%) of a step above which the breaking point is declared
+BREAKPOINT_TEST_FAILURE_RATE = float(os.getenv("BREAKPOINT_TEST_FAILURE_RATE", "10"))
+# "shape": ramp within one running Locust test, users stay logged in across steps (breakpoint_shape.py)
+# "subprocess": start a fresh Locust process for every step (legacy behaviour)
+BREAKPOINT_TEST_MODE = os.getenv("BREAKPOINT_TEST_MODE", "shape").lower()
+
+# Early stop / knee detection (see knee_detector.py)
+# The ramp stops automatically once the system is clearly past its saturation knee
+BREAKPOINT_EARLY_STOP = os.getenv("BREAKPOINT_EARLY_STOP", "true").lower() in ("1", "true", "yes")
+# A step is "saturated" when throughput grew by less than this fraction of the user growth...
+BREAKPOINT_KNEE_THROUGHPUT_EFFICIENCY = float(os.getenv("BREAKPOINT_KNEE_THROUGHPUT_EFFICIENCY", "0.25"))
+# ...while p95 latency grew by at least this factor compared to the previous step
+BREAKPOINT_KNEE_LATENCY_GROWTH = float(os.getenv("BREAKPOINT_KNEE_LATENCY_GROWTH", "1.2"))
+# Consecutive saturated steps needed before the ramp is stopped
+BREAKPOINT_KNEE_CONFIRM_STEPS = int(os.getenv("BREAKPOINT_KNEE_CONFIRM_STEPS", "2"))
+# Stop immediately if the rolling p95 exceeds this multiple of the first step's p95...
+BREAKPOINT_MAX_LATENCY_FACTOR = float(os.getenv("BREAKPOINT_MAX_LATENCY_FACTOR", "10"))
+# ...or the rolling / step error rate (%) exceeds this value
+BREAKPOINT_MAX_ERROR_RATE = float(os.getenv("BREAKPOINT_MAX_ERROR_RATE", "25"))
+# Length of the rolling window (seconds) watched while a step is running
+BREAKPOINT_ROLLING_WINDOW = float(os.getenv("BREAKPOINT_ROLLING_WINDOW", "10"))
+
+# ============================================================================
+# Replay Test Configuration
+# Replays a recorded production log on its original schedule (see traffic_replay.py)
+# ============================================================================
+# CSV / JSONL log with timestamp, session and question columns (required for the replay test)
+REPLAY_LOG_PATH = os.getenv("REPLAY_LOG_PATH", "")
+# Speed-up factor: 2 replays the log in half the recorded time (inter-arrival gaps are halved)
+REPLAY_SPEEDUP = float(os.getenv("REPLAY_SPEEDUP", "1"))
+# Virtual users that replay sessions (0 = twice the peak number of overlapping sessions in the log)
+REPLAY_TEST_USERS = int(os.getenv("REPLAY_TEST_USERS", "0"))
+# Users spawned per second (0 = all users at once, so early sessions are not delayed)
+REPLAY_TEST_SPAWN_RATE = float(os.getenv("REPLAY_TEST_SPAWN_RATE", "0"))
+# Test duration (empty = length of the replay after speed-up plus REPLAY_TEST_TAIL seconds)
+REPLAY_TEST_RUN_TIME = os.getenv("REPLAY_TEST_RUN_TIME", "")
+REPLAY_TEST_TAIL = int(os.getenv("REPLAY_TEST_TAIL", "60"))
+
+# ============================================================================
+# Conversation Test Configuration
+# Multi-turn conversations with growing context (see conversation_user.py)
+# ============================================================================
+CONVERSATION_TEST_USERS = int(os.getenv("CONVERSATION_TEST_USERS", "5"))
+CONVERSATION_TEST_SPAWN_RATE = float(os.getenv("CONVERSATION_TEST_SPAWN_RATE", "1"))
+CONVERSATION_TEST_RUN_TIME = os.getenv("CONVERSATION_TEST_RUN_TIME", "5m")
+# Turns per conversation: the scripted dialogue first, then generic follow-ups
+CONVERSATION_TURNS = int(os.getenv("CONVERSATION_TURNS", "6"))
+# Field the conversation ID is read from (response) and sent back in (follow-up requests)
+CONVERSATION_ID_FIELD = os.getenv("CONVERSATION_ID_FIELD", "conversation_id")
+# Response header used when the body carries no conversation ID (e.g. streamed answers)
+CONVERSATION_ID_HEADER = os.getenv("CONVERSATION_ID_HEADER", "X-Conversation-Id")
+# JSON file with dialogue trees (empty = DIALOGUE_TREES in sample_questions.py)
+CONVERSATION_SCRIPTS_PATH = os.getenv("CONVERSATION_SCRIPTS_PATH", "")
+
+# ============================================================================
+# Baseline Comparison Configuration
+# Gates runs against the saved results of a blessed run (see baseline.py)
+# ============================================================================
+BASELINE_DIR = os.getenv("BASELINE_DIR", "baselines")
+BASELINE_NAME = os.getenv("BASELINE_NAME", "default")
+# Compare every load / stress / endurance / replay run with the baseline and exit with 1 on a regression
+BASELINE_AUTO_COMPARE = os.getenv("BASELINE_AUTO_COMPARE", "false").lower() in ("1", "true", "yes")
+# A check regresses when it is worse than its threshold AND the one-sided test is significant
+BASELINE_MAX_LATENCY_INCREASE_PERCENT = float(os.getenv("BASELINE_MAX_LATENCY_INCREASE_PERCENT", "20"))
+BASELINE_MAX_THROUGHPUT_DECREASE_PERCENT = float(os.getenv("BASELINE_MAX_THROUGHPUT_DECREASE_PERCENT", "20"))
+# Percentage points
+BASELINE_MAX_ERROR_RATE_INCREASE = float(os.getenv("BASELINE_MAX_ERROR_RATE_INCREASE", "2"))
+BASELINE_SIGNIFICANCE_LEVEL = float(os.getenv("BASELINE_SIGNIFICANCE_LEVEL", "0.05"))
+# Categories with fewer requests in either run are reported but not tested
+BASELINE_MIN_SAMPLES = int(os.getenv("BASELINE_MIN_SAMPLES", "30"))
+# Where the last comparison is saved
+BASELINE_COMPARISON_PATH = os.getenv("BASELINE_COMPARISON_PATH", "reports/baseline_comparison.json")
+
+# ============================================================================
+# Service Level Objectives
+# Checked live from in-memory stats while a test runs (see slo.py)
+# ============================================================================
+# "<category>:<metric><operator><limit>" rules separated by commas (empty = no SLOs)
+# Category "All" covers every chat message; metrics: p<N>_ttft_ms, p<N>_total_ms (ms), error_rate (%), rps
+# Example: SLO_RULES="Complex:p95_ttft_ms<4000,All:error_rate<1"
+SLO_RULES = os.getenv("SLO_RULES", "")
+# Rolling window each rule is evaluated over, and how often
+SLO_WINDOW_SECONDS = float(os.getenv("SLO_WINDOW_SECONDS", "30"))
+SLO_CHECK_INTERVAL = float(os.getenv("SLO_CHECK_INTERVAL", "5"))
+# A rule breached this long fails the run; with SLO_ABORT the test is stopped right away (not in breakpoint tests)
+SLO_ABORT_AFTER_SECONDS = float(os.getenv("SLO_ABORT_AFTER_SECONDS", "60"))
+SLO_ABORT = os.getenv("SLO_ABORT", "true").lower() in ("1", "true", "yes")
+# Ramp-up / logins are not judged
+SLO_WARMUP_SECONDS = float(os.getenv("SLO_WARMUP_SECONDS", "30"))
+# Windows with fewer chat messages (of a category) are not judged
+SLO_MIN_SAMPLES = int(os.getenv("SLO_MIN_SAMPLES", "20"))
+
+# ============================================================================
+# Distributed Load Generation Configuration
+# ============================================================================
+# Number of local Locust worker processes started by run_tests.py (one master + N workers)
+# A single Locust process can only use one CPU core; 1 runs a single process without master/workers
+LOCUST_WORKERS = int(os.getenv("LOCUST_WORKERS", str(os.cpu_count() or 1)))
+# Seconds the master waits for all workers to connect before giving up
+LOCUST_WORKER_CONNECT_TIMEOUT = int(os.getenv("LOCUST_WORKER_CONNECT_TIMEOUT", "60"))
+
+# ============================================================================
+# Load Generator Health Configuration
+# ============================================================================
+# Every Locust process samples its own CPU%, memory, open sockets and event-loop lag
+# (see generator_health.py) so a saturated load generator is not mistaken for a slow chatbot
+GENERATOR_HEALTH_ENABLED = os.getenv("GENERATOR_HEALTH_ENABLED", "true").lower() in ("1", "true", "yes")
+# Seconds between samples
+GENERATOR_HEALTH_INTERVAL = float(os.getenv("GENERATOR_HEALTH_INTERVAL", "2"))
+# A sample is saturated when process CPU% (100 = one full core) or its mean event-loop lag reaches these values
+GENERATOR_CPU_THRESHOLD = float(os.getenv("GENERATOR_CPU_THRESHOLD", "90"))
+GENERATOR_LAG_THRESHOLD_MS = float(os.getenv("GENERATOR_LAG_THRESHOLD_MS", "100"))
+# A run is marked invalid when more than this percentage of all samples were saturated
+GENERATOR_MAX_SATURATED_PERCENT = float(os.getenv("GENERATOR_MAX_SATURATED_PERCENT", "5"))
+
+# ============================================================================
+# Mock Chatbot Server Configuration
+# Local stand-in server for offline runs and harness benchmarks (see mock_server.py)
+# ============================================================================
+def _parse_category_values(value):
+    """Parse "Simple:150,Common:400" into {"Simple": 150.0, "Common": 400.0}"""
+    values = {}
+    for item in value.split(","):
+        name, _, number = item.partition(":")
+        if name.strip() and number.strip():
+            values[name.strip()] = float(number)
+    return values
+
+MOCK_SERVER_HOST = os.getenv("MOCK_SERVER_HOST", "127.0.0.1")
+MOCK_SERVER_PORT = int(os.getenv("MOCK_SERVER_PORT", "8765"))
+# Median time to first token (ms) per question category; "default" covers unknown questions
+MOCK_TTFT_MS = _parse_category_values(os.getenv("MOCK_TTFT_MS", "Simple:200,Common:500,Complex:1000,default:500"))
+# Spread of the log-normal TTFT distribution (0 = always the median)
+MOCK_LATENCY_SIGMA = float(os.getenv("MOCK_LATENCY_SIGMA", "0.3"))
+# Tokens per response per category, streamed at MOCK_TOKENS_PER_SECOND (0 = all at once)
+MOCK_RESPONSE_TOKENS = _parse_category_values(os.getenv("MOCK_RESPONSE_TOKENS", "Simple:30,Common:80,Complex:200,default:80"))
+MOCK_TOKENS_PER_SECOND = float(os.getenv("MOCK_TOKENS_PER_SECOND", "50"))
+# Extra TTFT (ms) per 1000 characters of conversation history sent back with CONVERSATION_ID_FIELD
+MOCK_CONTEXT_MS_PER_KCHAR = float(os.getenv("MOCK_CONTEXT_MS_PER_KCHAR", "100"))
+# sse | ndjson | json (json = one document once the full answer is generated)
+MOCK_STREAM_FORMAT = os.getenv("MOCK_STREAM_FORMAT", "sse").lower()
+# Injected error rates (% of chat requests)
+MOCK_ERROR_RATE_401 = float(os.getenv("MOCK_ERROR_RATE_401", "0"))
+MOCK_ERROR_RATE_422 = float(os.getenv("MOCK_ERROR_RATE_422", "0"))
+MOCK_ERROR_RATE_5XX = float(os.getenv("MOCK_ERROR_RATE_5XX", "0"))
+# Chat requests processed at once (0 = unlimited); extra requests wait, up to MOCK_MAX_QUEUE (-1 = unlimited), then get 503
+MOCK_MAX_CONCURRENCY = int(os.getenv("MOCK_MAX_CONCURRENCY", "0"))
+MOCK_MAX_QUEUE = int(os.getenv("MOCK_MAX_QUEUE", "1000"))
+# Require the session cookie from login on /chat and the send endpoint; sessions expire after MOCK_SESSION_TTL seconds (0 = never)
+MOCK_REQUIRE_AUTH = os.getenv("MOCK_REQUIRE_AUTH", "true").lower() in ("1", "true", "yes")
+MOCK_SESSION_TTL = float(os.getenv("MOCK_SESSION_TTL", "0"))
+
+# ============================================================================
+# External Question Corpus Configuration
+# Large question files with per-question metadata (see question_corpus.py)
+# ============================================================================
+# JSONL / CSV / Parquet file of questions; empty = use the built-in lists in sample_questions.py
+QUESTION_CORPUS_PATH = os.getenv("QUESTION_CORPUS_PATH", "")
+# auto (from the file extension) | jsonl | csv | parquet (needs pyarrow)
+QUESTION_CORPUS_FORMAT = os.getenv("QUESTION_CORPUS_FORMAT", "auto").lower()
+# Total number of Locust workers the corpus is sharded across; run_tests.py sets it for its workers,
+# set it yourself when starting workers by hand (each worker uses its worker index as its shard)
+LOCUST_WORKER_COUNT = int(os.getenv("LOCUST_WORKER_COUNT", "1"))
 
 # ============================================================================
 # Legacy Defaults (for backward compatibility)
@@ -73,6 +255,27 @@ DEFAULT_RUN_TIME = LOAD_TEST_RUN_TIME
 WAIT_TIME_MIN = float(os.getenv("WAIT_TIME_MIN", "2"))
 WAIT_TIME_MAX = float(os.getenv("WAIT_TIME_MAX", "5"))
 
+# ============================================================================
+# User Persona Configuration
+# ============================================================================
+# Mix of user personas with their share of users (see personas.py), e.g. "quick_lookup:5,deep_research:2,idle_browser:3"
+# Each persona has its own task weights, question categories and think-time model (reading-speed based or uniform)
+# Empty = every user is the same MyUser (TASK_WEIGHT_* and WAIT_TIME_MIN-WAIT_TIME_MAX)
+PERSONA_MIX = os.getenv("PERSONA_MIX", "")
+# JSON file with extra personas or overrides of the built-in ones (empty = built-in personas only)
+PERSONAS_PATH = os.getenv("PERSONAS_PATH", "")
+
+# ============================================================================
+# Open-Loop Arrival Rate Configuration
+# ============================================================================
+# Target requests per second over all workers (see arrival_schedule.py)
+# 0 = closed loop: every user waits WAIT_TIME_MIN-WAIT_TIME_MAX after its own response
+# > 0 = open loop: tasks start on a fixed schedule whether or not earlier requests have completed;
+#       the user count only limits how many requests can be in flight
+ARRIVAL_RATE = float(os.getenv("ARRIVAL_RATE", "0"))
+# constant (evenly spaced) | poisson (random exponential gaps with the same mean rate)
+ARRIVAL_DISTRIBUTION = os.getenv("ARRIVAL_DISTRIBUTION", "constant").lower()
+
 # ============================================================================
 # Task Weights Configuration
 # ============================================================================
@@ -81,12 +284,84 @@ WAIT_TIME_MAX = float(os.getenv("WAIT_TIME_MAX", "5"))
 TASK_WEIGHT_CHAT_PAGE = int(os.getenv("TASK_WEIGHT_CHAT_PAGE", "3"))
 TASK_WEIGHT_SEND_MESSAGE = int(os.getenv("TASK_WEIGHT_SEND_MESSAGE", "5"))
 
+# ============================================================================
+# Streaming / TTF Measurement Configuration
+# ============================================================================
+# When enabled, chat responses are read incrementally so that time to first
+# byte, time to first token, inter-token gaps and time to last token can be
+# measured separately. When disabled, only the total response time is known.
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() in ("1", "true", "yes")
+# How to split the response into tokens: auto | sse | ndjson | raw
+# "auto" detects SSE / NDJSON from the Content-Type header, otherwise each received chunk counts as a token
+STREAM_FORMAT = os.getenv("STREAM_FORMAT", "auto").lower()
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1024"))
+# How 200 responses are checked (see response_validation.py), cheapest first:
+# none (body never read) | status (status code only) | sniff (expected key in the first bytes) | schema (sniff + full check of a sample)
+RESPONSE_VALIDATION = os.getenv("RESPONSE_VALIDATION", "status").lower()
+# Keys of which at least one must appear in a valid response / stream frame
+RESPONSE_EXPECTED_KEYS = [key.strip() for key in os.getenv(
+    "RESPONSE_EXPECTED_KEYS", "response,message,conversations,answer,token,content,text,delta,choices"
+).split(",") if key.strip()]
+# Characters at the start of the body searched for an expected key (sniff / schema)
+RESPONSE_SNIFF_BYTES = int(os.getenv("RESPONSE_SNIFF_BYTES", "1024"))
+# Fraction of responses fully decoded and checked (schema)
+RESPONSE_VALIDATION_SAMPLE_RATE = float(os.getenv("RESPONSE_VALIDATION_SAMPLE_RATE", "0.05"))
+# Answer length in characters per estimated token (response size / tokens-per-second metrics, see response_metrics.py)
+RESPONSE_CHARS_PER_TOKEN = float(os.getenv("RESPONSE_CHARS_PER_TOKEN", "4"))
+
 # ============================================================================
 # Reporting Configuration
 # ============================================================================
 REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
 HTML_REPORT_PATH = os.getenv("HTML_REPORT_PATH", f"{REPORTS_DIR}/load_test_report.html")
 TTF_DATA_PATH = os.getenv("TTF_DATA_PATH", f"{REPORTS_DIR}/ttf_data.csv")
+# Index of all runs (run ID, test type, users, config snapshot, where their rows start in TTF_DATA_PATH)
+RUN_INDEX_PATH = os.getenv("RUN_INDEX_PATH", f"{REPORTS_DIR}/run_index.jsonl")
+# Per-step results of the breakpoint test (written by breakpoint_shape.py)
+BREAKPOINT_STEPS_PATH = os.getenv("BREAKPOINT_STEPS_PATH", f"{REPORTS_DIR}/breakpoint_test_steps.json")
+# Load generator health time series and the verdict of the last run (see generator_health.py)
+GENERATOR_HEALTH_PATH = os.getenv("GENERATOR_HEALTH_PATH", f"{REPORTS_DIR}/generator_health.csv")
+GENERATOR_HEALTH_SUMMARY_PATH = os.getenv("GENERATOR_HEALTH_SUMMARY_PATH", f"{REPORTS_DIR}/generator_health_summary.json")
+# Latency by turn and context length of the last conversation test (see conversation.py)
+CONVERSATION_STATS_PATH = os.getenv("CONVERSATION_STATS_PATH", f"{REPORTS_DIR}/conversation_latency.json")
+# Response size, answer length and tokens/second per category of the last test (see response_metrics.py)
+RESPONSE_METRICS_PATH = os.getenv("RESPONSE_METRICS_PATH", f"{REPORTS_DIR}/response_metrics.json")
+# Verdict of the SLO rules of the last test (see slo.py)
+SLO_RESULTS_PATH = os.getenv("SLO_RESULTS_PATH", f"{REPORTS_DIR}/slo_results.json")
+# Per-window metrics, trends and verdict of the last endurance test (see degradation.py)
+ENDURANCE_ANALYSIS_PATH = os.getenv("ENDURANCE_ANALYSIS_PATH", f"{REPORTS_DIR}/endurance_degradation.json")
+
+# Streaming analysis of ttf_data.csv / the sample store (python run_tests.py analyze, see ttf_analysis.py)
+ANALYSIS_JSON_PATH = os.getenv("ANALYSIS_JSON_PATH", f"{REPORTS_DIR}/ttf_analysis.json")
+ANALYSIS_HTML_PATH = os.getenv("ANALYSIS_HTML_PATH", f"{REPORTS_DIR}/ttf_analysis.html")
+# Width of the time series buckets; doubled as needed to stay within ANALYSIS_MAX_BUCKETS per run
+ANALYSIS_BUCKET_SECONDS = float(os.getenv("ANALYSIS_BUCKET_SECONDS", "60"))
+ANALYSIS_MAX_BUCKETS = int(os.getenv("ANALYSIS_MAX_BUCKETS", "500"))
+# ttf_data.csv is appended to by every run: a gap longer than this between rows starts a new run
+ANALYSIS_RUN_GAP_SECONDS = float(os.getenv("ANALYSIS_RUN_GAP_SECONDS", "300"))
+
+# Per-category HDR latency histograms (see latency_histogram.py), merged over workers and saved after every run
+LATENCY_HISTOGRAM_ENABLED = os.getenv("LATENCY_HISTOGRAM_ENABLED", "true").lower() in ("1", "true", "yes")
+LATENCY_HISTOGRAM_PATH = os.getenv("LATENCY_HISTOGRAM_PATH", f"{REPORTS_DIR}/latency_histograms.json")
+# Relative precision in significant digits (3 = 0.1%)
+LATENCY_HISTOGRAM_DIGITS = int(os.getenv("LATENCY_HISTOGRAM_DIGITS", "3"))
+# Coordinated-omission correction for closed-loop users: expected interval (ms) between a user's requests
+# "auto" = mean think time (WAIT_TIME_MIN..WAIT_TIME_MAX), 0 = no correction
+# Open-loop and replay runs are corrected with how late each request started instead
+LATENCY_HISTOGRAM_EXPECTED_INTERVAL_MS = os.getenv("LATENCY_HISTOGRAM_EXPECTED_INTERVAL_MS", "auto").lower()
+
+# TTF rows are buffered in memory and written in batches by a background greenlet
+# A batch is flushed when it reaches TTF_WRITER_BATCH_SIZE rows or every TTF_WRITER_FLUSH_INTERVAL seconds
+TTF_WRITER_BATCH_SIZE = int(os.getenv("TTF_WRITER_BATCH_SIZE", "500"))
+TTF_WRITER_FLUSH_INTERVAL = float(os.getenv("TTF_WRITER_FLUSH_INTERVAL", "2"))
+# Rows beyond this many pending in memory are dropped (and counted) instead of blocking users
+TTF_WRITER_MAX_BUFFER_ROWS = int(os.getenv("TTF_WRITER_MAX_BUFFER_ROWS", "100000"))
+
+# Optional compact binary sample store (see sample_store.py), written alongside ttf_data.csv
+# Categories/questions are stored as dictionary IDs, timestamps as int64 ns, latencies as float32
+SAMPLE_STORE_ENABLED = os.getenv("SAMPLE_STORE_ENABLED", "false").lower() in ("1", "true", "yes")
+SAMPLE_STORE_PATH = os.getenv("SAMPLE_STORE_PATH", f"{REPORTS_DIR}/ttf_samples")
+SAMPLE_STORE_ROW_GROUP_SIZE = int(os.getenv("SAMPLE_STORE_ROW_GROUP_SIZE", "10000"))
 
 # ============================================================================
 # Login Endpoint Fallback Configuration
@@ -104,12 +379,40 @@ LOGIN_ENDPOINT_FALLBACKS = [
     "/"
 ]
 
+# Probe the endpoints above once (outside the Locust stats) and cache the one that works,
+# instead of every user trying them all; false = always use API_ENDPOINT_LOGIN with JSON
+LOGIN_ENDPOINT_DISCOVERY = os.getenv("LOGIN_ENDPOINT_DISCOVERY", "true").lower() in ("1", "true", "yes")
+LOGIN_ENDPOINT_CACHE_PATH = os.getenv("LOGIN_ENDPOINT_CACHE_PATH", f"{REPORTS_DIR}/login_endpoint.json")
+
 # ============================================================================
 # Request Headers Configuration
 # ============================================================================
-# Custom headers can be added here if needed
+# Custom headers sent with every request (page loads, logins and chat messages)
 CUSTOM_HEADERS = {
     # Add any custom headers here
     # Example: "X-Custom-Header": "value"
 }
 
+# ============================================================================
+# Connection Configuration
+# ============================================================================
+# Connections each user may open to a host at once (Locust's FastHttpUser default is 10)
+# Users send one request at a time, so this only matters for concurrent requests of one user
+CONNECTION_POOL_SIZE = int(os.getenv("CONNECTION_POOL_SIZE", "10"))
+
+# Seconds to wait for a TCP (+ TLS) connection, and for data on an open connection
+# NETWORK_TIMEOUT is per read: it must exceed the longest pause of a streamed answer (e.g. before the first token)
+CONNECTION_TIMEOUT = float(os.getenv("CONNECTION_TIMEOUT", "60"))
+NETWORK_TIMEOUT = float(os.getenv("NETWORK_TIMEOUT", "60"))
+
+# true = users keep their connection open between requests (clients behind a CDN, browsers)
+# false = every request opens a new connection ("Connection: close"), the worst case for the server
+KEEP_ALIVE = os.getenv("KEEP_ALIVE", "true").lower() in ("1", "true", "yes")
+
+# Resume the user's last TLS session when a new HTTPS connection is opened (abbreviated handshake)
+# false = a full TLS handshake for every new connection
+TLS_SESSION_RESUMPTION = os.getenv("TLS_SESSION_RESUMPTION", "true").lower() in ("1", "true", "yes")
+
+# New vs reused connections and TLS handshake times of the run
+CONNECTION_STATS_PATH = os.getenv("CONNECTION_STATS_PATH", f"{REPORTS_DIR}/connection_stats.json")
+
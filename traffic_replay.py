@@ -0,0 +1,245 @@
+"""
+Traffic Replay
+Replays a recorded production log on its original inter-arrival schedule
+
+The log is a CSV (with a header row) or JSONL file with one request per row:
+- timestamp: epoch seconds or an ISO 8601 date-time
+- session (or session_id): requests of one session are sent in order by one virtual user
+- question (or text / message / message_content): the message that was sent
+- category: optional; defaults to the question bank category, else "Replay"
+
+Every request is due at (timestamp - first timestamp of the log) / speedup
+after the replay starts. A session's next request is sent when it is due and
+the session's previous request has completed, so per-session ordering is
+kept even when the chatbot is slower than it was in production. Requests that
+start after they were due are counted as late. Sessions that start late mean
+there were not enough virtual users to replay the log faithfully; later
+requests of a session are late when the previous response took longer than
+the recorded gap.
+
+Sessions are sharded across Locust workers by a stable hash of the session id,
+while the time base is the whole log's first timestamp, so all workers replay
+the same timeline.
+"""
+import csv
+import json
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+SESSION_FIELDS = ("session", "session_id")
+QUESTION_FIELDS = ("question", "text", "message", "message_content")
+
+# Requests starting later than this after their due time count as late
+LATE_THRESHOLD_S = 1.0
+
+
+class ReplaySession:
+    """Requests of one recorded session: a list of (offset_s, question, category) in order"""
+
+    __slots__ = ("session_id", "events")
+
+    def __init__(self, session_id, events):
+        self.session_id = session_id
+        self.events = events
+
+    @property
+    def start(self):
+        return self.events[0][0]
+
+    @property
+    def end(self):
+        return self.events[-1][0]
+
+
+class ReplaySchedule:
+    """Hands out recorded sessions in start order and keeps replay lag statistics"""
+
+    def __init__(self, sessions, speedup=1.0):
+        if speedup <= 0:
+            raise ValueError("Replay speed-up factor must be positive")
+        self.sessions = sorted(sessions, key=lambda session: session.start)
+        self.speedup = float(speedup)
+        self.started_at = None
+
+        self.requests = 0
+        self.late_requests = 0
+        self.late_sessions = 0
+        self.max_lag_s = 0.0
+        self._total_lag_s = 0.0
+        self._next_index = 0
+        self._active_sessions = 0
+
+    def start(self, now=None):
+        """Start the replay clock (offset 0 of the log is now)"""
+        self.started_at = time.time() if now is None else now
+        self._next_index = 0
+
+    def next_session(self):
+        """The next session that has not been handed out yet (None when all are taken)"""
+        if self._next_index >= len(self.sessions):
+            return None
+        session = self.sessions[self._next_index]
+        self._next_index += 1
+        self._active_sessions += 1
+        return session
+
+    def finish_session(self):
+        """Record that a session from next_session() has sent all its requests"""
+        self._active_sessions -= 1
+
+    def due_at(self, offset_s):
+        """Wall-clock time at which a request recorded at offset_s is due"""
+        return self.started_at + offset_s / self.speedup
+
+    def record_start(self, offset_s, session_start=False, now=None):
+        """Record that a request was sent; returns how late it was (seconds, >= 0)"""
+        now = time.time() if now is None else now
+        lag = max(0.0, now - self.due_at(offset_s))
+        self.requests += 1
+        self._total_lag_s += lag
+        if lag > LATE_THRESHOLD_S:
+            self.late_requests += 1
+            if session_start:
+                self.late_sessions += 1
+        if lag > self.max_lag_s:
+            self.max_lag_s = lag
+        return lag
+
+    @property
+    def finished(self):
+        """All sessions have been handed out and have sent all their requests"""
+        return self._next_index >= len(self.sessions) and self._active_sessions == 0
+
+    @property
+    def duration_s(self):
+        """Wall-clock length of the replay (last recorded request, after speed-up)"""
+        if not self.sessions:
+            return 0.0
+        return max(session.end for session in self.sessions) / self.speedup
+
+    def stats(self):
+        """Counters for reporting"""
+        return {
+            "sessions": len(self.sessions),
+            "sessions_started": self._next_index,
+            "requests": self.requests,
+            "late_requests": self.late_requests,
+            "late_sessions": self.late_sessions,
+            "finished": self.finished,
+            "mean_lag_s": self._total_lag_s / self.requests if self.requests else 0.0,
+            "max_lag_s": self.max_lag_s,
+        }
+
+
+def load_replay_log(path, shard_index=0, shard_count=1, category_of=None):
+    """
+    Read a recorded traffic log into sessions
+
+    Args:
+        path: CSV or JSONL log file
+        shard_index, shard_count: Keep only the sessions of this worker's shard
+        category_of: Optional callable question -> category for rows without a category
+
+    Returns:
+        list of ReplaySession (offsets are relative to the first timestamp of the whole log)
+    """
+    path = Path(path)
+    shard_count = max(1, int(shard_count))
+    first_timestamp = None
+    rows = {}
+    for line_number, row in enumerate(_read_rows(path), start=1):
+        try:
+            timestamp = parse_timestamp(row["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{path}: row {line_number} has no valid timestamp") from None
+        session_id = str(_first_value(row, SESSION_FIELDS) or "")
+        question = _first_value(row, QUESTION_FIELDS)
+        if not session_id or not question:
+            raise ValueError(f"{path}: row {line_number} needs a session and a question")
+        if first_timestamp is None or timestamp < first_timestamp:
+            first_timestamp = timestamp
+        if zlib.crc32(session_id.encode("utf-8")) % shard_count != shard_index:
+            continue
+        category = row.get("category") or (category_of(question) if category_of else None) or "Replay"
+        rows.setdefault(session_id, []).append((timestamp, str(question), str(category)))
+
+    sessions = []
+    for session_id, events in rows.items():
+        # Stable sort: requests logged with the same timestamp keep their log order
+        events.sort(key=lambda event: event[0])
+        sessions.append(ReplaySession(
+            session_id,
+            [(timestamp - first_timestamp, question, category) for timestamp, question, category in events],
+        ))
+    return sessions
+
+
+def max_concurrent_sessions(sessions):
+    """Peak number of sessions whose first and last request overlap (a lower bound for the users needed)"""
+    boundaries = []
+    for session in sessions:
+        boundaries.append((session.start, 1))
+        boundaries.append((session.end, -1))
+    # Starts sort before ends at the same offset
+    boundaries.sort(key=lambda boundary: (boundary[0], -boundary[1]))
+    peak = active = 0
+    for _, change in boundaries:
+        active += change
+        peak = max(peak, active)
+    return peak
+
+
+def parse_timestamp(value):
+    """Epoch seconds (number or numeric string) or ISO 8601 date-time -> epoch seconds"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _read_rows(path):
+    suffix = path.suffix.lower()
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        if suffix == ".csv":
+            for row in csv.DictReader(f):
+                yield {key.strip(): value for key, value in row.items() if key}
+        elif suffix in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported replay log {path} (use a .csv or .jsonl file)")
+
+
+def _first_value(row, names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def combine_stats(stats_list):
+    """Combine ReplaySchedule.stats() of several processes (e.g. Locust workers)"""
+    combined = {
+        "sessions": 0, "sessions_started": 0, "requests": 0, "late_requests": 0, "late_sessions": 0,
+        "finished": True, "mean_lag_s": 0.0, "max_lag_s": 0.0,
+    }
+    total_lag_s = 0.0
+    for stats in stats_list:
+        for key in ("sessions", "sessions_started", "requests", "late_requests", "late_sessions"):
+            combined[key] += stats[key]
+        combined["finished"] = combined["finished"] and stats["finished"]
+        total_lag_s += stats["mean_lag_s"] * stats["requests"]
+        combined["max_lag_s"] = max(combined["max_lag_s"], stats["max_lag_s"])
+    if combined["requests"]:
+        combined["mean_lag_s"] = total_lag_s / combined["requests"]
+    return combined
@@ -0,0 +1,472 @@
+"""
+Streaming TTF Analysis
+Single-pass summary of ttf_data.csv (or the sample store) with bounded memory
+
+`python run_tests.py analyze` reads the TTF rows one at a time, so files of
+several GB never have to fit in memory (unlike pd.read_csv). Per run it keeps:
+- request counts per category and status
+- per-category HDR histograms (see latency_histogram.py) of TTFT, total
+  response time, TTFB and TTLT of successful requests, for mean / percentiles
+- a time series of fixed buckets (requests, errors, p50 / p95 TTFT and total)
+
+Memory depends on the number of categories and buckets, not on the number of
+rows: when a run has more than max_buckets buckets, neighbouring buckets are
+merged and the bucket width doubles.
+
+ttf_data.csv is appended to by every test, so it holds several runs. Rows are
+grouped by their Run_ID and Step columns (see run_registry.py); a single run can
+be read straight from its byte range using the run index. Rows without a run ID
+(files written before run IDs existed) are split where the timestamps jump
+forward by more than run_gap_seconds (rows of several workers are only roughly
+ordered, so small steps back are normal).
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+
+from latency_histogram import HdrHistogram
+from run_registry import read_ttf_rows
+
+ALL_CATEGORIES = "All"
+SUCCESS_STATUS = "Success"
+
+# TTF CSV column -> metric, for successful requests
+LATENCY_COLUMNS = (
+    ("TTF_ms", "ttft_ms"),
+    ("Total_Response_Time_ms", "total_ms"),
+    ("TTFB_ms", "ttfb_ms"),
+    ("TTLT_ms", "ttlt_ms"),
+)
+LATENCY_METRICS = tuple(metric for _, metric in LATENCY_COLUMNS)
+SUMMARY_PERCENTILES = (50, 90, 95, 99)
+
+
+class _Bucket:
+    __slots__ = ("requests", "errors", "ttft", "total")
+
+    def __init__(self, significant_digits):
+        self.requests = 0
+        self.errors = 0
+        self.ttft = HdrHistogram(significant_digits=significant_digits)
+        self.total = HdrHistogram(significant_digits=significant_digits)
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.ttft.merge(other.ttft)
+        self.total.merge(other.total)
+
+
+class RunSummary:
+    """Counts, latency histograms and time series of one run"""
+
+    def __init__(self, index, start, bucket_seconds=60, max_buckets=500, significant_digits=2,
+                 run_id=None, step=0, metadata=None):
+        self.index = index
+        self.run_id = run_id
+        self.step = step
+        self.metadata = metadata or {}
+        self.start = start
+        self.end = start
+        self.bucket_seconds = float(bucket_seconds)
+        self.max_buckets = max(2, int(max_buckets))
+        self.significant_digits = significant_digits
+
+        self.requests = 0
+        self.errors = 0
+        self.status_counts = {}  # category -> status -> count
+        self._latency = {}  # (category, metric) -> HdrHistogram
+        self._buckets = {}  # bucket index -> _Bucket
+
+    def add(self, timestamp, category, status, latencies):
+        """Record one row; latencies maps metric -> milliseconds (None = not measured)"""
+        if timestamp > self.end:
+            self.end = timestamp
+        self.requests += 1
+        statuses = self.status_counts.setdefault(category, {})
+        statuses[status] = statuses.get(status, 0) + 1
+
+        # Rows slightly before the first one (other workers' earlier batches) go into the first bucket
+        index = max(0, int((timestamp - self.start) // self.bucket_seconds))
+        while index >= self.max_buckets:
+            self._coarsen()
+            index //= 2
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            bucket = self._buckets[index] = _Bucket(self.significant_digits)
+        bucket.requests += 1
+
+        if status != SUCCESS_STATUS:
+            self.errors += 1
+            bucket.errors += 1
+            return
+        for metric, value in latencies.items():
+            if value is None:
+                continue
+            value_us = value * 1000
+            self._histogram(category, metric).record(value_us)
+            self._histogram(ALL_CATEGORIES, metric).record(value_us)
+            if metric == "ttft_ms":
+                bucket.ttft.record(value_us)
+            elif metric == "total_ms":
+                bucket.total.record(value_us)
+
+    def histogram(self, category, metric):
+        """HDR histogram of a category's (or ALL_CATEGORIES') metric; None if nothing was recorded"""
+        return self._latency.get((category, metric))
+
+    def _histogram(self, category, metric):
+        key = (category, metric)
+        histogram = self._latency.get(key)
+        if histogram is None:
+            histogram = self._latency[key] = HdrHistogram(significant_digits=self.significant_digits)
+        return histogram
+
+    def _coarsen(self):
+        """Halve the number of buckets by merging neighbours (doubles the bucket width)"""
+        merged = {}
+        for index, bucket in sorted(self._buckets.items()):
+            target = merged.get(index // 2)
+            if target is None:
+                merged[index // 2] = bucket
+            else:
+                target.merge(bucket)
+        self._buckets = merged
+        self.bucket_seconds *= 2
+
+    def latency_summary(self):
+        """Per category and metric: count, mean, max and SUMMARY_PERCENTILES (ms)"""
+        rows = []
+        for (category, metric), histogram in sorted(self._latency.items()):
+            if histogram.total_count == 0:
+                continue
+            row = {
+                "category": category,
+                "metric": metric,
+                "count": histogram.total_count,
+                "mean_ms": histogram.mean_us / 1000,
+                "max_ms": histogram.max_us / 1000,
+            }
+            for percentile in SUMMARY_PERCENTILES:
+                row[f"p{percentile}_ms"] = histogram.value_at_percentile(percentile) / 1000
+            rows.append(row)
+        return rows
+
+    def series(self):
+        """Time-bucketed series (empty buckets included, so gaps in the traffic stay visible)"""
+        rows = []
+        last = max(self._buckets) if self._buckets else -1
+        for index in range(last + 1):
+            bucket = self._buckets.get(index) or _Bucket(self.significant_digits)
+            bucket_start = index * self.bucket_seconds
+            # The last bucket ends with the run, not after a full bucket
+            duration = min(self.bucket_seconds, max(1.0, self.end - self.start - bucket_start))
+            rows.append({
+                "offset_s": bucket_start,
+                "requests": bucket.requests,
+                "errors": bucket.errors,
+                "error_rate": bucket.errors / bucket.requests * 100 if bucket.requests else 0.0,
+                "rps": bucket.requests / duration,
+                "p50_ttft_ms": _percentile_ms(bucket.ttft, 50),
+                "p95_ttft_ms": _percentile_ms(bucket.ttft, 95),
+                "p50_total_ms": _percentile_ms(bucket.total, 50),
+                "p95_total_ms": _percentile_ms(bucket.total, 95),
+            })
+        return rows
+
+    def to_dict(self):
+        duration = self.end - self.start
+        return {
+            "run": self.index,
+            "run_id": self.run_id,
+            "step": self.step,
+            "test_type": self.metadata.get("test_type"),
+            "users": (self.metadata.get("steps_users") or {}).get(self.step, self.metadata.get("users")),
+            "start": datetime.fromtimestamp(self.start).isoformat(timespec="seconds"),
+            "end": datetime.fromtimestamp(self.end).isoformat(timespec="seconds"),
+            "duration_s": duration,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests * 100 if self.requests else 0.0,
+            "rps": self.requests / duration if duration > 0 else None,
+            "status_counts": self.status_counts,
+            "latency": self.latency_summary(),
+            "bucket_seconds": self.bucket_seconds,
+            "series": self.series(),
+        }
+
+
+class TtfAnalyzer:
+    """Splits a stream of TTF rows into runs and summarizes each run"""
+
+    def __init__(self, bucket_seconds=60, run_gap_seconds=300, max_buckets=500, significant_digits=2,
+                 run_index_entries=()):
+        self.bucket_seconds = bucket_seconds
+        self.run_gap_seconds = float(run_gap_seconds)
+        self.max_buckets = max_buckets
+        self.significant_digits = significant_digits
+        # (run ID, step) -> run index record, for the test type and user count of each run
+        self._run_metadata = {(entry["run_id"], entry.get("step", 0)): entry for entry in run_index_entries}
+
+        self.rows = 0
+        self.skipped_rows = 0
+        self.runs = []
+        self._tagged_runs = {}  # (run ID, step) -> RunSummary
+
+    def add(self, timestamp, category, status, latencies, run_id=None, step=0):
+        """
+        Record one request
+
+        Args:
+            timestamp: Epoch seconds when the request completed
+            category: Question category
+            status: "Success" or the error status of the request
+            latencies: metric -> milliseconds (ttft_ms, total_ms, ttfb_ms, ttlt_ms; None = not measured)
+            run_id, step: Run the row was tagged with (None = split runs by time gaps)
+        """
+        if run_id:
+            run = self._tagged_runs.get((run_id, step))
+            if run is None:
+                run = self._tagged_runs[(run_id, step)] = self._new_run(timestamp, run_id, step)
+        else:
+            run = self.runs[-1] if self.runs else None
+            if run is None or run.run_id is not None or timestamp - run.end > self.run_gap_seconds:
+                run = self._new_run(timestamp)
+        run.add(timestamp, category, status, latencies)
+        self.rows += 1
+
+    def _new_run(self, timestamp, run_id=None, step=0):
+        # Breakpoint steps inside one Locust run share the run's record
+        metadata = dict(self._run_metadata.get((run_id, step)) or self._run_metadata.get((run_id, 0)) or {})
+        metadata["steps_users"] = {entry["step"]: entry["users"] for entry in metadata.get("steps", [])}
+        run = RunSummary(len(self.runs) + 1, timestamp, self.bucket_seconds, self.max_buckets,
+                         self.significant_digits, run_id=run_id, step=step, metadata=metadata)
+        self.runs.append(run)
+        return run
+
+    def add_ttf_csv(self, path, run_entries=None):
+        """
+        Feed the rows of a ttf_data.csv file (streamed, not loaded into memory)
+
+        Args:
+            path: ttf_data.csv
+            run_entries: RunIndex records of one run to read from its byte range (None = the whole file)
+        """
+        header, rows = read_ttf_rows(path, run_entries)
+        if not header:
+            return
+        columns = {name: i for i, name in enumerate(header)}
+        try:
+            timestamp_column = columns["Timestamp"]
+            category_column = columns["Question_Category"]
+            status_column = columns["Status"]
+        except KeyError as e:
+            raise ValueError(f"{path} is not a TTF data file (missing column {e})") from None
+        latency_columns = [(metric, columns[name]) for name, metric in LATENCY_COLUMNS if name in columns]
+        run_id_column = columns.get("Run_ID")
+        step_column = columns.get("Step")
+        for row in rows:
+            try:
+                timestamp = datetime.fromisoformat(row[timestamp_column]).timestamp()
+                category = row[category_column] or "Unknown"
+                status = row[status_column]
+                run_id = row[run_id_column] if run_id_column is not None else None
+                step = int(row[step_column] or 0) if step_column is not None else 0
+            except (IndexError, ValueError):
+                self.skipped_rows += 1
+                continue
+            latencies = {metric: _to_float(row[i]) if i < len(row) else None for metric, i in latency_columns}
+            self.add(timestamp, category, status, latencies, run_id, step)
+
+    def add_sample_store(self, directory, run_id=None):
+        """
+        Feed the samples of a sample store directory (one row group at a time), grouped by run ID and step
+
+        Args:
+            directory: Sample store directory
+            run_id: Only feed the samples of this run (None = all samples)
+        """
+        from sample_store import iter_samples
+
+        for row in iter_samples(directory):
+            if run_id is not None and row["run_id"] != run_id:
+                continue
+            self.add(
+                row["timestamp_s"],
+                row["category"],
+                row["status"],
+                {metric: row[metric] for metric in LATENCY_METRICS},
+                row["run_id"],
+                row["step"],
+            )
+
+    def result(self):
+        return {
+            "rows": self.rows,
+            "skipped_rows": self.skipped_rows,
+            "run_gap_seconds": self.run_gap_seconds,
+            "runs": [run.to_dict() for run in self.runs],
+        }
+
+
+def save_result(path, result):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+def format_runs(result):
+    """One line per run (and breakpoint step)"""
+    lines = [f"{'Run':>4} {'Run ID':<32} {'Step':>4} {'Users':>6} {'Start':<20} {'Duration':>10} "
+             f"{'Requests':>10} {'Errors':>8} {'RPS':>8}"]
+    for run in result["runs"]:
+        rps = f"{run['rps']:.2f}" if run["rps"] is not None else "-"
+        lines.append(f"{run['run']:>4} {(run['run_id'] or '-')[:32]:<32} {run['step'] or '-':>4} "
+                     f"{run['users'] if run['users'] is not None else '-':>6} {run['start'].replace('T', ' '):<20} "
+                     f"{_format_duration(run['duration_s']):>10} {run['requests']:>10} {run['error_rate']:>7.1f}% {rps:>8}")
+    return "\n".join(lines)
+
+
+def format_latency(run, metrics=("ttft_ms", "total_ms")):
+    """Text table of the latency percentiles of one run"""
+    lines = [f"{'Category':<20} {'Metric':<10} {'Count':>8} {'Mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'Max':>9}"]
+    for row in run["latency"]:
+        if row["metric"] not in metrics:
+            continue
+        lines.append(
+            f"{row['category'][:20]:<20} {row['metric']:<10} {row['count']:>8} {row['mean_ms']:>9.1f} "
+            f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def render_html_section(run):
+    """HTML <section> for one run: overview, latency and status tables and a p95 latency chart"""
+    import html
+
+    latency_rows = "".join(
+        f"<tr><td>{html.escape(row['category'])}</td><td>{row['metric']}</td><td>{row['count']}</td>"
+        f"<td>{row['mean_ms']:.1f}</td><td>{row['p50_ms']:.1f}</td><td>{row['p90_ms']:.1f}</td>"
+        f"<td>{row['p95_ms']:.1f}</td><td>{row['p99_ms']:.1f}</td><td>{row['max_ms']:.1f}</td></tr>"
+        for row in run["latency"]
+    )
+    status_rows = "".join(
+        f"<tr><td>{html.escape(category)}</td><td>{html.escape(status)}</td><td>{count}</td></tr>"
+        for category, statuses in sorted(run["status_counts"].items())
+        for status, count in sorted(statuses.items(), key=lambda item: -item[1])
+    )
+    rps = f"{run['rps']:.2f}" if run["rps"] is not None else "-"
+    title = html.escape(run["run_id"]) if run["run_id"] else run["start"].replace("T", " ")
+    if run["step"]:
+        title += f" - step {run['step']}"
+    details = ""
+    if run["test_type"]:
+        details += f"<p><strong>Test:</strong> {html.escape(run['test_type'])}</p>"
+    if run["users"] is not None:
+        details += f"<p><strong>Users:</strong> {run['users']}</p>"
+    return f"""
+        <section>
+            <h2>Run {run['run']}: {title}</h2>
+            <div class="summary">
+                {details}
+                <p><strong>Duration:</strong> {_format_duration(run['duration_s'])} ({run['start'].replace('T', ' ')} to {run['end'].replace('T', ' ')})</p>
+                <p><strong>Requests:</strong> {run['requests']} ({run['errors']} errors, {run['error_rate']:.1f}%)</p>
+                <p><strong>Throughput:</strong> {rps} requests/s</p>
+            </div>
+            <h3>p95 latency and error rate per {_format_duration(run['bucket_seconds'])}</h3>
+            {_render_series_chart(run['series'])}
+            <h3>Latency of successful requests (ms)</h3>
+            <table>
+                <tr><th>Category</th><th>Metric</th><th>Count</th><th>Mean</th><th>p50</th><th>p90</th><th>p95</th><th>p99</th><th>Max</th></tr>
+                {latency_rows}
+            </table>
+            <h3>Requests by status</h3>
+            <table>
+                <tr><th>Category</th><th>Status</th><th>Requests</th></tr>
+                {status_rows}
+            </table>
+        </section>
+"""
+
+
+def write_html(path, result, title="TTF Data Analysis"):
+    """Standalone HTML page with one section per run (latest first)"""
+    sections = "".join(render_html_section(run) for run in reversed(result["runs"]))
+    page = f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
+        .container {{ max-width: 1400px; margin: 0 auto; background-color: white; padding: 30px;
+                      border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
+        h1 {{ color: #333; border-bottom: 3px solid #4CAF50; padding-bottom: 10px; }}
+        section {{ margin-bottom: 40px; }}
+        .summary {{ background-color: #e8f5e9; padding: 15px; border-radius: 5px; margin: 20px 0; }}
+        table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
+        th {{ background-color: #4CAF50; color: white; padding: 12px; text-align: left; }}
+        td {{ padding: 10px; border-bottom: 1px solid #ddd; }}
+        .legend span {{ margin-right: 20px; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>📈 {title}</h1>
+        <p>{result['rows']} rows in {len(result['runs'])} runs</p>
+{sections}
+    </div>
+</body>
+</html>
+"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+
+
+def _render_series_chart(series, width=1000, height=220):
+    """Inline SVG with p95 TTFT, p95 total response time and the error rate over the run"""
+    if len(series) < 2:
+        return "<p>Not enough data for a time series.</p>"
+    lines = (
+        ("p95_ttft_ms", "#1976D2", "p95 TTFT"),
+        ("p95_total_ms", "#4CAF50", "p95 total"),
+    )
+    highest = max((row[metric] for metric, _, _ in lines for row in series if row[metric] is not None), default=0)
+    highest = highest or 1.0
+    step = width / (len(series) - 1)
+
+    def polyline(values, scale, color):
+        points = " ".join(f"{i * step:.1f},{height - value / scale * height:.1f}"
+                          for i, value in enumerate(values) if value is not None)
+        return f'<polyline fill="none" stroke="{color}" stroke-width="2" points="{points}"/>'
+
+    shapes = [polyline([row[metric] for row in series], highest, color) for metric, color, _ in lines]
+    shapes.append(polyline([row["error_rate"] for row in series], 100.0, "#f44336"))
+    legend = "".join(f'<span style="color: {color}">&#9632; {label}</span>' for _, color, label in lines)
+    return (f'<svg viewBox="0 -5 {width} {height + 10}" width="100%" height="{height + 10}" '
+            f'preserveAspectRatio="none">{"".join(shapes)}</svg>'
+            f'<div class="legend">{legend}<span style="color: #f44336">&#9632; error rate (0-100%)</span>'
+            f'<span>latency scale: 0-{highest:.0f}ms</span></div>')
+
+
+def _format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+def _percentile_ms(histogram, percentile):
+    value = histogram.value_at_percentile(percentile)
+    return value / 1000 if value is not None else None
+
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
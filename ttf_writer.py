@@ -0,0 +1,148 @@
+"""
+Buffered TTF Data Writer
+Collects per-request TTF rows in memory and writes them to CSV in batches
+
+A single writer is shared by every virtual user in the process. Rows are
+appended to an in-memory buffer on the hot path and a background greenlet
+flushes them to one long-lived file handle when either the batch size or the
+flush interval is reached (and once more when the test stops). If the buffer
+fills up faster than it can be written, new rows are dropped and counted
+instead of blocking request generation.
+
+Each batch is written with a single append-mode write() call, so several
+Locust worker processes can share one CSV file without interleaving rows.
+In that case the master calls prepare_file() once and workers open the file
+with prepare=False.
+"""
+import csv
+import io
+import os
+import time
+from pathlib import Path
+
+import gevent
+from gevent.event import Event
+
+
+class BufferedCsvWriter:
+    """Process-wide CSV writer that buffers rows and flushes them in batches"""
+
+    def __init__(self, path, header, batch_size=500, flush_interval=2.0, max_buffer_rows=100000):
+        self.path = Path(path)
+        self.header = list(header)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.max_buffer_rows = max(self.batch_size, int(max_buffer_rows))
+
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flush_count = 0
+        self.write_errors = 0
+        self.last_error = None
+
+        self._buffer = []
+        self._fd = None
+        self._wakeup = Event()
+        self._flusher = None
+        self._running = False
+
+    @staticmethod
+    def prepare_file(path, header):
+        """
+        Make sure path exists and starts with header
+
+        A file written with an older column layout is moved aside instead of
+        having mismatched rows appended to it.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if path.exists() and path.stat().st_size > 0:
+            with open(path, 'r', newline='') as f:
+                existing_header = next(csv.reader(f), [])
+            if existing_header != list(header):
+                legacy_path = path.with_name(f"{path.stem}_legacy_{int(time.time())}{path.suffix}")
+                path.rename(legacy_path)
+                print(f"NOTE: {path} used an older column layout, moved to {legacy_path}")
+
+        if not path.exists() or path.stat().st_size == 0:
+            with open(path, 'w', newline='') as f:
+                csv.writer(f).writerow(header)
+
+    def open(self, prepare=True):
+        """Open the output file and start the flusher (prepare=False when another process owns the header)"""
+        if self._running:
+            return
+        if prepare:
+            self.prepare_file(self.path, self.header)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+        self._running = True
+        self._flusher = gevent.spawn(self._flush_loop)
+
+    def write_row(self, row):
+        """Queue a row for writing - never blocks and never raises"""
+        if not self._running:
+            self.rows_dropped += 1
+            return
+        if len(self._buffer) >= self.max_buffer_rows:
+            self.rows_dropped += 1
+            return
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write all buffered rows to disk"""
+        if not self._buffer or self._fd is None:
+            return
+        rows, self._buffer = self._buffer, []
+        try:
+            text = io.StringIO()
+            csv.writer(text).writerows(rows)
+            data = text.getvalue().encode('utf-8')
+            # One write() per batch keeps rows from different processes from interleaving
+            written = os.write(self._fd, data)
+            while written < len(data):
+                written += os.write(self._fd, data[written:])
+            self.rows_written += len(rows)
+            self.flush_count += 1
+        except Exception as e:
+            self.rows_dropped += len(rows)
+            self.write_errors += 1
+            if self.last_error is None:
+                print(f"WARNING: Failed to write TTF data to {self.path}: {e}")
+            self.last_error = e
+
+    def close(self):
+        """Stop the flusher, write any remaining rows and close the file"""
+        if not self._running:
+            return
+        self._running = False
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.flush_interval + 5)
+            self._flusher = None
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = None
+
+    def stats(self):
+        """Counters for reporting (rows written, dropped, pending, flushes and errors)"""
+        return {
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "rows_pending": len(self._buffer),
+            "flushes": self.flush_count,
+            "write_errors": self.write_errors,
+        }
+
+    def _flush_loop(self):
+        """Background greenlet: flush on batch size or flush interval, whichever comes first"""
+        while self._running:
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            self.flush()